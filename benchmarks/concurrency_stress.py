@@ -0,0 +1,72 @@
+"""
+Stress test of in-process interpreters running concurrently on a thread pool: each interpreter prints its own tokens
+(to stdout and stderr) and draws its own figure, interleaved with the other threads.
+Reports the calls whose output or figure leaked from another interpreter, and the figures left in the global pyplot state.
+
+    python -m benchmarks.concurrency_stress --threads 16 --calls 20
+"""
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from strands_data_analyst.python_environment import PythonInterpreter
+
+
+CALL = """
+import sys
+import time
+import matplotlib.pyplot as plt
+
+visualization, ax = plt.subplots(1, 1, figsize=(4, 3))
+for i in range(50):
+    print(f"{token} line {i}")
+    time.sleep(0)
+plt.plot([0, 1], [0, 1], label=token)
+plt.title(token)
+plt.xlabel(token)
+plt.legend()
+print(f"{token} error", file=sys.stderr)
+visualization.canvas.draw()
+"""
+
+
+def run_session(session, n_calls):
+    interpreter = PythonInterpreter()
+    leaks = 0
+    for call in range(n_calls):
+        token = f"session-{session}-call-{call}"
+        interpreter.state['token'] = token
+        output = interpreter.run(CALL)
+        lines = [line.removeprefix("STDOUT: ").removeprefix("STDERR: ") for line in output.splitlines()]
+        visualization = interpreter.state['visualization']
+        axes = visualization.axes
+        if (any(not line.startswith(token + " ") for line in lines) or len(lines) != 51
+                or len(axes) != 1 or len(axes[0].lines) != 1 or axes[0].get_title() != token
+                or axes[0].get_xlabel() != token or len(interpreter.pyplot.figures) != 1):
+            leaks += 1
+        interpreter.clear_state()
+    return leaks
+
+
+def run_stress_test(n_threads, n_calls):
+    import matplotlib.pyplot as pyplot
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(n_threads) as executor:
+        leaks = sum(executor.map(run_session, range(n_threads), [n_calls] * n_threads))
+    elapsed = time.perf_counter() - start
+
+    global_figures = len(pyplot.get_fignums())
+    print(f"{n_threads} threads x {n_calls} calls in {elapsed:.1f}s: {leaks} calls with leaked output or figures, "
+          f"{global_figures} figures in the global pyplot state")
+    return leaks == 0 and global_figures == 0
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+    parser = ArgumentParser()
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--calls", type=int, default=20, help="Calls per interpreter")
+    args = parser.parse_args()
+
+    sys.exit(0 if run_stress_test(args.threads, args.calls) else 1)
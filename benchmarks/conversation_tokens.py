@@ -0,0 +1,122 @@
+"""
+Replays a long session of queries on a stub model, to measure the input tokens of each request and the latency
+of each query with the sliding window conversation manager vs the token-budgeted digest conversation manager.
+Every query is answered with one `python_repl` call printing the data-frame of an aggregate, then a text answer:
+no model is invoked, the tool calls run for real, and the stub reports the tokens of the messages it receives.
+
+    python -m benchmarks.conversation_tokens --queries 30 --budget 20000
+"""
+import os
+import json
+import time
+import tempfile
+import statistics
+
+from benchmarks.explain_sql import build_database
+from benchmarks.stub_model import StubModel, QUERY_CODE
+from strands_data_analyst.agent import DataAnalystAgent
+from strands_data_analyst.conversation import count_message_tokens
+from strands_data_analyst.databases import SQLiteDB
+from strands_data_analyst.tokens import count_tokens
+
+
+# Question, SQL query answering it
+QUERIES = [
+    ("Which categories bring the most revenue?",
+     "SELECT category, SUM(amount) AS amount FROM events GROUP BY category ORDER BY amount DESC"),
+    ("How does the revenue evolve over the days?",
+     "SELECT day, SUM(amount) AS amount, COUNT(*) AS events FROM events GROUP BY day"),
+    ("Which countries have the most active users?",
+     "SELECT u.country, COUNT(DISTINCT e.user_id) AS users FROM events e JOIN users u ON u.id = e.user_id "
+     "GROUP BY u.country"),
+    ("Who are the top 100 users by amount?",
+     "SELECT user_id, SUM(amount) AS amount, COUNT(*) AS events FROM events GROUP BY user_id "
+     "ORDER BY amount DESC LIMIT 100"),
+    ("What is the revenue per category and country?",
+     "SELECT e.category, u.country, SUM(e.amount) AS amount FROM events e JOIN users u ON u.id = e.user_id "
+     "GROUP BY e.category, u.country"),
+]
+
+
+class SessionStubModel(StubModel):
+    """Model answering every query with one `python_repl` call, then with a text answer."""
+    def __init__(self):
+        super().__init__()
+        self.sql_queries = dict(QUERIES)
+        self.request_tokens = []
+
+    async def stream(self, messages, tool_specs=None, system_prompt=None, **kwargs):
+        input_tokens = count_tokens(system_prompt or "") + count_tokens(json.dumps(messages))
+        self.request_tokens.append(input_tokens)
+        content = messages[-1]['content']
+        yield {'messageStart': {'role': 'assistant'}}
+        if any('toolResult' in block for block in content):
+            answer = "The result shows that the books and games categories bring most of the revenue."
+            yield {'contentBlockDelta': {'delta': {'text': answer}}}
+            yield {'contentBlockStop': {}}
+            yield {'messageStop': {'stopReason': 'end_turn'}}
+        else:
+            question = next(text for text in self.sql_queries if any(text in block.get('text', "") for block in content))
+            code = f"sql_query = {self.sql_queries[question]!r}" + QUERY_CODE
+            yield {'contentBlockStart': {'start': {'toolUse': {'toolUseId': os.urandom(8).hex(), 'name': 'python_repl'}}}}
+            yield {'contentBlockDelta': {'delta': {'toolUse': {'input': json.dumps({'code': code})}}}}
+            yield {'contentBlockStop': {}}
+            yield {'messageStop': {'stopReason': 'tool_use'}}
+        yield {'metadata': {
+            'usage': {'inputTokens': input_tokens, 'outputTokens': 0, 'totalTokens': input_tokens},
+            'metrics': {'latencyMs': 0}
+        }}
+
+
+def run_session(db, n_queries, token_budget):
+    model = SessionStubModel()
+    agent = DataAnalystAgent(verbose=False, model=model, conversation_token_budget=token_budget)
+    agent.set_db('benchmark', db)
+
+    # The time spent by the conversation manager, after each request
+    manager_times = []
+    apply_management = agent.conversation_manager.apply_management
+
+    def timed_apply_management(*args, **kwargs):
+        start = time.perf_counter()
+        apply_management(*args, **kwargs)
+        manager_times.append(time.perf_counter() - start)
+    agent.conversation_manager.apply_management = timed_apply_management
+
+    query_times = []
+    for question, _ in (QUERIES * n_queries)[:n_queries]:
+        start = time.perf_counter()
+        agent.query(question)
+        query_times.append(time.perf_counter() - start)
+
+    history_tokens = count_message_tokens(agent.agent.messages)
+    agent.close()
+    return model.request_tokens, query_times, manager_times, history_tokens
+
+
+def run_benchmark(n_rows, n_queries, token_budget):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "events.sqlite")
+        build_database(db_path, n_rows)
+        db = SQLiteDB({'db_location': db_path})
+        db.get_schema()
+
+        print(f"Session of {n_queries} queries, {n_rows:,} events")
+        for name, budget in [("sliding window", None), (f"digest, budget {token_budget}", token_budget)]:
+            request_tokens, query_times, manager_times, history_tokens = run_session(db, n_queries, budget)
+            print(f"  {name}:")
+            print(f"    input tokens: {sum(request_tokens):,} total, {request_tokens[-1]:,} last request, "
+                  f"{max(request_tokens):,} max request, {history_tokens:,} history at the end")
+            print(f"    query latency: {statistics.median(query_times) * 1000:.0f}ms p50, "
+                  f"{max(query_times) * 1000:.0f}ms max, manager {sum(manager_times) * 1000:.1f}ms total")
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+    parser = ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000, help="Rows of the events table")
+    parser.add_argument("--queries", type=int, default=30, help="Queries of the session")
+    parser.add_argument("--budget", type=int, default=20_000, help="Token budget of the conversation history")
+    args = parser.parse_args()
+
+    run_benchmark(args.rows, args.queries, args.budget)
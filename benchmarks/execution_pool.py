@@ -0,0 +1,88 @@
+"""
+Measures the `python_repl` tool latency (p50/p99) under 1, 8 and 32 concurrent sessions,
+executing the code in the agent process vs in the pre-warmed worker pool.
+The first call of every session, which imports pandas, is reported separately.
+The in-process calls are serialized by a lock: concurrent pandas calls from several threads are not safe,
+and can crash the whole process.
+
+    python -m benchmarks.execution_pool --calls 10
+"""
+import time
+import threading
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+from strands_data_analyst.python_environment import PythonInterpreter
+from strands_data_analyst.execution_pool import RemotePythonInterpreter, WorkerPool
+
+
+SESSIONS = [1, 8, 32]
+
+FIRST_CALL = """
+import numpy as np
+import pandas as pd
+data_frame = pd.DataFrame({'key': np.arange(100_000) % 100, 'value': np.random.rand(100_000)})
+"""
+
+CALL = """
+summary = data_frame.groupby('key')['value'].agg(['mean', 'count'])
+print(summary.head(3))
+"""
+
+
+class SerializedInterpreter(PythonInterpreter):
+    lock = threading.Lock()
+
+    def run(self, code):
+        with SerializedInterpreter.lock:
+            return super().run(code)
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def run_session(interpreter, n_calls):
+    start = time.perf_counter()
+    interpreter.run(FIRST_CALL)
+    first_call = time.perf_counter() - start
+
+    latencies = []
+    for _ in range(n_calls):
+        start = time.perf_counter()
+        interpreter.run(CALL)
+        latencies.append(time.perf_counter() - start)
+    return first_call, latencies
+
+
+def run_benchmark(n_calls):
+    pool = WorkerPool()
+    backends = {
+        'in-process': SerializedInterpreter,
+        'worker pool': lambda: RemotePythonInterpreter(pool),
+    }
+    for sessions in SESSIONS:
+        for backend, new_interpreter in backends.items():
+            interpreters = [new_interpreter() for _ in range(sessions)]
+            with ThreadPoolExecutor(sessions) as executor:
+                results = list(executor.map(run_session, interpreters, [n_calls] * sessions))
+            for interpreter in interpreters:
+                if isinstance(interpreter, RemotePythonInterpreter):
+                    interpreter.close()
+
+            first_calls = [first_call for first_call, _ in results]
+            latencies = [latency for _, session_latencies in results for latency in session_latencies]
+            print(f"{sessions:3d} sessions, {backend:12s}: "
+                  f"p50 {percentile(latencies, 0.5) * 1000:7.1f}ms, p99 {percentile(latencies, 0.99) * 1000:7.1f}ms, "
+                  f"first call p50 {statistics.median(first_calls) * 1000:7.1f}ms")
+    pool.close()
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+    parser = ArgumentParser()
+    parser.add_argument("--calls", type=int, default=10, help="Tool calls per session")
+    args = parser.parse_args()
+
+    run_benchmark(args.calls)
@@ -0,0 +1,146 @@
+"""
+Measures the SQL tool time of analysis tasks on a large database, without and with the `explain_sql` tool.
+Each task has the query a model typically writes first (e.g. filtering with LIKE or a function of an indexed column),
+and the equivalent rewrite using the indexes (if any). Without the tool, the first query is run. With the tool,
+its plan is checked first, and the rewrite is run when the plan is flagged as expensive: the tool time includes
+the plans. The policy replays the model decision, no model is invoked.
+With `--agent` the tasks are also answered end-to-end by the agent (requires the Bedrock credentials),
+reporting the tool time of its telemetry.
+
+    python -m benchmarks.explain_sql --rows 1000000
+"""
+import os
+import time
+import random
+import sqlite3
+import tempfile
+
+from strands_data_analyst.agent import DataAnalystAgent
+from strands_data_analyst.databases import SQLiteDB
+from strands_data_analyst.python_environment import PythonInterpreter
+from strands_data_analyst.query_plan import QueryPlanner
+
+
+COUNTRIES = ["FR", "DE", "IT", "ES", "US", "UK", "JP", "BR"]
+CATEGORIES = ["books", "games", "music", "sports", "garden", "food"]
+
+# Question, first query, rewrite using the indexes (None if there is no cheaper query)
+TASKS = [
+    ("List the events of March 2024",
+     "SELECT * FROM events WHERE day LIKE '2024-03%'",
+     "SELECT * FROM events WHERE day >= '2024-03' AND day < '2024-04'"),
+    ("What is the total amount of the first quarter of 2024?",
+     "SELECT SUM(amount) FROM events WHERE strftime('%Y-%m', day) BETWEEN '2024-01' AND '2024-03'",
+     "SELECT SUM(amount) FROM events WHERE day >= '2024-01' AND day < '2024-04'"),
+    ("What is the total amount of the events of the user 42?",
+     "SELECT SUM(amount) FROM events WHERE CAST(user_id AS TEXT) = '42'",
+     "SELECT SUM(amount) FROM events WHERE user_id = 42"),
+    ("List the events of the French users on the 15th of June 2024",
+     "SELECT e.* FROM events e JOIN users u ON u.id = e.user_id WHERE u.country = 'FR' AND substr(e.day, 1, 10) = '2024-06-15'",
+     "SELECT e.* FROM events e JOIN users u ON u.id = e.user_id WHERE u.country = 'FR' AND e.day = '2024-06-15'"),
+    ("List the events of the user 7",
+     "SELECT * FROM events WHERE user_id = 7",
+     None),
+    ("What is the total amount per category?",
+     "SELECT category, SUM(amount) FROM events GROUP BY category",
+     None),
+]
+
+QUERY_CODE = """
+data_frame = pd.read_sql_query(sql_query, db_conn)
+print(data_frame.shape)
+"""
+
+
+def build_database(db_path, n_rows, n_users=10_000, seed=0):
+    rng = random.Random(seed)
+    connection = sqlite3.connect(db_path)
+    connection.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, country TEXT);")
+    connection.executemany("INSERT INTO users VALUES (?, ?);", ((user, rng.choice(COUNTRIES)) for user in range(n_users)))
+    connection.execute(
+        "CREATE TABLE events (id INTEGER PRIMARY KEY, user_id INTEGER, day TEXT, category TEXT, amount REAL);")
+    connection.executemany("INSERT INTO events VALUES (NULL, ?, ?, ?, ?);", (
+        (rng.randrange(n_users), f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+         rng.choice(CATEGORIES), round(rng.uniform(1, 500), 2))
+            for _ in range(n_rows)))
+    connection.execute("CREATE INDEX events_user_id ON events (user_id);")
+    connection.execute("CREATE INDEX events_day ON events (day);")
+    connection.commit()
+    connection.close()
+
+
+def run_query(interpreter, sql_query):
+    interpreter.state['sql_query'] = sql_query
+    start = time.perf_counter()
+    interpreter.run(QUERY_CODE)
+    return time.perf_counter() - start, interpreter.state['data_frame']
+
+
+def run_tasks(db):
+    interpreter = PythonInterpreter()
+    interpreter.set_db(db)
+    planner = QueryPlanner()
+    planner.set_db(db, db.get_schema(), db.get_table_info())
+
+    # Warm up the page cache of the table and of its indexes
+    for sql_query in ["SELECT SUM(amount) FROM events", "SELECT COUNT(DISTINCT day), COUNT(DISTINCT user_id) FROM events"]:
+        run_query(interpreter, sql_query)
+
+    totals = [0.0, 0.0]
+    for question, sql_query, rewrite in TASKS:
+        without_tool, expected = run_query(interpreter, sql_query)
+
+        start = time.perf_counter()
+        plan = planner.explain(sql_query)
+        explain_time = time.perf_counter() - start
+        if "EXPENSIVE" in plan and rewrite is not None:
+            start = time.perf_counter()
+            planner.explain(rewrite)
+            explain_time += time.perf_counter() - start
+            sql_query = rewrite
+        run_time, data_frame = run_query(interpreter, sql_query)
+        if data_frame.shape != expected.shape:
+            raise Exception(f"The rewrite of the task returns different results: {question}")
+
+        with_tool = explain_time + run_time
+        totals[0] += without_tool
+        totals[1] += with_tool
+        print(f"{without_tool * 1000:8.1f}ms -> {with_tool * 1000:8.1f}ms (plans {explain_time * 1000:5.1f}ms, "
+              f"{'rewritten' if sql_query == rewrite else 'unchanged'}): {question}")
+    print(f"Tool time: {totals[0] * 1000:.1f}ms without explain_sql, {totals[1] * 1000:.1f}ms with explain_sql")
+    interpreter.release_db()
+
+
+def run_agent(db):
+    for explain_tool in [False, True]:
+        agent = DataAnalystAgent(verbose=False, always_reset=True, telemetry=True, explain_tool=explain_tool)
+        agent.set_db('benchmark', db)
+        tool_time = 0.0
+        for question, _, _ in TASKS:
+            events = agent.query(question)['telemetry']
+            tool_time += sum(event['tool_time'] for event in events if event['event'] == 'query')
+        print(f"Agent {'with' if explain_tool else 'without'} explain_sql: {tool_time:.1f}s of tool time")
+
+
+def run_benchmark(n_rows, with_agent):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "events.sqlite")
+        start = time.perf_counter()
+        build_database(db_path, n_rows)
+        db = SQLiteDB({'db_location': db_path})
+        db.get_schema()
+        print(f"Database: {n_rows:,} events, built and profiled in {time.perf_counter() - start:.1f}s")
+
+        run_tasks(db)
+        if with_agent:
+            run_agent(db)
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+    parser = ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Rows of the events table")
+    parser.add_argument("--agent", action="store_true", help="Answer the tasks end-to-end with the agent")
+    args = parser.parse_args()
+
+    run_benchmark(args.rows, args.agent)
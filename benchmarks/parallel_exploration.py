@@ -0,0 +1,110 @@
+"""
+Measures the wall time of the automated data exploration, with the goals answered one after the other
+vs at the same time on their own agents, and the time until the first tool call (the parallel goals start
+while the goal list is streamed). The model is a stub with a fixed latency per response, spread over the goals
+of the goal list, which generates the goals, answers each goal with one `python_repl` call running an aggregate
+on a large database, and writes the report: no model is invoked, the tool calls run for real.
+
+    python -m benchmarks.parallel_exploration --rows 1000000 --latency 2.0
+"""
+import os
+import json
+import time
+import asyncio
+import tempfile
+
+from benchmarks.explain_sql import build_database
+from benchmarks.stub_model import StubModel, QUERY_CODE
+from strands_data_analyst.agent import DataAnalystAgent
+from strands_data_analyst.databases import SQLiteDB
+
+
+# Goal question, code answering it
+GOALS = {
+    "Which categories bring the most revenue?":
+        "sql_query = 'SELECT category, SUM(amount) AS amount FROM events GROUP BY category ORDER BY amount DESC'",
+    "How does the revenue evolve over the months?":
+        "sql_query = 'SELECT substr(day, 1, 7) AS month, SUM(amount) AS amount FROM events GROUP BY month'",
+    "Which countries have the most active users?":
+        "sql_query = 'SELECT u.country, COUNT(DISTINCT e.user_id) AS users FROM events e "
+        "JOIN users u ON u.id = e.user_id GROUP BY u.country'",
+}
+
+
+class LatencyStubModel(StubModel):
+    """Model scripting the exploration, answering every request after a fixed latency (in seconds)."""
+    def __init__(self, latency):
+        super().__init__()
+        self.latency = latency
+
+    def get_response(self, messages):
+        """The text chunks or the tool call answering the last message."""
+        content = messages[-1]['content']
+        if any('toolResult' in block for block in content):
+            return ["The analysis is done."], None
+        text = "".join(block.get('text', "") for block in content)
+        if text in GOALS:
+            return None, {'code': GOALS[text] + QUERY_CODE}
+        if "<DOCUMENT>" in text:
+            return ["# Exploration Report"], None
+        goals = [json.dumps({'goal_rationale': "", 'goal_question': question}) for question in GOALS]
+        return ["[\n" + goals[0]] + [",\n" + goal for goal in goals[1:]] + ["\n]"], None
+
+    async def stream(self, messages, tool_specs=None, system_prompt=None, **kwargs):
+        chunks, tool_input = self.get_response(messages)
+        yield {'messageStart': {'role': 'assistant'}}
+        if tool_input is not None:
+            await asyncio.sleep(self.latency)
+            yield {'contentBlockStart': {'start': {'toolUse': {'toolUseId': os.urandom(8).hex(), 'name': 'python_repl'}}}}
+            yield {'contentBlockDelta': {'delta': {'toolUse': {'input': json.dumps(tool_input)}}}}
+            yield {'contentBlockStop': {}}
+            yield {'messageStop': {'stopReason': 'tool_use'}}
+        else:
+            for chunk in chunks:
+                await asyncio.sleep(self.latency / len(chunks))
+                yield {'contentBlockDelta': {'delta': {'text': chunk}}}
+            yield {'contentBlockStop': {}}
+            yield {'messageStop': {'stopReason': 'end_turn'}}
+
+
+def run_exploration(db, latency, parallel, remote_execution):
+    agent = DataAnalystAgent(verbose=False, model=LatencyStubModel(latency), remote_execution=remote_execution)
+    agent.set_db('benchmark', db)
+    start = time.perf_counter()
+    first_tool_call = None
+    answered = []
+    for msg_type, msg in agent.automated_data_exploration(parallel=parallel):
+        if msg_type == 'progress' and msg['type'] == 'tool_start' and first_tool_call is None:
+            first_tool_call = time.perf_counter() - start
+        elif msg_type == 'goal':
+            answered.append(msg['goal_question'])
+    elapsed = time.perf_counter() - start
+    if sorted(answered) != sorted(GOALS):
+        raise Exception(f"Unexpected goals: {answered}")
+    agent.close()
+    return elapsed, first_tool_call
+
+
+def run_benchmark(n_rows, latency, remote_execution):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "events.sqlite")
+        build_database(db_path, n_rows)
+        db = SQLiteDB({'db_location': db_path})
+        db.get_schema()
+
+        print(f"Exploration of {len(GOALS)} goals, {n_rows:,} events, model latency {latency}s ({os.cpu_count()} CPUs)")
+        for parallel in [False, True]:
+            elapsed, first_tool_call = run_exploration(db, latency, parallel, remote_execution)
+            print(f"  {'parallel' if parallel else 'sequential'}: {elapsed:.2f}s, "
+                  f"first tool call after {first_tool_call:.2f}s")
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+    parser = ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Rows of the events table")
+    parser.add_argument("--latency", type=float, default=2.0, help="Latency of a model response, in seconds")
+    parser.add_argument("--remote", action="store_true", help="Run the code in the worker processes")
+    args = parser.parse_args()
+
+    run_benchmark(args.rows, args.latency, args.remote)
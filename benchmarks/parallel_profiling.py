@@ -0,0 +1,67 @@
+"""
+Measures the schema introspection wall time of a database with many tables,
+profiling the tables with 1, 2, 4 and 8 workers.
+
+    python -m benchmarks.parallel_profiling --tables 60 --rows 50000 --executor process
+"""
+import os
+import time
+import random
+import sqlite3
+import tempfile
+
+from strands_data_analyst.databases import SQLiteDB
+from strands_data_analyst.db_profiler import ProfileConfig
+
+
+WORKERS = [1, 2, 4, 8]
+
+
+def build_database(db_path, n_tables, n_rows, n_columns=10, seed=0):
+    rng = random.Random(seed)
+    connection = sqlite3.connect(db_path)
+    for table in range(n_tables):
+        columns = ', '.join(f"col_{col}" for col in range(n_columns))
+        connection.execute(f"CREATE TABLE table_{table} (id INTEGER PRIMARY KEY, {columns});")
+        rows = (
+            [f"value_{rng.randint(0, 10 * (col + 1))}" if col % 2 else rng.randint(0, 1000) for col in range(n_columns)]
+                for _ in range(n_rows))
+        placeholders = ', '.join('?' * n_columns)
+        connection.executemany(
+            f"INSERT INTO table_{table} ({', '.join(f'col_{col}' for col in range(n_columns))}) VALUES ({placeholders});",
+            rows)
+    connection.commit()
+    connection.close()
+
+
+def run_benchmark(n_tables, n_rows, executor, repeat):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "tables.sqlite")
+        build_database(db_path, n_tables, n_rows)
+
+        print(f"Database: {n_tables} tables x {n_rows} rows, {executor} workers, {os.cpu_count()} CPUs (best of {repeat})")
+        baseline = None
+        for workers in WORKERS:
+            config = ProfileConfig(workers=workers, executor=executor)
+            timings = []
+            for _ in range(repeat):
+                # A new instance per run, get_schema() keeps the profiled tables
+                db = SQLiteDB({'db_location': db_path}, profile_config=config)
+                start = time.perf_counter()
+                db.get_schema()
+                timings.append(time.perf_counter() - start)
+            elapsed = min(timings)
+            baseline = baseline or elapsed
+            print(f"  {workers} workers: {elapsed:.3f}s ({baseline / elapsed:.2f}x)")
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+    parser = ArgumentParser()
+    parser.add_argument("--tables", type=int, default=60)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--executor", choices=["thread", "process"], default="process")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    run_benchmark(args.tables, args.rows, args.executor, args.repeat)
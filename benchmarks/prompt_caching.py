@@ -0,0 +1,95 @@
+"""
+Replays a session of queries on a stub model simulating the Bedrock prompt cache, to check which prefix
+of the request is cached, and the cache read/write tokens of each query, with and without prompt caching.
+No model is invoked: the stub answers every query with the same text.
+
+    python -m benchmarks.prompt_caching --tables 30 --queries 5
+"""
+import os
+import json
+import hashlib
+import tempfile
+
+from benchmarks.schema_retrieval import build_database, QUERIES
+from benchmarks.stub_model import StubModel
+from strands_data_analyst.agent import DataAnalystAgent
+from strands_data_analyst.databases import SQLiteDB
+from strands_data_analyst.tokens import count_tokens
+
+
+class CachingStubModel(StubModel):
+    """
+    Model answering with a fixed text, which simulates the prompt cache: each request prefix ending
+    at a `cachePoint` (tools, then system prompt blocks) is written to the cache on the first request,
+    and read from the cache by the following requests with the same prefix.
+    """
+    def __init__(self, answer="Done."):
+        super().__init__()
+        self.answer = answer
+        self.cache = set()
+        self.requests = []
+
+    def get_cache_points(self, tool_specs, system_prompt, system_prompt_content):
+        """The (prefix hash, prefix tokens) of every cache point of the request."""
+        prefix = json.dumps(tool_specs or [], sort_keys=True)
+        points = []
+        for block in system_prompt_content or [{'text': system_prompt or ""}]:
+            if 'cachePoint' in block:
+                points.append((hashlib.sha1(prefix.encode()).hexdigest(), count_tokens(prefix)))
+            else:
+                prefix += block.get('text', "")
+        return points, count_tokens(prefix)
+
+    async def stream(self, messages, tool_specs=None, system_prompt=None, *, system_prompt_content=None, **kwargs):
+        points, system_tokens = self.get_cache_points(tool_specs, system_prompt, system_prompt_content)
+        cached = [(key, tokens) for key, tokens in points if key in self.cache]
+        cache_read = cached[-1][1] if cached else 0
+        cache_write = points[-1][1] - cache_read if points else 0
+        self.cache.update(key for key, _ in points)
+
+        input_tokens = system_tokens + count_tokens(json.dumps(messages)) - cache_read - cache_write
+        self.requests.append({'cached_prefixes': len(cached), 'cache_points': len(points)})
+
+        yield {'messageStart': {'role': 'assistant'}}
+        yield {'contentBlockDelta': {'delta': {'text': self.answer}}}
+        yield {'contentBlockStop': {}}
+        yield {'messageStop': {'stopReason': 'end_turn'}}
+        yield {'metadata': {
+            'usage': {
+                'inputTokens': input_tokens,
+                'outputTokens': count_tokens(self.answer),
+                'totalTokens': input_tokens + cache_read + cache_write + count_tokens(self.answer),
+                'cacheReadInputTokens': cache_read,
+                'cacheWriteInputTokens': cache_write,
+            },
+            'metrics': {'latencyMs': 0}
+        }}
+
+
+def run_benchmark(n_tables, n_queries):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "tables.sqlite")
+        build_database(db_path, n_tables)
+        db = SQLiteDB({'db_location': db_path})
+
+        for prompt_caching in [False, True]:
+            model = CachingStubModel()
+            agent = DataAnalystAgent(verbose=False, model=model, prompt_caching=prompt_caching)
+            agent.set_db('benchmark', db)
+            print(f"Prompt caching: {'on' if prompt_caching else 'off'}")
+            for i, query in enumerate((QUERIES * n_queries)[:n_queries], start=1):
+                usage = agent.query(query)['usage']
+                request = model.requests[-1]
+                print(f"  query {i}: {usage['inputTokens']:6d} uncached, "
+                      f"{usage['cacheReadInputTokens']:6d} cache read, {usage['cacheWriteInputTokens']:6d} cache write "
+                      f"({request['cached_prefixes']}/{request['cache_points']} prefixes cached)")
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+    parser = ArgumentParser()
+    parser.add_argument("--tables", type=int, default=30)
+    parser.add_argument("--queries", type=int, default=5)
+    args = parser.parse_args()
+
+    run_benchmark(args.tables, args.queries)
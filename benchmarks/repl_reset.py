@@ -0,0 +1,78 @@
+"""
+Measures the latency of the first `python_repl` call of a query, with an empty namespace after every state reset
+(the code imports the modules and sets the matplotlib backend) vs the pre-seeded baseline namespace
+(pandas, numpy, matplotlib with the SVG backend, sqlite3 already imported).
+The cold latencies (a new process: interpreter creation, then first call) are measured in a subprocess.
+
+    python -m benchmarks.repl_reset --repeat 20
+"""
+import sys
+import json
+import time
+import statistics
+import subprocess
+
+from strands_data_analyst.python_environment import PythonInterpreter
+
+
+CALL = """
+data_frame = pd.DataFrame({'value': [1, 2, 3]})
+visualization_caption = "caption"
+"""
+
+IMPORTS = """
+import sqlite3
+import numpy as np
+import pandas as pd
+import matplotlib
+matplotlib.use('svg')
+import matplotlib.pyplot as plt
+"""
+
+# Baseline namespace, and first call code
+VARIANTS = {
+    'empty namespace': (False, IMPORTS + CALL),
+    'baseline namespace': (True, CALL),
+}
+
+
+def measure_cold(baseline, code):
+    start = time.perf_counter()
+    interpreter = PythonInterpreter(baseline=baseline)
+    created = time.perf_counter()
+    interpreter.run(code)
+    return created - start, time.perf_counter() - created
+
+
+def measure_warm(baseline, code, repeat):
+    interpreter = PythonInterpreter(baseline=baseline)
+    interpreter.run(code)
+    timings = []
+    for _ in range(repeat):
+        interpreter.clear_state()
+        start = time.perf_counter()
+        interpreter.run(code)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def run_benchmark(repeat):
+    for variant in VARIANTS:
+        creation, cold = json.loads(subprocess.check_output(
+            [sys.executable, "-m", "benchmarks.repl_reset", "--cold", variant]))
+        warm = measure_warm(*VARIANTS[variant], repeat)
+        print(f"{variant:20s}: interpreter creation {creation * 1000:7.1f}ms, first call {cold * 1000:7.1f}ms, "
+              f"first call after a reset {warm * 1000:6.2f}ms (median of {repeat})")
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+    parser = ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--cold", choices=VARIANTS, default=None, help="Measure the cold latencies only, in this process")
+    args = parser.parse_args()
+
+    if args.cold is not None:
+        print(json.dumps(measure_cold(*VARIANTS[args.cold])))
+    else:
+        run_benchmark(args.repeat)
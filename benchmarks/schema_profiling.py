@@ -0,0 +1,110 @@
+"""
+Compares the wall time of the schema introspection of a wide synthetic table:
+the legacy approach running one GROUP BY per column, against the TableProfiler,
+for tables with a growing fraction of high-cardinality columns (unique-ish user ids).
+
+    python -m benchmarks.schema_profiling --rows 200000 --columns 60 --high-cardinality 0 0.5 1
+"""
+import os
+import time
+import random
+import sqlite3
+import tempfile
+
+from strands_data_analyst.databases import SQLiteDB, get_examples, MAX_DISTINCT_VALUES
+
+
+def build_wide_table(db_path, n_rows, n_columns, high_cardinality=0.0, seed=0):
+    rng = random.Random(seed)
+    columns = ["id INTEGER PRIMARY KEY", "code TEXT UNIQUE"]
+    generators = [lambda i: i, lambda i: f"C-{i:08d}"]
+    for col in range(n_columns - len(columns)):
+        kind = col % 4
+        # The high-cardinality columns are spread evenly among the others
+        if int((col + 1) * high_cardinality) > int(col * high_cardinality):
+            columns.append(f"user_{col} TEXT")
+            generators.append(lambda i: f"user_{rng.randint(0, 10 ** 9)}")
+        elif kind == 0:
+            columns.append(f"category_{col} TEXT")
+            generators.append(lambda i, k=col: f"cat_{rng.randint(0, 20 + k)}")
+        elif kind == 1:
+            columns.append(f"flag_{col} INTEGER")
+            generators.append(lambda i: rng.randint(0, 1))
+        elif kind == 2:
+            columns.append(f"amount_{col} REAL")
+            generators.append(lambda i: round(rng.uniform(0, 1000), 2))
+        else:
+            columns.append(f"sparse_{col} TEXT")
+            generators.append(lambda i: None if rng.random() < 0.8 else f"note_{rng.randint(0, 5)}")
+
+    connection = sqlite3.connect(db_path)
+    connection.execute(f"CREATE TABLE wide ({', '.join(columns)});")
+    placeholders = ', '.join('?' * len(columns))
+    rows = ([gen(i) for gen in generators] for i in range(n_rows))
+    connection.executemany(f"INSERT INTO wide VALUES ({placeholders});", rows)
+    connection.commit()
+    connection.close()
+
+
+def legacy_get_schema(db_path):
+    # Same queries as the original per-column introspection, with ties ordered by value to compare the outputs
+    connection = sqlite3.connect(db_path)
+    cursor = connection.cursor()
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
+    schema = {}
+    for (table_name,) in cursor.fetchall():
+        cursor.execute(f'PRAGMA table_info("{table_name}");')
+        schema[table_name] = []
+        for col in cursor.fetchall():
+            _, name, col_type = col[:3]
+            cursor.execute(f'SELECT "{name}", COUNT(*) FROM "{table_name}" GROUP BY 1 ORDER BY COUNT(*) DESC, 1 LIMIT {MAX_DISTINCT_VALUES};')
+            schema[table_name].append({
+                'name': name,
+                'type': col_type,
+                'distinct_values': get_examples(cursor.fetchall())
+            })
+    connection.close()
+    return schema
+
+
+def timed(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def run_benchmark(n_rows, n_columns, high_cardinality, repeat):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "wide.sqlite")
+        build_wide_table(db_path, n_rows, n_columns, high_cardinality)
+
+        legacy_time, legacy_schema = timed(lambda: legacy_get_schema(db_path), repeat)
+        single_pass_time, schema = timed(lambda: SQLiteDB({'db_location': db_path}).get_schema(), repeat)
+
+    mismatches = [
+        legacy['name']
+            for legacy, field in zip(legacy_schema['wide'], schema['wide'])
+                if legacy['distinct_values'] != field['distinct_values']]
+
+    print(f"Table: {n_rows} rows x {n_columns} columns, {high_cardinality:.0%} high-cardinality (best of {repeat})")
+    print(f"  per-column GROUP BY: {legacy_time:.3f}s")
+    print(f"  TableProfiler:       {single_pass_time:.3f}s")
+    print(f"  speed-up: {legacy_time / single_pass_time:.2f}x")
+    print(f"  columns with different examples: {mismatches or 'none'}")
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+    parser = ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--columns", type=int, default=60)
+    parser.add_argument("--high-cardinality", type=float, nargs="+", default=[0.0, 0.5, 1.0],
+                        help="Fractions of high-cardinality columns, one table per fraction")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for high_cardinality in args.high_cardinality:
+        run_benchmark(args.rows, args.columns, high_cardinality, args.repeat)
@@ -0,0 +1,103 @@
+"""
+Measures the system prompt tokens and the schema rendering latency of a database with many tables,
+rendering the full schema vs only the tables relevant to each query (and their join neighbours).
+With `--agent` the queries are also answered end-to-end by the agent (requires the Bedrock credentials).
+
+    python -m benchmarks.schema_retrieval --tables 300 --top-tables 5
+"""
+import os
+import time
+import random
+import sqlite3
+import tempfile
+import itertools
+
+from strands_data_analyst.agent import DataAnalystAgent
+from strands_data_analyst.databases import SQLiteDB
+from strands_data_analyst.db_schema import format_db_schema
+from strands_data_analyst.schema_retrieval import SchemaIndex
+from strands_data_analyst.tokens import count_tokens
+
+
+DOMAINS = [
+    "sales", "finance", "hr", "inventory", "marketing", "support", "shipping", "billing",
+    "web", "partner", "procurement", "legal", "payroll", "analytics", "crm", "retail"]
+ENTITIES = [
+    "customer", "order", "invoice", "payment", "employee", "product", "campaign", "ticket",
+    "shipment", "warehouse", "supplier", "session", "refund", "contract", "account", "region", "store"]
+STATUSES = ["open", "closed", "pending", "cancelled", "approved", "rejected"]
+
+QUERIES = [
+    "What is the total sales order amount per region?",
+    "Which suppliers have the most procurement contracts?",
+    "Show the number of support tickets opened by each customer",
+    "Plot the monthly payroll payments of the employees",
+    "Which marketing campaigns generated the most web sessions?",
+    "How many shipments were cancelled in each warehouse?",
+]
+
+
+def build_database(db_path, n_tables, n_rows=200, seed=0):
+    rng = random.Random(seed)
+    connection = sqlite3.connect(db_path)
+    tables = [f"{domain}_{entity}" for domain, entity in itertools.product(DOMAINS, ENTITIES)]
+    tables += [f"{table}_archive" for table in tables]
+    for table in tables[:n_tables]:
+        domain, entity = table.split('_')[:2]
+        references = rng.sample([other for other in ENTITIES if other != entity], 2)
+        columns = [f"{entity}_name TEXT", "status TEXT", "amount REAL", "created_at TEXT"]
+        columns += [f"{domain}_{reference}_id INTEGER" for reference in references]
+        connection.execute(f"CREATE TABLE {table} (id INTEGER PRIMARY KEY, {', '.join(columns)});")
+        rows = [
+            (f"{entity} {row}", rng.choice(STATUSES), round(rng.uniform(1, 1000), 2),
+             f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+             rng.randint(1, n_rows), rng.randint(1, n_rows))
+                for row in range(n_rows)]
+        connection.executemany(f"INSERT INTO {table} VALUES (NULL, ?, ?, ?, ?, ?, ?);", rows)
+    connection.commit()
+    connection.close()
+
+
+def run_benchmark(n_tables, top_tables, with_agent):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "tables.sqlite")
+        build_database(db_path, n_tables)
+        db = SQLiteDB({'db_location': db_path})
+        db_tables, table_info = db.get_schema(), db.get_table_info()
+
+        full_schema = format_db_schema(db_tables, table_info)
+        start = time.perf_counter()
+        index = SchemaIndex(db_tables, table_info)
+        index_time = time.perf_counter() - start
+
+        print(f"Database: {len(db_tables)} tables, index built in {index_time * 1000:.1f}ms")
+        print(f"Full schema: {count_tokens(full_schema)} tokens")
+        for query in QUERIES:
+            start = time.perf_counter()
+            tables = index.with_join_neighbours(index.search(query, top_tables))
+            schema = format_db_schema({table: db_tables[table] for table in tables}, table_info)
+            elapsed = time.perf_counter() - start
+            print(f"  {count_tokens(schema):6d} tokens, {len(tables):3d} tables, {elapsed * 1000:.1f}ms: {query}")
+
+        if with_agent:
+            for top in [None, top_tables]:
+                agent = DataAnalystAgent(verbose=False, always_reset=True, schema_top_tables=top)
+                agent.set_db('benchmark', db)
+                start = time.perf_counter()
+                for query in QUERIES:
+                    agent.query(query)
+                elapsed = time.perf_counter() - start
+                usage = agent.agent.event_loop_metrics.accumulated_usage
+                print(f"Agent ({'full schema' if top is None else f'top {top} tables'}): "
+                      f"{elapsed / len(QUERIES):.1f}s per query, {usage['inputTokens']} input tokens")
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+    parser = ArgumentParser()
+    parser.add_argument("--tables", type=int, default=300)
+    parser.add_argument("--top-tables", type=int, default=5)
+    parser.add_argument("--agent", action="store_true", help="Answer the queries end-to-end with the agent")
+    args = parser.parse_args()
+
+    run_benchmark(args.tables, args.top_tables, args.agent)
@@ -0,0 +1,63 @@
+"""
+Reports the schema prompt tokens of every database under `data/databases` and of the VisEval databases,
+in the Markdown format vs the compact format (optionally fitted in a token budget).
+
+    python -m benchmarks.schema_tokens --budget 2000
+"""
+import pathlib
+
+from strands_data_analyst.database_manager import LocalDatabaseManager
+from strands_data_analyst.databases import SQLiteDB
+from strands_data_analyst.db_schema import format_db_schema, format_compact_db_schema
+from strands_data_analyst.tokens import count_tokens
+
+
+DATA_DIR = pathlib.Path(__file__).parent.resolve() / ".." / "data"
+VISEVAL_DBS = DATA_DIR / "visEval_dataset" / "databases"
+
+
+def get_databases():
+    manager = LocalDatabaseManager()
+    for db_id in manager.get_list():
+        yield db_id, lambda db_id=db_id: manager.init_db(db_id)
+
+    if VISEVAL_DBS.exists():
+        schema_cache = manager.schema_cache
+        for db_path in sorted(VISEVAL_DBS.glob("*/*.sqlite")):
+            yield f"visEval/{db_path.stem}", lambda db_path=db_path: SQLiteDB(
+                {'db_location': str(db_path)}, schema_cache=schema_cache)
+
+
+def run_report(token_budget):
+    columns = ["markdown", "compact"] + ([f"budget {token_budget}"] if token_budget else [])
+    print(f"{'database':40s} " + " ".join(f"{column:>12s}" for column in columns))
+
+    totals = [0] * len(columns)
+    for db_id, init_db in get_databases():
+        try:
+            db = init_db()
+            db_schema, table_info = db.get_schema(), db.get_table_info()
+        except Exception as e:
+            print(f"{db_id:40s} skipped: {e}")
+            continue
+
+        tokens = [
+            count_tokens(format_db_schema(db_schema, table_info)),
+            count_tokens(format_compact_db_schema(db_schema, table_info))]
+        if token_budget:
+            tokens.append(count_tokens(format_compact_db_schema(db_schema, table_info, token_budget)))
+        totals = [total + count for total, count in zip(totals, tokens)]
+        print(f"{db_id:40s} " + " ".join(f"{count:12,d}" for count in tokens))
+
+    if totals[0]:
+        print(f"{'total':40s} " + " ".join(f"{count:12,d}" for count in totals))
+        print(f"{'saving':40s} " + " ".join(f"{1 - count / totals[0]:12.1%}" for count in totals))
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+    parser = ArgumentParser()
+    parser.add_argument("--budget", type=int, default=None, help="Token budget of the compact schema")
+    args = parser.parse_args()
+
+    run_report(args.budget)
@@ -0,0 +1,75 @@
+"""
+Measures the wall time of a dashboard of independent aggregates on a large database: the queries run one after
+the other in a `python_repl` call, vs all at once by the `run_sql_batch` tool, with 1 to 8 connections.
+The tool calls (LLM round-trips) are counted for a model fetching one aggregate per call.
+The concurrent queries only speed up with several CPU cores (or on I/O), SQLite releasing the GIL while it runs.
+
+    python -m benchmarks.sql_batch --rows 1000000
+"""
+import os
+import time
+import tempfile
+
+from benchmarks.explain_sql import build_database
+from strands_data_analyst.databases import SQLiteDB
+from strands_data_analyst.python_environment import PythonInterpreter
+from strands_data_analyst.sql_batch import SQLBatch
+
+
+DASHBOARD = {
+    'events_per_category': "SELECT category, COUNT(*) AS events FROM events GROUP BY category",
+    'amount_per_month': "SELECT substr(day, 1, 7) AS month, SUM(amount) AS amount FROM events GROUP BY month",
+    'amount_per_country': "SELECT u.country, SUM(e.amount) AS amount FROM events e JOIN users u ON u.id = e.user_id GROUP BY u.country",
+    'top_users': "SELECT user_id, SUM(amount) AS amount FROM events GROUP BY user_id ORDER BY amount DESC LIMIT 10",
+    'daily_events': "SELECT day, COUNT(*) AS events FROM events GROUP BY day",
+    'large_events': "SELECT category, COUNT(*) AS events FROM events WHERE amount > 450 GROUP BY category",
+    'active_users': "SELECT COUNT(DISTINCT user_id) AS users FROM events",
+    'average_amount': "SELECT AVG(amount) AS amount, MIN(amount) AS min_amount, MAX(amount) AS max_amount FROM events",
+}
+
+WORKERS = [1, 2, 4, 8]
+
+
+def run_sequential(interpreter):
+    code = "\n".join(f"{name} = pd.read_sql_query({sql_query!r}, db_conn)" for name, sql_query in DASHBOARD.items())
+    start = time.perf_counter()
+    interpreter.run(code)
+    return time.perf_counter() - start
+
+
+def run_benchmark(n_rows):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "events.sqlite")
+        build_database(db_path, n_rows)
+        db = SQLiteDB({'db_location': db_path})
+        db.get_schema()
+
+        interpreter = PythonInterpreter()
+        interpreter.set_db(db)
+        # Warm up the page cache
+        run_sequential(interpreter)
+
+        print(f"Dashboard of {len(DASHBOARD)} aggregates, {n_rows:,} events ({os.cpu_count()} CPUs)")
+        print(f"  sequential python_repl: {run_sequential(interpreter) * 1000:7.1f}ms, "
+              f"1 tool call ({len(DASHBOARD)} calls when fetching one aggregate per call)")
+        for workers in WORKERS:
+            # The batch does not replace the data-frames of the previous run
+            interpreter.clear_state()
+            batch = SQLBatch(interpreter, max_workers=workers)
+            batch.set_db(db)
+            start = time.perf_counter()
+            output = batch.run(DASHBOARD)
+            elapsed = time.perf_counter() - start
+            if "ERROR" in output:
+                raise Exception(output)
+            print(f"  run_sql_batch, {workers} connections: {elapsed * 1000:7.1f}ms, 1 tool call")
+        interpreter.release_db()
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+    parser = ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Rows of the events table")
+    args = parser.parse_args()
+
+    run_benchmark(args.rows)
@@ -0,0 +1,28 @@
+"""
+Shared by the benchmarks replaying sessions on a stub model, which scripts the responses of the agent:
+no model is invoked, the tool calls run for real.
+"""
+from strands.models.model import Model
+
+
+# Code of the scripted `python_repl` calls, after the assignment of their `sql_query`
+QUERY_CODE = """
+data_frame = pd.read_sql_query(sql_query, db_conn)
+print(data_frame)
+"""
+
+
+class StubModel(Model):
+    """Base of the stub models, which only implement `stream()`: a model configuration, and no structured output."""
+    def __init__(self):
+        self.config = {}
+
+    def update_config(self, **model_config):
+        self.config.update(model_config)
+
+    def get_config(self):
+        return self.config
+
+    async def structured_output(self, output_model, prompt, system_prompt=None, **kwargs):
+        raise NotImplementedError("The stub model has no structured output")
+        yield
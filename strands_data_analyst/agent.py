@@ -1,54 +1,108 @@
-import json
+import time
+import asyncio
+from collections import deque
 
 import boto3
-from json_repair import repair_json
 from jinja2 import Template
 
 from strands import Agent
 from strands.models import BedrockModel
 from strands.handlers.callback_handler import null_callback_handler
+from strands.hooks import BeforeToolCallEvent, AfterToolCallEvent
 from strands.agent.conversation_manager import SlidingWindowConversationManager
 
-from strands_data_analyst.db_schema import format_db_schema
+from strands_data_analyst.db_schema import format_db_schema, format_compact_db_schema
+from strands_data_analyst.schema_retrieval import SchemaIndex
 from strands_data_analyst.databases import SQLiteDB
 from strands_data_analyst.callback_handler import MessageCallbackHandler
 from strands_data_analyst.python_environment import PythonInterpreter
+from strands_data_analyst.execution_pool import RemotePythonInterpreter
+from strands_data_analyst.workspace import Workspace
+from strands_data_analyst.preflight import Preflight
+from strands_data_analyst.query_plan import QueryPlanner
+from strands_data_analyst.sql_batch import SQLBatch
+from strands_data_analyst.json_stream import JSONArrayParser, parse_array_of_objects
+from strands_data_analyst.conversation import DigestConversationManager
 
 
 LLM_HAIKU = "us.anthropic.claude-3-5-haiku-20241022-v1:0"
 LLM_SONNET = "us.anthropic.claude-3-5-sonnet-20241022-v2:0"
 
+SCHEMA_FORMATS = ['markdown', 'compact']
+
+# Query code of the generated code when the query results are cached
+CACHED_QUERY_CODE = "data_frame = read_sql_query(sql_query)"
+
+# Latest queries whose relevant tables are kept in the schema of the wide databases
+SCHEMA_HISTORY_QUERIES = 3
+
+USAGE_FIELDS = ['inputTokens', 'outputTokens', 'cacheReadInputTokens', 'cacheWriteInputTokens']
+
+# Analysis goals generated by the automated data exploration
+EXPLORATION_GOALS = 3
+# Goal agents running at the same time in the parallel exploration, each with its own interpreter (worker)
+MAX_PARALLEL_GOALS = 4
+
+
+def iterate_async(events):
+    """
+    Iterates an async generator from synchronous code (e.g. Streamlit), on an event loop of its own.
+    The generator runs in a single task, the context variables (e.g. the tracing spans) being per task.
+    """
+    loop = asyncio.new_event_loop()
+    items = asyncio.Queue()
+
+    async def run():
+        try:
+            async for item in events:
+                items.put_nowait(('item', item))
+            items.put_nowait(('end', None))
+        except Exception as e:
+            items.put_nowait(('error', e))
+
+    task = loop.create_task(run())
+    try:
+        while True:
+            kind, value = loop.run_until_complete(items.get())
+            if kind == 'end':
+                break
+            if kind == 'error':
+                raise value
+            yield value
+    finally:
+        task.cancel()
+        loop.run_until_complete(asyncio.gather(task, return_exceptions=True))
+        loop.run_until_complete(loop.shutdown_default_executor())
+        loop.close()
+
 
 class DataAnalystAgent:
     SYSTEM_PROMPT=Template("""
 You are an expert Data Analyst who can solve any data analysis task coding in Python.
 You can use the `python_repl` tool to execute the Python code.
-{% if db_schema %}
-Data analysis requests (queries, visualizations, etc) from the user are referencing a {{db_type}} database.
-To open a connection to the database use the following code:
-```python
-{{db_conn_open}}
-
-# Data Analysis code
-...
-
-{{db_conn_close}}
-```
+{% if db_type %}
+Data analysis requests (queries, visualizations, etc) from the user are referencing a {{db_type}} database, whose schema is given at the end.
+A read-only connection to the database is already open in the `db_conn` variable: use it directly, and do not close it.
 
-This is the DB schema:
-{{db_schema}}
+The `pd` (pandas), `np` (numpy), `plt` (matplotlib.pyplot, with the SVG backend) and `sqlite3` modules are already imported.
 
 You can run SQL queries to fetch the relevant data using this code:
 ```python
 import pandas as pd
 
 sql_query = "SELECT ..."
-data_frame = pd.read_sql_query(sql_query, db_conn)
+{{db_query_code}}
 ```
 Always keep the SQL query in a `sql_query` variable and the pandas data-frame in a `data_frame` variable for later inspection.
-
+Filter and join the tables on the primary key and indexed columns when possible, following the join graph, to avoid full table scans.
+Aggregate the data in SQL rather than fetching whole tables, especially for the tables with many rows.
+{% if sql_batch_tool %}To fetch several independent results (e.g. the aggregates of a dashboard), run all their queries at once with the `run_sql_batch` tool: their data-frames are then available in the Python REPL under their names, which must be new variable names.
+{% endif %}{% if explain_tool %}Before running a query which may be expensive (e.g. joining, sorting or aggregating large tables, or filtering on columns which are not indexed), check its plan with the `explain_sql` tool, and rewrite the query if it is flagged as expensive.
+{% endif %}{% if preflight %}The code is checked before its execution: the code running SQL queries in loops, or aggregating whole large tables with pandas, is rejected, and the `SELECT *` queries of whole large tables are limited to a preview.
+{% endif %}
 You can then further analyze this data-frame to answer the user query.
 Print all the information you might need to answer the user query.
+Long outputs are truncated, and the data-frames with many rows are printed as a summary: print aggregates or selected rows instead.
 
 If a `visualization` could enrich the answer, you should:
 1. Write a `visualization_caption` about the visualization you want to generate.
@@ -75,6 +129,18 @@ It is important that you use the variable names `visualization` for the figure a
 Do not invoke `data_frame.plot`, only the `visualization` `matplotlib.figure.Figure` will be visible to the user.
 {% endif %}""")
 
+    # Rendered after the instructions, so that the instructions are a prefix shared by all the schemas
+    SCHEMA_PROMPT=Template("""
+This is the DB schema{% if n_tables %} of the tables relevant to the request (out of {{n_tables}} tables in the database){% endif %}:
+{{db_schema}}
+""")
+
+    WORKSPACE_PROMPT=Template("""{{query}}
+
+Data-frames kept from the previous queries (reuse them rather than querying the database again):
+{{inventory}}
+""")
+
     DATA_REPORT_PROMPT=Template("""
 You are running a data analysis session with the user, and you need to summarize all the information and insights into the following MarkDown document:
 <DOCUMENT>
@@ -93,52 +159,149 @@ You should return to the user only the final Markdown document text, without any
 """)
 
     DATA_EXPLORATION=Template("""
-You should suggest three insightful data analysis goals for the given database schema.
+You should suggest {{n_goals}} insightful data analysis goals for the given database schema.
 
-You should return a single JSON data-structure with a list of dictionaries containing the following fields:
+You should return a single JSON data-structure with a list of {{n_goals}} dictionaries containing the following fields:
 - `goal_rationale`: a rationale of why this is an interesting analysis goal, describing what new insights we will gain.
 - `goal_question`: the goal description formulated as a question to be answered.
 
-Output only JSON data, without adding any other comment:
+Output only JSON data, without adding any other comment, one dictionary per goal:
 [
   {
     "goal_rationale": "",
     "goal_question": ""
   },
-  {
-    "goal_rationale": "",
-    "goal_question": ""
-  },
-  {
-    "goal_rationale": "",
-    "goal_question": ""
-  }
+  ...
 ]
 """)
     def __init__(self,
                  verbose=True,
                  always_reset=False,
                  img_handler=None,
-                 conversation_window=40):
-        self.python_interpreter = PythonInterpreter()
-        self.agent = Agent(
-            model=BedrockModel(
+                 conversation_window=40,
+                 conversation_token_budget=None,
+                 schema_top_tables=None,
+                 schema_history_queries=SCHEMA_HISTORY_QUERIES,
+                 schema_format='markdown',
+                 schema_token_budget=None,
+                 model=None,
+                 prompt_caching=False,
+                 remote_execution=False,
+                 query_cache=True,
+                 workspace=False,
+                 telemetry=False,
+                 profile_dir=None,
+                 preflight=False,
+                 explain_tool=False,
+                 sql_batch_tool=True):
+        if schema_format not in SCHEMA_FORMATS:
+            raise Exception(f"Unknown schema format: {schema_format}")
+
+        # The goal agents of the parallel exploration are created with the same options (not verbose)
+        self.options = {
+            'verbose': verbose,
+            'conversation_window': conversation_window,
+            'conversation_token_budget': conversation_token_budget,
+            'schema_top_tables': schema_top_tables,
+            'schema_history_queries': schema_history_queries,
+            'schema_format': schema_format,
+            'schema_token_budget': schema_token_budget,
+            'prompt_caching': prompt_caching,
+            'remote_execution': remote_execution,
+            'query_cache': query_cache,
+            'workspace': workspace,
+            'telemetry': telemetry,
+            'profile_dir': profile_dir,
+            'preflight': preflight,
+            'explain_tool': explain_tool,
+            'sql_batch_tool': sql_batch_tool
+        }
+
+        # The remote interpreter runs the code in a pre-warmed worker process, with time and memory limits
+        # With a workspace, the data-frames of a query are kept for the following ones
+        # With telemetry, every tool call is measured (and profiled, with a profile directory)
+        interpreter_class = RemotePythonInterpreter if remote_execution else PythonInterpreter
+        self.python_interpreter = interpreter_class(
+            workspace=Workspace() if workspace else None,
+            telemetry=telemetry,
+            profile_dir=profile_dir)
+        self.telemetry = telemetry
+        self.query_count = 0
+        self.current_query = None
+        # The `explain_sql` tool returns the query plans, without running the queries
+        self.query_planner = QueryPlanner(telemetry=telemetry) if explain_tool else None
+        # The `run_sql_batch` tool runs independent queries at the same time, storing their results in the interpreter
+        self.sql_batch = SQLBatch(self.python_interpreter) if sql_batch_tool else None
+        tools = [self.python_interpreter.get_tool()]
+        for extra_tool in [self.query_planner, self.sql_batch]:
+            if extra_tool is not None:
+                tools.append(extra_tool.get_tool())
+        if model is None:
+            model = BedrockModel(
                 model_id=LLM_HAIKU,
-                boto_session=boto3.Session()),
-            tools=[self.python_interpreter.get_tool()],
+                boto_session=boto3.Session())
+        # With a token budget, the old tool results are digested and the old queries folded into a summary,
+        # otherwise the oldest messages are dropped beyond the window
+        if conversation_token_budget is not None:
+            self.conversation_manager = DigestConversationManager(token_budget=conversation_token_budget)
+        else:
+            self.conversation_manager = SlidingWindowConversationManager(window_size=conversation_window)
+        self.agent = Agent(
+            model=model,
+            tools=tools,
             callback_handler=MessageCallbackHandler() if verbose else null_callback_handler,
-            conversation_manager=SlidingWindowConversationManager(window_size=conversation_window),
+            conversation_manager=self.conversation_manager,
             system_prompt=DataAnalystAgent.SYSTEM_PROMPT.render())
+        # The tool calls of the streamed queries are reported to the listener
+        self.agent.hooks.add_callback(BeforeToolCallEvent, self.on_tool_start)
+        self.agent.hooks.add_callback(AfterToolCallEvent, self.on_tool_end)
+        self.tool_listener = None
+        self.tool_starts = {}
         self.always_reset = always_reset
         self.db_id = None
+        self.db = None
         self.db_schema = None
         self.dataset_context = None
 
+        # Databases with more tables get only the tables relevant to each query in the schema,
+        # with the tables of the latest queries: the system prompt is only rendered again when the tables change
+        self.schema_top_tables = schema_top_tables
+        self.schema_index = None
+        self.query_tables = deque(maxlen=schema_history_queries)
+        self.prompt_tables = None
+
+        # The compact format fits the schema in the token budget, if any
+        self.schema_format = schema_format
+        self.schema_token_budget = schema_token_budget
+
+        # Cache checkpoints after the instructions and after the schema, reused by all the turns
+        self.prompt_caching = prompt_caching
+
+        # The `read_sql_query` function of the generated code caches the query results
+        self.query_cache = query_cache
+
+        # The generated code is checked before its execution, against the row counts of the tables
+        self.preflight = preflight
+
         self.img_handler = img_handler
         self.document = ""
 
+    @property
+    def workspace(self):
+        """
+        The workspace of the interpreter, None when disabled. With `remote_execution`, the data-frames
+        are kept by the copy of the worker process: use the interpreter methods to list and clear them.
+        """
+        return self.python_interpreter.workspace
+
     def reset(self):
         self.agent.messages = []
+        if isinstance(self.conversation_manager, DigestConversationManager):
+            self.conversation_manager.reset()
+        self.query_tables.clear()
+        if self.workspace is not None:
+            self.python_interpreter.clear_workspace()
+            self.query_count = 0
         
         if self.img_handler is not None:
             self.img_handler.reset()
@@ -151,15 +314,107 @@ Output only JSON data, without adding any other comment:
         self.reset()
 
         self.db_id = db_id
-        self.db_schema = format_db_schema(db.get_schema())
-        db_conn_open, db_conn_close = db.get_connection_code()
-        
-        self.agent.system_prompt = DataAnalystAgent.SYSTEM_PROMPT.render({
-            'db_type': db.DB_TYPE,
-            'db_schema': self.db_schema,
-            'db_conn_open': db_conn_open,
-            'db_conn_close': db_conn_close
+        self.db = db
+        self.db_tables = db.get_schema()
+        self.table_info = db.get_table_info()
+        self.db_schema = self.format_schema(self.db_tables)
+
+        self.schema_index = None
+        if self.schema_top_tables is not None and len(self.db_tables) > self.schema_top_tables:
+            self.schema_index = SchemaIndex(self.db_tables, self.table_info)
+
+        self.connect_db()
+
+    def share_db(self, agent):
+        """Uses the database of another agent, with its profiled schema, its schema index and its connection pool."""
+        self.db_id = agent.db_id
+        self.db = agent.db
+        self.db_tables = agent.db_tables
+        self.table_info = agent.table_info
+        self.db_schema = agent.db_schema
+        self.schema_index = agent.schema_index
+        self.connect_db()
+
+    def connect_db(self):
+        self.python_interpreter.set_db(self.db, query_cache=self.query_cache)
+        self.python_interpreter.set_preflight(Preflight(self.table_info) if self.preflight else None)
+        if self.query_planner is not None:
+            self.query_planner.set_db(self.db, self.db_tables, self.table_info)
+        if self.sql_batch is not None:
+            self.sql_batch.set_db(self.db)
+
+        self.set_system_prompt(self.db_schema)
+
+    def create_goal_agent(self):
+        """
+        An agent with its own conversation and interpreter, sharing the model, the database and the images.
+        It does not print its messages, which would be interleaved with those of the other goals.
+        """
+        agent = DataAnalystAgent(
+            img_handler=self.img_handler, model=self.agent.model, **{**self.options, 'verbose': False})
+        agent.share_db(self)
+        return agent
+
+    def close(self):
+        self.python_interpreter.close()
+
+    def format_schema(self, db_tables):
+        if self.schema_format == 'compact':
+            return format_compact_db_schema(db_tables, self.table_info, self.schema_token_budget)
+        return format_db_schema(db_tables, self.table_info)
+
+    def set_system_prompt(self, db_schema, n_tables=None, tables=None):
+        """Renders the system prompt with the schema of the `tables` (all the tables when None)."""
+        self.prompt_tables = tables
+        instructions = DataAnalystAgent.SYSTEM_PROMPT.render({
+            'db_type': self.db.DB_TYPE,
+            'db_query_code': CACHED_QUERY_CODE if self.query_cache else self.db.QUERY_CODE,
+            'preflight': self.preflight,
+            'explain_tool': self.query_planner is not None,
+            'sql_batch_tool': self.sql_batch is not None
         })
+        schema = DataAnalystAgent.SCHEMA_PROMPT.render({
+            'db_schema': db_schema,
+            'n_tables': n_tables
+        })
+        if not self.prompt_caching:
+            self.agent.system_prompt = instructions + schema
+            return
+
+        self.agent.system_prompt = [
+            {'text': instructions},
+            {'cachePoint': {'type': 'default'}},
+            {'text': schema},
+            {'cachePoint': {'type': 'default'}}
+        ]
+
+    def get_usage(self):
+        usage = self.agent.event_loop_metrics.accumulated_usage
+        return {key: usage.get(key, 0) for key in USAGE_FIELDS}
+
+    def get_query_tables(self, query):
+        """
+        The tables relevant to the query and to the latest queries of the conversation, with their join neighbours.
+        None (the full schema) when no table matches them.
+        """
+        self.query_tables.append(set(self.schema_index.search(query, self.schema_top_tables)))
+        selected_tables = set().union(*self.query_tables)
+        if not selected_tables:
+            return None
+        return frozenset(self.schema_index.with_join_neighbours(selected_tables))
+
+    def set_query_schema(self, query):
+        """Renders the system prompt with the schema of the query tables, if they changed."""
+        tables = self.get_query_tables(query)
+        if tables == self.prompt_tables:
+            return
+        if tables is None:
+            self.set_system_prompt(self.db_schema)
+            return
+
+        db_schema = self.format_schema(
+            {table: table_schema for table, table_schema in self.db_tables.items() if table in tables})
+        self.set_system_prompt(db_schema, len(self.db_tables), tables)
 
     def generate_report(self):
         response = self.agent(
@@ -170,39 +425,263 @@ Output only JSON data, without adding any other comment:
         self.document = response.message['content'][0]['text'].strip()
         return self.document
 
-    def query(self, query):
+    def start_query(self, query):
+        """Prepares the state for the query, returning its prompt and the token usage before it."""
         if self.always_reset:
             self.reset()
         
         self.python_interpreter.clear_state()
-        output = self.agent(query)
+        if self.schema_index is not None:
+            self.set_query_schema(query)
+        usage = self.get_usage()
+        self.query_count += 1
+        self.current_query = query
+        prompt = query
+        if self.workspace is not None:
+            inventory = self.python_interpreter.get_workspace_inventory()
+            if inventory:
+                prompt = DataAnalystAgent.WORKSPACE_PROMPT.render({'query': query, 'inventory': inventory})
+        return prompt, usage
+
+    def get_response(self, output, usage, agent_time):
+        if self.workspace is not None:
+            self.python_interpreter.save_workspace(self.current_query, self.query_count)
         
         response = {
-            'answer': output.message['content'][0]['text'].strip()
+            'answer': output.message['content'][0]['text'].strip(),
+            'usage': {key: count - usage[key] for key, count in self.get_usage().items()}
         }
         for var_name in ['sql_query', 'data_frame', 'visualization', 'visualization_caption']:
             if var_name in self.python_interpreter.state:
                 response[var_name] = self.python_interpreter.state[var_name]
         
+        start = time.perf_counter()
         if 'visualization' in response and self.img_handler is not None:
             response['visualization'] = self.img_handler.save_img(
                 response['visualization'],
                 response.get("visualization_caption"))
-            
-        return response
 
-    def automated_data_exploration(self):
-        response = self.agent(
-            DataAnalystAgent.DATA_EXPLORATION.render({
-                'db_schema': self.db_schema,
-            }))
-        goals = json.loads(repair_json(response.message['content'][0]['text']))
-
-        for i, goal in enumerate(goals, start=1):
-            goal['goal_progress'] = f"[{i}/{len(goals)}]"
-            yield 'goal', goal
+        if self.telemetry:
+            response['telemetry'] = self.get_telemetry(agent_time, time.perf_counter() - start, response['usage'])
+        return response
 
-            yield 'query_response', self.query(goal['goal_question'])
+    def query(self, query):
+        prompt, usage = self.start_query(query)
+        start = time.perf_counter()
+        output = self.agent(prompt)
+        return self.get_response(output, usage, time.perf_counter() - start)
+
+    def on_tool_start(self, event):
+        tool_use = event.tool_use
+        self.tool_starts[tool_use['toolUseId']] = time.perf_counter()
+        if self.tool_listener is not None:
+            self.tool_listener({
+                'type': 'tool_start',
+                'tool_use_id': tool_use['toolUseId'],
+                'name': tool_use['name'],
+                'input': tool_use['input']
+            })
+
+    def on_tool_end(self, event):
+        tool_use = event.tool_use
+        start = self.tool_starts.pop(tool_use['toolUseId'], time.perf_counter())
+        if self.tool_listener is not None:
+            result = event.result
+            self.tool_listener({
+                'type': 'tool_end',
+                'tool_use_id': tool_use['toolUseId'],
+                'name': tool_use['name'],
+                'status': result['status'],
+                'output': "\n".join(item['text'] for item in result['content'] if 'text' in item),
+                'elapsed': time.perf_counter() - start
+            })
+
+    async def stream_query_async(self, query):
+        """
+        Runs the query, yielding its events as they happen:
+        - `text_delta`: the text generated by the model (`text`),
+        - `tool_start`: a tool call starting (`tool_use_id`, `name`, and `input`, e.g. the code of `python_repl`),
+        - `tool_end`: a tool call done (`tool_use_id`, `name`, `status`, `output`, and `elapsed` seconds),
+        - `response`: finally, the response of `query()` (`response`).
+        """
+        prompt, usage = self.start_query(query)
+        loop = asyncio.get_running_loop()
+        events = asyncio.Queue()
+
+        async def run_agent():
+            try:
+                async for event in self.agent.stream_async(prompt):
+                    if 'data' in event:
+                        events.put_nowait({'type': 'text_delta', 'text': event['data']})
+                    elif 'result' in event:
+                        events.put_nowait({'type': 'result', 'result': event['result']})
+            except Exception as e:
+                events.put_nowait({'type': 'error', 'error': e})
+
+        # The tool hooks may run outside of the event loop thread
+        self.tool_listener = lambda event: loop.call_soon_threadsafe(events.put_nowait, event)
+        start = time.perf_counter()
+        task = asyncio.create_task(run_agent())
+        try:
+            while True:
+                event = await events.get()
+                if event['type'] == 'error':
+                    raise event['error']
+                if event['type'] == 'result':
+                    break
+                yield event
+        finally:
+            self.tool_listener = None
+            if not task.done():
+                task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        # The visualization rendering does not block the other queries of the event loop
+        response = await asyncio.to_thread(self.get_response, event['result'], usage, time.perf_counter() - start)
+        yield {'type': 'response', 'response': response}
+
+    def stream_query(self, query):
+        """`stream_query_async()` for the synchronous callers."""
+        return iterate_async(self.stream_query_async(query))
+
+    def get_telemetry(self, agent_time, render_time, usage):
+        """The events of the tool calls of the query, and a query event splitting its time between model and tools."""
+        events = self.python_interpreter.pop_events()
+        if self.query_planner is not None:
+            events += self.query_planner.pop_events()
+        tool_time = sum(event.get('wall_time', 0.0) for event in events)
+        events.append({
+            'event': 'query',
+            'wall_time': agent_time + render_time,
+            'tool_calls': len(events),
+            'tool_time': tool_time,
+            'sql_time': sum(event.get('sql_time', 0.0) for event in events),
+            'model_time': agent_time - tool_time,
+            'render_time': render_time,
+            **usage
+        })
+        for event in events:
+            event['query'] = self.query_count
+        return events
+
+    async def generate_goals_async(self):
+        """
+        Yields the analysis goals as soon as they are complete in the streamed model output,
+        parsing the whole output only when no goal could be parsed incrementally.
+        """
+        self.set_system_prompt(self.db_schema)
+        parser = JSONArrayParser()
+        count = 0
+        text = ""
+        async for event in self.agent.stream_async(
+                DataAnalystAgent.DATA_EXPLORATION.render({
+                    'db_schema': self.db_schema,
+                    'n_goals': EXPLORATION_GOALS
+                })):
+            if 'data' in event:
+                text += event['data']
+                goals = parser.feed(event['data'])
+            elif 'result' in event and count == 0:
+                goals = parse_array_of_objects(text)
+            else:
+                continue
+
+            for goal in goals:
+                if isinstance(goal, dict) and 'goal_question' in goal:
+                    count += 1
+                    # The number of goals is only known at the end of the stream
+                    goal['goal_progress'] = f"[Goal {count}]"
+                    yield goal
+
+    async def explore_goals_async(self, goals, max_parallel_goals=MAX_PARALLEL_GOALS):
+        """
+        Runs the goals at the same time, each on its own goal agent started as soon as the goal is generated,
+        with at most `max_parallel_goals` goal agents (and their workers) at once:
+        yields their progress events (with their `goal`) as they happen, and their goal and response
+        in completion order. A failed goal gets an error response, without stopping the other goals.
+        The conversations of the answered goals are then merged into the conversation of the agent,
+        in the same order, for the report.
+        """
+        events = asyncio.Queue()
+        slots = asyncio.Semaphore(max_parallel_goals)
+        tasks = []
+        done = []
+
+        async def run_goal(goal):
+            async with slots:
+                events.put_nowait((goal, None, {'type': 'query_start', 'question': goal['goal_question']}))
+                agent = None
+                try:
+                    agent = self.create_goal_agent()
+                    async for event in agent.stream_query_async(goal['goal_question']):
+                        events.put_nowait((goal, agent, event))
+                except Exception as e:
+                    events.put_nowait((goal, None, {'type': 'goal_error', 'error': e}))
+                finally:
+                    if agent is not None:
+                        agent.close()
+
+        async def start_goals():
+            try:
+                async for goal in goals:
+                    tasks.append(asyncio.create_task(run_goal(goal)))
+            except Exception as e:
+                events.put_nowait((None, None, {'type': 'error', 'error': e}))
+            events.put_nowait((None, None, {'type': 'goals_end'}))
+
+        producer = asyncio.create_task(start_goals())
+        try:
+            generating = True
+            finished = 0
+            while generating or finished < len(tasks):
+                goal, agent, event = await events.get()
+                if event['type'] == 'error':
+                    raise event['error']
+                if event['type'] == 'goals_end':
+                    generating = False
+                elif event['type'] == 'goal_error':
+                    finished += 1
+                    yield 'progress', {'type': 'query_end', 'goal': goal['goal_progress']}
+                    yield 'goal', goal
+                    yield 'query_response', {'answer': f"The goal could not be answered: {event['error']}"}
+                elif event['type'] != 'response':
+                    yield 'progress', {**event, 'goal': goal['goal_progress']}
+                else:
+                    finished += 1
+                    done.append(agent)
+                    yield 'progress', {'type': 'query_end', 'goal': goal['goal_progress']}
+                    yield 'goal', goal
+                    yield 'query_response', event['response']
+
+            # The agent conversation is complete once the goals are generated
+            for agent in done:
+                self.agent.messages.extend(agent.agent.messages)
+        finally:
+            for task in [producer] + tasks:
+                task.cancel()
+            await asyncio.gather(producer, *tasks, return_exceptions=True)
+            await goals.aclose()
+
+    def automated_data_exploration(self, parallel=False, max_parallel_goals=MAX_PARALLEL_GOALS):
+        """
+        Generates analysis goals and answers them, then writes the report. With `parallel`, every goal
+        starts on its own agent as soon as it is generated (at most `max_parallel_goals` at once),
+        and the goals are yielded in completion order. Otherwise the goals are answered one after the other,
+        once they are all generated.
+        """
+        if parallel:
+            yield from iterate_async(self.explore_goals_async(self.generate_goals_async(), max_parallel_goals))
+        else:
+            # The goals are answered by the agent generating them, which cannot run a query while it streams
+            # the goal list: the whole list is generated first
+            for goal in list(iterate_async(self.generate_goals_async())):
+                yield 'goal', goal
+
+                for event in self.stream_query(goal['goal_question']):
+                    if event['type'] == 'response':
+                        yield 'query_response', event['response']
+                    else:
+                        yield 'progress', event
 
         yield 'report', self.generate_report()
 
@@ -0,0 +1,199 @@
+import os
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from urllib.parse import quote
+
+
+MMAP_SIZE = 256 * 1024 * 1024
+# Negative values are in KiB
+CACHE_SIZE = -64 * 1024
+
+# Idle connections kept open by each pool
+MAX_IDLE_CONNECTIONS = 8
+
+# Methods of the DuckDB connections running a query, and of their results fetching its rows
+QUERY_METHODS = {'execute', 'executemany', 'sql', 'query'}
+FETCH_METHODS = {'df', 'fetchdf', 'fetch_df', 'fetchall', 'fetchone', 'fetchmany', 'fetchnumpy', 'arrow', 'fetch_arrow_table', 'pl'}
+
+
+def read_only_uri(db_path, immutable=False):
+    uri = f"file:{quote(os.path.abspath(db_path))}?mode=ro"
+    if immutable:
+        uri += "&immutable=1"
+    return uri
+
+
+class RecordedCursor(sqlite3.Cursor):
+    """Cursor adding the time of its queries and fetches, and the fetched rows, to the recorder of its connection."""
+    def record(self, function, *args, queries=0):
+        recorder = getattr(self.connection, 'recorder', None)
+        if recorder is None:
+            return function(*args)
+        start = time.perf_counter()
+        result = function(*args)
+        rows = len(result) if isinstance(result, list) else int(isinstance(result, tuple))
+        recorder.add_sql(time.perf_counter() - start, rows, queries)
+        return result
+
+    def execute(self, *args):
+        return self.record(super().execute, *args, queries=1)
+
+    def executemany(self, *args):
+        return self.record(super().executemany, *args, queries=1)
+
+    def fetchone(self):
+        return self.record(super().fetchone)
+
+    def fetchmany(self, *args):
+        return self.record(super().fetchmany, *args)
+
+    def fetchall(self):
+        return self.record(super().fetchall)
+
+    def __next__(self):
+        return self.record(super().__next__)
+
+
+class SharedSQLiteConnection(sqlite3.Connection):
+    """
+    SQLite connection lent to the generated code: `close()` is a no-op, the connection is owned by its pool.
+    It is still a `sqlite3.Connection`, so pandas reads from it natively.
+    While a `recorder` is set, the queries of its cursors are measured (see `RecordedCursor`).
+    """
+    recorder = None
+
+    def cursor(self, factory=RecordedCursor):
+        return super().cursor(factory)
+
+    def execute(self, *args):
+        return self.cursor().execute(*args)
+
+    def executemany(self, *args):
+        return self.cursor().executemany(*args)
+
+    def close(self):
+        pass
+
+    def terminate(self):
+        sqlite3.Connection.close(self)
+
+
+class RecordedResult:
+    """Proxy of a DuckDB result (or relation), adding the time of its fetches, and the fetched rows, to a recorder."""
+    def __init__(self, result, recorder):
+        self._result = result
+        self._recorder = recorder
+
+    def __getattr__(self, name):
+        attribute = getattr(self._result, name)
+        if name not in FETCH_METHODS or not callable(attribute):
+            return attribute
+
+        def fetch(*args, **kwargs):
+            start = time.perf_counter()
+            data = attribute(*args, **kwargs)
+            rows = len(data) if hasattr(data, '__len__') else getattr(data, 'num_rows', 0)
+            self._recorder.add_sql(time.perf_counter() - start, rows)
+            return data
+        return fetch
+
+
+class SharedConnection:
+    """
+    Proxy of a (non SQLite) connection lent to the generated code, ignoring `close()`.
+    While a `recorder` is set, its queries and the fetches of their results are measured.
+    """
+    def __init__(self, connection):
+        self._connection = connection
+        self.recorder = None
+
+    def __getattr__(self, name):
+        attribute = getattr(self._connection, name)
+        if self.recorder is None or name not in QUERY_METHODS:
+            return attribute
+
+        recorder = self.recorder
+
+        def query(*args, **kwargs):
+            start = time.perf_counter()
+            result = attribute(*args, **kwargs)
+            recorder.add_sql(time.perf_counter() - start, 0, 1)
+            return RecordedResult(result, recorder)
+        return query
+
+    def close(self):
+        pass
+
+    def terminate(self):
+        self._connection.close()
+
+
+def connect_read_only(db_path, immutable=True, check_same_thread=True, factory=sqlite3.Connection):
+    """
+    Opens a read-only SQLite connection tuned for scans: large memory map and page cache.
+    An `immutable` connection skips all the locking, it is not used when the database has a pending
+    write-ahead log, since its content would be ignored.
+    """
+    immutable = immutable and not os.path.exists(str(db_path) + "-wal")
+    connection = sqlite3.connect(
+        read_only_uri(db_path, immutable),
+        uri=True,
+        check_same_thread=check_same_thread,
+        factory=factory)
+    connection.execute(f"PRAGMA mmap_size={MMAP_SIZE};")
+    connection.execute(f"PRAGMA cache_size={CACHE_SIZE};")
+    return connection
+
+
+class ConnectionPool:
+    """
+    Pool of shared connections to a database, opened by the `connect` function.
+    A connection is lent to one user at a time: a new one is opened when none is idle,
+    and at most `max_idle` released connections are kept open for reuse.
+    """
+    def __init__(self, connect, max_idle=MAX_IDLE_CONNECTIONS):
+        self.connect = connect
+        self.max_idle = max_idle
+        self.idle = []
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            if self.idle:
+                return self.idle.pop()
+        return self.connect()
+
+    def release(self, connection):
+        with self.lock:
+            if len(self.idle) < self.max_idle:
+                self.idle.append(connection)
+                return
+        connection.terminate()
+
+    @contextmanager
+    def connection(self):
+        connection = self.acquire()
+        try:
+            yield connection
+        finally:
+            self.release(connection)
+
+    def close(self):
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for connection in idle:
+            connection.terminate()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_connection_pool(key, connect):
+    """The pool shared by all the sessions using the database identified by `key`."""
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(connect)
+        return _pools[key]
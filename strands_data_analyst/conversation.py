@@ -0,0 +1,241 @@
+import re
+import ast
+import json
+
+from strands.agent.conversation_manager import ConversationManager
+from strands.types.exceptions import ContextWindowOverflowException
+
+from strands_data_analyst.preflight import QUERY_FUNCTIONS, get_name
+from strands_data_analyst.tokens import count_tokens
+
+
+# Tokens of the conversation history sent with each request
+CONVERSATION_TOKEN_BUDGET = 20_000
+
+# Tokens of the summary of the queries folded out of the history, the oldest entries being dropped beyond it
+SUMMARY_TOKEN_BUDGET = 1_000
+
+# Latest queries whose tool results are kept whole, and latest queries never folded into the summary
+KEEP_RESULTS_QUERIES = 1
+KEEP_QUERIES = 2
+
+# Queries kept as messages, the older ones being folded into the summary even within the token budget
+# (the sliding window keeps 10 queries of 4 messages: the history must stay smaller when the results are small)
+MAX_QUERIES = 5
+
+# Tool results shorter than this are not digested
+MIN_DIGEST_TOKENS = 100
+
+# Output lines kept by a digest, and characters kept of each line, SQL query, question, tool result and answer
+DIGEST_LINES = 3
+DIGEST_LINE_CHARS = 160
+DIGEST_SQL_CHARS = 300
+SUMMARY_QUESTION_CHARS = 200
+SUMMARY_RESULT_CHARS = 200
+SUMMARY_ANSWER_CHARS = 400
+
+DIGEST_PREFIX = "[Digest of an earlier tool result]"
+SUMMARY_PREFIX = "[Summary of the earlier queries of the session, their messages were removed]"
+
+FRAME_SHAPE = re.compile(
+    r"(?:DataFrame with [\d,]+ rows x [\d,]+ columns|Series with [\d,]+ rows|\[\d+ rows x \d+ columns\])")
+FRAME_DTYPES = re.compile(r"^dtypes: (.*)$", re.MULTILINE)
+DTYPE = re.compile(r"(\S+): \w+(?:, |$)")
+
+
+def shorten(text, max_chars):
+    text = " ".join(text.split())
+    return text if len(text) <= max_chars else text[:max_chars - 3] + "..."
+
+
+def count_message_tokens(messages):
+    """Approximate number of tokens of the text, tool inputs and tool results of the messages."""
+    tokens = 0
+    for message in messages:
+        for block in message['content']:
+            if 'text' in block:
+                tokens += count_tokens(block['text'])
+            elif 'toolUse' in block:
+                tokens += count_tokens(json.dumps(block['toolUse']['input']))
+            elif 'toolResult' in block:
+                tokens += sum(count_tokens(item.get('text', json.dumps(item.get('json', ""))))
+                              for item in block['toolResult']['content'])
+    return tokens
+
+
+def get_sql_queries(tool_use):
+    """The SQL queries of a tool call: the string constants of the `sql_query` variables and the query calls."""
+    tool_input = tool_use['input']
+    if tool_use['name'] == 'run_sql_batch':
+        return list(tool_input.get('queries', {}).values())
+    if tool_use['name'] == 'explain_sql':
+        return [tool_input.get('sql_query', "")]
+    try:
+        tree = ast.parse(tool_input.get('code', ""))
+    except SyntaxError:
+        return []
+
+    queries = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Assign):
+            value = node.value
+            if (isinstance(value, ast.Constant) and isinstance(value.value, str)
+                    and any(isinstance(target, ast.Name) and 'sql' in target.id.lower() for target in node.targets)):
+                queries.append(value.value)
+        elif isinstance(node, ast.Call) and get_name(node) in QUERY_FUNCTIONS and node.args:
+            argument = node.args[0]
+            if isinstance(argument, ast.Constant) and isinstance(argument.value, str):
+                queries.append(argument.value)
+    return list(dict.fromkeys(queries))
+
+
+def get_frame_descriptions(output):
+    """The shapes and columns of the data-frames printed in a tool output."""
+    descriptions = [shape for shape in FRAME_SHAPE.findall(output)]
+    for dtypes in FRAME_DTYPES.findall(output):
+        descriptions.append("columns: " + ", ".join(DTYPE.findall(dtypes)))
+    return descriptions
+
+
+def digest_tool_result(tool_use, tool_result):
+    """Compact description of a tool result: its SQL queries, data-frames, first output lines or error."""
+    output = "\n".join(item['text'] for item in tool_result['content'] if 'text' in item)
+    parts = [f"{tool_use['name']}" if tool_use is not None else "tool"]
+    if tool_use is not None:
+        parts += [f"SQL: {shorten(sql_query, DIGEST_SQL_CHARS)}" for sql_query in get_sql_queries(tool_use)]
+    parts += get_frame_descriptions(output)
+
+    lines = [line for line in output.splitlines() if line.strip()]
+    if tool_result['status'] == 'error' or output.startswith("REJECTED"):
+        parts.append(f"failed: {shorten(lines[-1] if lines else output, DIGEST_LINE_CHARS)}")
+    else:
+        parts.append(f"output ({len(lines)} lines): " + " / ".join(
+            shorten(line, DIGEST_LINE_CHARS) for line in lines[:DIGEST_LINES]))
+    return f"{DIGEST_PREFIX} " + " | ".join(parts)
+
+
+def is_query_start(message):
+    """The user messages asking a query, as opposed to those returning tool results."""
+    return message['role'] == 'user' and any('text' in block for block in message['content'])
+
+
+class DigestConversationManager(ConversationManager):
+    """
+    Keeps the conversation history within a token budget, without calling the model:
+    1. after each query, the tool results of the previous queries are replaced by digests
+       (SQL queries, data-frame shapes and columns, first output lines),
+    2. while the history exceeds the budget or `max_queries` queries, its oldest queries are folded into
+       a running summary of their questions, SQL queries, digests and answers, placed before the first query kept.
+    """
+    def __init__(self,
+                 token_budget=CONVERSATION_TOKEN_BUDGET,
+                 summary_token_budget=SUMMARY_TOKEN_BUDGET,
+                 keep_results_queries=KEEP_RESULTS_QUERIES,
+                 keep_queries=KEEP_QUERIES,
+                 max_queries=MAX_QUERIES):
+        super().__init__()
+        self.token_budget = token_budget
+        self.summary_token_budget = summary_token_budget
+        self.keep_results_queries = keep_results_queries
+        self.keep_queries = keep_queries
+        self.max_queries = max(max_queries, keep_queries)
+        self.summary = []
+        self.omitted = 0
+
+    def get_state(self):
+        return {**super().get_state(), 'summary': self.summary, 'omitted': self.omitted}
+
+    def restore_from_session(self, state):
+        result = super().restore_from_session(state)
+        self.summary = state.get('summary', [])
+        self.omitted = state.get('omitted', 0)
+        return result
+
+    def reset(self):
+        self.summary = []
+        self.omitted = 0
+
+    def apply_management(self, agent, **kwargs):
+        messages = agent.messages
+        self.digest_results(messages, self.keep_results_queries)
+        while len(self.get_query_starts(messages)) > self.max_queries:
+            self.fold_query(messages, self.max_queries)
+        while count_message_tokens(messages) > self.token_budget:
+            if not self.fold_query(messages, self.keep_queries):
+                break
+
+    def reduce_context(self, agent, e=None, **kwargs):
+        messages = agent.messages
+        tokens = count_message_tokens(messages)
+        self.digest_results(messages, 0)
+        folded = self.fold_query(messages, 1)
+        if e is not None and not folded and count_message_tokens(messages) >= tokens:
+            raise ContextWindowOverflowException("The conversation cannot be reduced further") from e
+
+    def get_query_starts(self, messages):
+        return [i for i, message in enumerate(messages) if is_query_start(message)]
+
+    def digest_results(self, messages, keep_queries):
+        """Replaces the tool results of the queries before the `keep_queries` latest ones by their digests."""
+        starts = self.get_query_starts(messages)
+        end = starts[-keep_queries] if keep_queries and len(starts) >= keep_queries else len(messages)
+        tool_uses = {}
+        for message in messages[:end]:
+            for block in message['content']:
+                if 'toolUse' in block:
+                    tool_uses[block['toolUse']['toolUseId']] = block['toolUse']
+                if 'toolResult' not in block:
+                    continue
+                tool_result = block['toolResult']
+                text = "\n".join(item.get('text', "") for item in tool_result['content'])
+                if text.startswith(DIGEST_PREFIX) or count_tokens(text) < MIN_DIGEST_TOKENS:
+                    continue
+                digest = digest_tool_result(tool_uses.get(tool_result['toolUseId']), tool_result)
+                tool_result['content'] = [{'text': digest}]
+
+    def fold_query(self, messages, keep_queries):
+        """Folds the oldest query into the summary, returns False when only the `keep_queries` latest are left."""
+        starts = self.get_query_starts(messages)
+        if len(starts) <= max(keep_queries, 1):
+            return False
+
+        end = starts[1]
+        self.summary.append(self.summarize_query(messages[:end]))
+        self.removed_message_count += end
+        del messages[:end]
+
+        while len(self.summary) > 1 and count_tokens("\n".join(self.summary)) > self.summary_token_budget:
+            self.summary.pop(0)
+            self.omitted += 1
+
+        # The summary is the first block of the first query kept, the roles of the messages still alternate
+        first = messages[0]
+        first['content'] = [{'text': self.format_summary()}] + [
+            block for block in first['content'] if not block.get('text', "").startswith(SUMMARY_PREFIX)]
+        return True
+
+    def summarize_query(self, messages):
+        question = " ".join(block['text'] for block in messages[0]['content']
+                            if 'text' in block and not block['text'].startswith(SUMMARY_PREFIX))
+        entry = [f"- Q: {shorten(question, SUMMARY_QUESTION_CHARS)}"]
+        tool_uses = {}
+        for message in messages:
+            for block in message['content']:
+                if 'toolUse' in block:
+                    tool_uses[block['toolUse']['toolUseId']] = block['toolUse']
+                elif 'toolResult' in block:
+                    text = "\n".join(item.get('text', "") for item in block['toolResult']['content'])
+                    if not text.startswith(DIGEST_PREFIX):
+                        text = digest_tool_result(tool_uses.get(block['toolResult']['toolUseId']), block['toolResult'])
+                    # The output lines come last in the digest, they are the first cut
+                    entry.append(f"  {shorten(text[len(DIGEST_PREFIX) + 1:], SUMMARY_RESULT_CHARS)}")
+
+        answers = [block['text'] for message in messages if message['role'] == 'assistant'
+                   for block in message['content'] if 'text' in block]
+        if answers:
+            entry.append(f"  A: {shorten(answers[-1], SUMMARY_ANSWER_CHARS)}")
+        return "\n".join(entry)
+
+    def format_summary(self):
+        omitted = f"\n({self.omitted} earlier queries omitted)" if self.omitted else ""
+        return f"{SUMMARY_PREFIX}{omitted}\n" + "\n".join(self.summary)
@@ -1,3 +1,5 @@
+import weakref
+
 from strands_data_analyst.agent import DataAnalystAgent
 from strands_data_analyst.image_handler import ImageHandler
 from strands_data_analyst.database_manager import LocalDatabaseManager
@@ -8,7 +10,11 @@ class DataAnalystSession:
     def __init__(self, static_path):
         self.img_handler = ImageHandler(static_path, "app/static")
         
-        self.data_analyst = DataAnalystAgent(img_handler=self.img_handler)
+        # The generated code runs in a worker, checked before its execution, and the model can check the query plans
+        self.data_analyst = DataAnalystAgent(
+            img_handler=self.img_handler, remote_execution=True, preflight=True, explain_tool=True)
+        # The pooled connection and the worker of the agent are released when the session is closed or collected
+        self.finalizer = weakref.finalize(self, self.data_analyst.close)
         
         self.history = []
         self.db_manager = LocalDatabaseManager()
@@ -22,6 +28,20 @@ class DataAnalystSession:
         self.history.append(msg)
         return msg
 
+    def progress(self, event):
+        """The events of a query in progress (text deltas, tool calls): rendered, but not kept in the history."""
+        return {
+            'role': 'assistant',
+            'type': event['type'],
+            'content': event
+        }
+
+    def response_messages(self, response):
+        yield self.message(response['answer'])
+
+        if 'visualization' in response:
+            yield self.message(content=response['visualization'], type='image')
+
     def set_db(self, db_id):
         self.data_analyst.set_db(
             db_id,
@@ -34,22 +54,23 @@ class DataAnalystSession:
     def query(self, prompt):
         yield self.message(prompt, role='user')
         
-        response = self.data_analyst.query(prompt)
-
-        yield self.message(response['answer'])
-
-        if 'visualization' in response:
-            yield self.message(content=response['visualization'], type='image')
+        for event in self.data_analyst.stream_query(prompt):
+            if event['type'] == 'response':
+                yield from self.response_messages(event['response'])
+            else:
+                yield self.progress(event)
 
     def automated_data_exploration(self):
-        for msg_type, msg in self.data_analyst.automated_data_exploration():
+        # The goals run at the same time, each in its own worker
+        for msg_type, msg in self.data_analyst.automated_data_exploration(parallel=True):
             if msg_type == 'goal':
                 yield self.message(f"{msg['goal_progress']} QUESTION: {msg['goal_question']} RATIONALE: {msg['goal_rationale']}")
             
+            elif msg_type == 'progress':
+                yield self.progress(msg)
+
             elif msg_type == 'query_response':
-                yield self.message(msg['answer'])
-                if 'visualization' in msg:
-                    yield self.message(content=msg['visualization'], type='image')
+                yield from self.response_messages(msg)
 
             elif msg_type == 'report':
                 yield self.message(msg, type='document')
@@ -61,5 +82,8 @@ class DataAnalystSession:
     def export_to_pdf(self):
         return markdown_to_pdf(self.img_handler.update_paths(self.data_analyst.document))
 
+    def close(self):
+        self.finalizer()
+
     def get_databases(self):
         return self.db_manager.get_list()
@@ -3,12 +3,14 @@ import json
 import logging
 
 from strands_data_analyst.databases import DATABASES
+from strands_data_analyst.schema_cache import SchemaCache
 
 DATABASES_DIR = pathlib.Path(__file__).parent.resolve() / ".." / "data" / "databases"
 
 
 class LocalDatabaseManager:
-    def __init__(self):
+    def __init__(self, schema_cache=None):
+        self.schema_cache = schema_cache if schema_cache is not None else SchemaCache()
         self.dbs = {}
         for db in DATABASES_DIR.iterdir():
             info_file = db / 'info.json'
@@ -25,9 +27,16 @@ class LocalDatabaseManager:
             if db_info['type'] == 'sqlite':
                 db_info['db_location'] = str(db / db_info['filename'])
 
+            elif db_info['type'] == 'duckdb':
+                # A DuckDB file, or a directory of Parquet/CSV files
+                if 'filename' in db_info:
+                    db_info['db_location'] = str(db / db_info['filename'])
+                else:
+                    db_info['data_dir'] = str(db / db_info.get('data_dir', '.'))
+
     def init_db(self, db_id):
         db_info = self.dbs[db_id]
-        return DATABASES[db_info['type']](db_info)
+        return DATABASES[db_info['type']](db_info, schema_cache=self.schema_cache)
 
     def get_list(self):
         return list(self.dbs.keys())
@@ -1,29 +1,68 @@
 import re
+import time
+import threading
+import multiprocessing
 from abc import ABC, abstractmethod
-import sqlite3
+import os
 from os import path
+from itertools import repeat
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from strands_data_analyst.db_profiler import (
+    TableProfiler, ProfileConfig, ESTIMATED, PARTIAL,
+    quote_identifier, has_ordered_values, get_primary_key, get_indexes, get_foreign_keys)
+from strands_data_analyst.connection_pool import (
+    connect_read_only, read_only_uri, get_connection_pool, SharedSQLiteConnection, SharedConnection)
+from strands_data_analyst.schema_cache import get_file_fingerprint, get_directory_fingerprint, get_table_fingerprint
+from strands_data_analyst.query_cache import QueryCache
 
 
 MIN_EXAMPLES = 3
 MAX_DISTINCT_VALUES = 10
 
+# Version of the profile format, invalidating the cached schemas when changed
+PROFILE_VERSION = 6
+
 
 class DB(ABC):
     """
-    A DB class has to set the DB_TYPE constant, and implement two abstract methods:
+    A DB class has to set the DB_TYPE constant (and QUERY_CODE, if pandas cannot read from its connections),
+    and implement three abstract methods:
     1. get_connection_code(): returning a tuple to open and close a connection to the database.
     2. get_schema(): a dictionary having the table names as keys, and a list of column types as values.
         Each column type is a dictionary containing 3 fields:
         a) name: the name of the column
         b) type: the type of the column
         c) distinct_values: example values of the column
+        d) examples_quality (optional): `exact`, `estimated` or `partial`, how the example values were computed
+        e) primary_key, indexed (optional): flags of the primary key columns, and of the columns leading an index
+        Any other field (e.g. null_fraction, min, max, distinct_count) is a column statistic.
+    3. get_connection_pool(): the pool of read-only connections lent to the generated code as `db_conn`.
+
+    A DB class can also implement get_table_info(): a dictionary having the table names as keys,
+    and a dictionary of table statistics as values (e.g. row_count, row_count_exact),
+    the primary_key column list, the indexes list, and the foreign_keys list (column, ref_table, ref_column).
+    The get_query_cache() method enables the cached `read_sql_query` function of the generated code.
     """
+    QUERY_CODE = "data_frame = pd.read_sql_query(sql_query, db_conn)"
+
     @abstractmethod
     def get_connection_code(self): pass
 
     @abstractmethod
     def get_schema(self): pass
 
+    def get_table_info(self):
+        return {}
+
+    @abstractmethod
+    def get_connection_pool(self): pass
+
+    def get_query_cache(self):
+        """Cache of the query results of the generated code, None if the database changes cannot be detected."""
+        return None
+
 
 CODE_PATTERN = re.compile(r"^[a-zA-Z]?[0-9.\-:]+$")
 
@@ -32,6 +71,19 @@ def is_code(string):
     return re.match(CODE_PATTERN, str(string)) is not None
 
 
+def cast_summary_value(value, column_type):
+    """A min or max value of the DuckDB `SUMMARIZE` (always text), as a number for the numeric columns."""
+    column_type = column_type.upper()
+    for cast, types in [(int, ('INT',)), (float, ('REAL', 'FLOA', 'DOUB', 'NUM', 'DEC'))]:
+        if any(type_name in column_type for type_name in types):
+            try:
+                return cast(value)
+            except ValueError:
+                # e.g. an INTERVAL
+                return value
+    return value
+
+
 def get_examples(value_count):
     values = []
     for value, count in value_count:
@@ -45,53 +97,404 @@ def get_examples(value_count):
     return values
 
 
+# Database and read-only connection of the current schema profiling worker (thread or process)
+_profile_worker = threading.local()
+
+
+def get_process_context():
+    """
+    The process workers are started by a fork server (or spawned): forking the calling process,
+    e.g. the multi-threaded web app, could copy the locks held by its other threads.
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context('spawn')
+
+
+def _open_worker_connection(database_source, profile_config, connections):
+    """
+    Opens the connection of a profiling worker, and appends it to `connections` to be closed by the pool owner.
+    The worker profiles with its own `SQLiteDB`: only the database path and the profiling options are sent
+    to the process workers, not the profiled tables and the schema cache of the owner.
+    """
+    _profile_worker.db = SQLiteDB({'db_location': database_source}, profile_config=profile_config)
+    _profile_worker.connection = connect_read_only(database_source, check_same_thread=False)
+    connections.append(_profile_worker.connection)
+
+
+def _profile_table_in_worker(table, cached_table, deadline, with_fingerprint):
+    cursor = _profile_worker.connection.cursor()
+    return _profile_worker.db._profile_table(cursor, table, cached_table, deadline, with_fingerprint)
+
+
 class SQLiteDB(DB):
     DB_TYPE = 'SQLite'
 
-    def __init__(self, db_info):
+    def __init__(self, db_info, schema_cache=None, profile_config=None):
         self.database_source = db_info['db_location']
         if not path.exists(self.database_source):
             raise Exception(f"Missing DB: {self.database_source}")
+        self.schema_cache = schema_cache
+        if profile_config is None:
+            profile_config = ProfileConfig(**db_info.get('profiling', {}))
+        self.profile_config = profile_config
+        self.__tables = None
 
     def __get_tables(self, cursor):
         cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
         return [table[0] for table in cursor.fetchall()]
 
-    def __get_top_distinct_values(self, cursor, table_name, column_name):
+    def __get_table_schema(self, cursor, table_name: str, deadline=None):
+        """Returns the table schema and the table info: statistics, primary key, indexes and foreign keys."""
+        cursor.execute(f'PRAGMA table_info({quote_identifier(table_name)});')
+        columns = [col[1:3] for col in cursor.fetchall()]
+
         try:
-            cursor.execute(f'SELECT "{column_name}", COUNT(*) FROM "{table_name}" GROUP BY 1 ORDER BY COUNT(*) DESC LIMIT {MAX_DISTINCT_VALUES};')
-            return get_examples(cursor.fetchall())
+            profiler = TableProfiler(cursor, table_name, MAX_DISTINCT_VALUES, self.profile_config, deadline)
+            profile, table_stats = profiler.profile(columns)
+            primary_key = get_primary_key(cursor, table_name)
+            indexes = get_indexes(cursor, table_name)
+            foreign_keys = get_foreign_keys(cursor, table_name)
         except Exception as e:
-            raise Exception(f"Error processing column {column_name} in table {table_name}:\n{e}")
+            raise Exception(f"Error processing table {table_name}:\n{e}")
 
-    def __get_table_schema(self, cursor, table_name: str):
-        cursor.execute(f'PRAGMA table_info("{table_name}");')
+        # Columns usable as index search keys: the leading column of an index, or of the primary key
+        indexed_columns = {index['columns'][0] for index in indexes if index['columns'] and not index['partial']}
+        indexed_columns.update(primary_key[:1])
 
         schema = []
-        for col in cursor.fetchall():
-            _, name, col_type = col[:3]
-            schema.append({
+        for name, col_type in columns:
+            column_profile = profile[name]
+            field = {
                 'name': name,
                 'type': col_type,
-                'distinct_values': self.__get_top_distinct_values(cursor, table_name, name)
-            })
-        return schema
+                'distinct_values': get_examples(column_profile['value_counts']),
+                'examples_quality': column_profile['quality'],
+            }
+            if name in primary_key:
+                field['primary_key'] = True
+            if name in indexed_columns:
+                field['indexed'] = True
+            field.update(column_profile['stats'])
+            schema.append(field)
+
+        table_info = {
+            **table_stats,
+            'primary_key': primary_key,
+            'indexes': [
+                {'name': index['name'], 'columns': index['columns'], 'unique': index['unique']}
+                    for index in indexes],
+            'foreign_keys': foreign_keys
+        }
+        return schema, table_info
+
+    def get_profile_options(self):
+        return {
+            'version': PROFILE_VERSION,
+            'top_k': MAX_DISTINCT_VALUES,
+            'min_examples': MIN_EXAMPLES,
+            **self.profile_config.to_dict()
+        }
+
+    def _profile_table(self, cursor, table, cached_table, deadline, with_fingerprint):
+        """
+        Returns the table schema and info, and its fingerprint when `with_fingerprint` is set:
+        the `cached_table` is reused if its fingerprint is unchanged.
+        """
+        if not with_fingerprint:
+            table_schema, table_info = self.__get_table_schema(cursor, table, deadline)
+            return {'schema': table_schema, 'info': table_info}
+
+        # Only the small tables are read in full to compute their content digest
+        table_fingerprint = get_table_fingerprint(cursor, table, self.profile_config.max_hashed_rows)
+        if cached_table is not None and cached_table['fingerprint'] == table_fingerprint:
+            return cached_table
+
+        table_schema, table_info = self.__get_table_schema(cursor, table, deadline)
+        if any(field['examples_quality'] == PARTIAL for field in table_schema):
+            # Profile the table again next time
+            table_fingerprint = None
+        return {'fingerprint': table_fingerprint, 'schema': table_schema, 'info': table_info}
+
+    def __profile_tables(self, cached_tables=None):
+        """
+        Returns for each table its schema, and its fingerprint when `cached_tables` are given.
+        With more than one worker, the tables are profiled in parallel, each worker having its own read-only connection.
+        """
+        deadline = None
+        if self.profile_config.db_time_budget is not None:
+            deadline = time.monotonic() + self.profile_config.db_time_budget
+        with_fingerprint = cached_tables is not None
+        cached_tables = cached_tables or {}
+
+        # Connections of the thread workers, the process workers close theirs when they exit
+        worker_connections = []
+        connection = connect_read_only(self.database_source)
+        try:
+            cursor = connection.cursor()
+            table_names = self.__get_tables(cursor)
+
+            workers = min(self.profile_config.workers, len(table_names))
+            if workers <= 1:
+                profiles = [
+                    self._profile_table(cursor, table, cached_tables.get(table), deadline, with_fingerprint)
+                        for table in table_names]
+            else:
+                if self.profile_config.executor == 'process':
+                    executor = ProcessPoolExecutor(
+                        max_workers=workers,
+                        mp_context=get_process_context(),
+                        initializer=_open_worker_connection,
+                        initargs=(self.database_source, self.profile_config, worker_connections))
+                else:
+                    executor = ThreadPoolExecutor(
+                        max_workers=workers,
+                        initializer=_open_worker_connection,
+                        initargs=(self.database_source, self.profile_config, worker_connections))
+                with executor:
+                    profiles = list(executor.map(
+                        _profile_table_in_worker,
+                        table_names,
+                        [cached_tables.get(table) for table in table_names],
+                        repeat(deadline),
+                        repeat(with_fingerprint)))
+        finally:
+            connection.close()
+            for worker_connection in worker_connections:
+                worker_connection.close()
+        return dict(zip(table_names, profiles))
+
+    def __get_cached_tables(self):
+        options = self.get_profile_options()
+        fingerprint = get_file_fingerprint(self.database_source)
+        cached = self.schema_cache.load(self.database_source, options)
+        if cached is not None and cached['fingerprint'] == fingerprint:
+            tables = cached['tables']
+        else:
+            # Re-profile only the tables whose content changed
+            tables = self.__profile_tables(cached['tables'] if cached is not None else {})
+            if any(table['fingerprint'] is None for table in tables.values()):
+                fingerprint = None
+            self.schema_cache.save(self.database_source, options, fingerprint, tables)
+        return tables
+
+    def __get_profiled_tables(self):
+        if self.schema_cache is not None:
+            return self.__get_cached_tables()
+
+        if self.__tables is None:
+            self.__tables = self.__profile_tables()
+        return self.__tables
 
     def get_schema(self):
-        connection = sqlite3.connect(self.database_source)
-        cursor = connection.cursor()
-        schema = {table: self.__get_table_schema(cursor, table) for table in self.__get_tables(cursor)}
-        connection.close()
-        return schema
+        tables = self.__get_profiled_tables()
+        return {table: tables[table]['schema'] for table in tables}
+
+    def get_table_info(self):
+        tables = self.__get_profiled_tables()
+        return {table: tables[table]['info'] for table in tables}
+
+    def connect(self):
+        connection = connect_read_only(
+            self.database_source,
+            immutable=False,
+            check_same_thread=False,
+            factory=SharedSQLiteConnection)
+        connection.execute("PRAGMA query_only=ON;")
+        return connection
+
+    def get_connection_pool(self):
+        return get_connection_pool((self.DB_TYPE, path.realpath(self.database_source)), self.connect)
+
+    def get_query_cache(self):
+        return QueryCache(self.DB_TYPE, partial(get_file_fingerprint, self.database_source))
 
     def get_connection_code(self):
         return f"""
 import sqlite3
-db_conn = sqlite3.connect({self.database_source})
+db_conn = sqlite3.connect({read_only_uri(self.database_source)!r}, uri=True)
+db_conn.execute("PRAGMA query_only=ON;")
 """, """
 db_conn.close()
 """
 
+DUCKDB_READERS = {
+    '.parquet': 'read_parquet',
+    '.csv': 'read_csv_auto',
+}
+
+
+def import_duckdb():
+    """Imports duckdb on first use, so that the SQLite-only installs do not need it."""
+    try:
+        import duckdb
+    except ImportError:
+        raise Exception("DuckDB databases require the `duckdb` package: pip install duckdb")
+    return duckdb
+
+
+def quote_literal(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def get_data_files(data_dir):
+    """
+    Maps table names to the DuckDB expression reading them from a directory:
+    one table per Parquet/CSV file, or per sub-directory of (possibly hive-partitioned) Parquet files.
+    """
+    tables = {}
+    for entry in sorted(os.listdir(data_dir)):
+        entry_path = path.join(data_dir, entry)
+        table_name, extension = path.splitext(entry)
+        if path.isdir(entry_path):
+            parquet_glob = quote_literal(path.join(entry_path, "**", "*.parquet"))
+            tables[entry] = f"read_parquet({parquet_glob}, hive_partitioning=true)"
+        elif extension.lower() in DUCKDB_READERS:
+            tables[table_name] = f"{DUCKDB_READERS[extension.lower()]}({quote_literal(entry_path)})"
+    return tables
+
+
+class DuckDBDB(DB):
+    """
+    A DuckDB database file (`db_location`), or a directory of Parquet/CSV files (`data_dir`)
+    served as a database of views without any conversion step.
+    """
+    DB_TYPE = 'DuckDB'
+    QUERY_CODE = "data_frame = db_conn.execute(sql_query).df()"
+
+    def __init__(self, db_info, schema_cache=None):
+        import_duckdb()
+
+        self.database_source = db_info.get('db_location')
+        self.data_dir = db_info.get('data_dir')
+        source = self.database_source or self.data_dir
+        if source is None or not path.exists(source):
+            raise Exception(f"Missing DB: {source}")
+        self.schema_cache = schema_cache if self.database_source is not None else None
+        self.__tables = None
+
+    def __get_view_statements(self):
+        if self.data_dir is None:
+            return []
+        return [
+            f'CREATE VIEW {quote_identifier(table)} AS SELECT * FROM {reader};'
+                for table, reader in get_data_files(self.data_dir).items()]
+
+    def connect(self):
+        duckdb = import_duckdb()
+        if self.database_source is not None:
+            return duckdb.connect(self.database_source, read_only=True)
+
+        connection = duckdb.connect()
+        for statement in self.__get_view_statements():
+            connection.execute(statement)
+        return connection
+
+    def get_connection_pool(self):
+        source = path.realpath(self.database_source or self.data_dir)
+        return get_connection_pool((self.DB_TYPE, source), lambda: SharedConnection(self.connect()))
+
+    def get_query_cache(self):
+        if self.database_source is not None:
+            return QueryCache(self.DB_TYPE, partial(get_file_fingerprint, self.database_source))
+        return QueryCache(self.DB_TYPE, partial(get_directory_fingerprint, self.data_dir))
+
+    def __get_table_schema(self, connection, table_name):
+        table = quote_identifier(table_name)
+        summary = connection.execute(f'SUMMARIZE {table};').df().to_dict(orient='records')
+        if not summary:
+            return [], {'row_count': 0, 'row_count_exact': True}
+
+        row_count = int(summary[0]['count'])
+        top_k = ', '.join(
+            f"approx_top_k({quote_identifier(column['column_name'])}, {MAX_DISTINCT_VALUES})" for column in summary)
+        top_values = connection.execute(f'SELECT {top_k} FROM {table};').fetchone()
+
+        schema = []
+        for column, values in zip(summary, top_values):
+            # The HyperLogLog estimate can exceed the row count
+            approx_unique = min(int(column['approx_unique'] or 0), row_count)
+            # approx_top_k does not return the counts: unique columns get a count of 1 to show fewer examples
+            count = 1 if approx_unique >= 0.9 * row_count else 2
+            field = {
+                'name': column['column_name'],
+                'type': column['column_type'],
+                'distinct_values': get_examples([(value, count) for value in values or []]),
+                'examples_quality': ESTIMATED
+            }
+            null_fraction = float(column['null_percentage'] or 0) / 100
+            if null_fraction:
+                field['null_fraction'] = round(null_fraction, 4)
+            if has_ordered_values(column['column_type']) and column['min'] is not None:
+                field['min'] = cast_summary_value(column['min'], column['column_type'])
+                field['max'] = cast_summary_value(column['max'], column['column_type'])
+            field['approx_distinct_count'] = approx_unique
+            schema.append(field)
+
+        return schema, {'row_count': row_count, 'row_count_exact': True}
+
+    def __profile_tables(self):
+        connection = self.connect()
+        try:
+            table_names = [row[0] for row in connection.execute(
+                "SELECT table_name FROM information_schema.tables WHERE table_schema = 'main' ORDER BY table_name;"
+            ).fetchall()]
+            tables = {}
+            for table in table_names:
+                try:
+                    table_schema, table_info = self.__get_table_schema(connection, table)
+                except Exception as e:
+                    raise Exception(f"Error processing table {table}:\n{e}")
+                tables[table] = {'fingerprint': None, 'schema': table_schema, 'info': table_info}
+        finally:
+            connection.close()
+        return tables
+
+    def __get_profiled_tables(self):
+        if self.__tables is not None:
+            return self.__tables
+
+        options = {'version': PROFILE_VERSION, 'db_type': self.DB_TYPE, 'top_k': MAX_DISTINCT_VALUES}
+        if self.schema_cache is not None:
+            fingerprint = get_file_fingerprint(self.database_source)
+            cached = self.schema_cache.load(self.database_source, options)
+            if cached is not None and cached['fingerprint'] == fingerprint:
+                self.__tables = cached['tables']
+                return self.__tables
+
+        self.__tables = self.__profile_tables()
+        if self.schema_cache is not None:
+            self.schema_cache.save(self.database_source, options, fingerprint, self.__tables)
+        return self.__tables
+
+    def get_schema(self):
+        tables = self.__get_profiled_tables()
+        return {table: tables[table]['schema'] for table in tables}
+
+    def get_table_info(self):
+        tables = self.__get_profiled_tables()
+        return {table: tables[table]['info'] for table in tables}
+
+    def get_connection_code(self):
+        if self.database_source is not None:
+            return f"""
+import duckdb
+db_conn = duckdb.connect({self.database_source!r}, read_only=True)
+""", """
+db_conn.close()
+"""
+
+        views = '\n'.join(f"db_conn.execute({statement!r})" for statement in self.__get_view_statements())
+        return f"""
+import duckdb
+db_conn = duckdb.connect()
+{views}
+""", """
+db_conn.close()
+"""
+
+
 DATABASES = {
-    'sqlite': SQLiteDB
+    'sqlite': SQLiteDB,
+    'duckdb': DuckDBDB
 }
@@ -0,0 +1,697 @@
+import os
+import re
+import time
+import heapq
+import random
+import sqlite3
+from collections import Counter
+
+from strands_data_analyst.sketches import MisraGries
+
+
+BATCH_SIZE = 10_000
+
+# Above this number of distinct values a column is no longer counted in memory,
+# and its top values are computed by SQLite with a dedicated GROUP BY.
+MAX_TRACKED_VALUES = 100_000
+
+# Columns with more distinct values than this fraction of the first batch of rows, and expected to exceed
+# MAX_TRACKED_VALUES over the whole table, are high-cardinality: their counters in the single pass would be discarded.
+HIGH_CARDINALITY_RATIO = 0.5
+
+# Values counted in memory at once by the passes over the high-cardinality columns: a table having up to
+# this number of rows divided by MIN_SCANNED_COLUMNS has its high-cardinality columns counted in Python, a few columns
+# per pass (sorting the values of a single column, a GROUP BY is slower than counting several columns in one pass).
+HIGH_CARDINALITY_VALUES = 1_000_000
+
+# Below this number of low-cardinality columns, a large table is not read in Python:
+# one GROUP BY per column is faster than the Python pass.
+MIN_SCANNED_COLUMNS = 3
+
+# Number of counters of the heavy hitters sketch used in approximate mode
+SKETCH_CAPACITY = 100
+
+EXACT = 'exact'
+ESTIMATED = 'estimated'
+PARTIAL = 'partial'
+
+PARALLELISM_OPTIONS = {'workers', 'executor'}
+
+# Default number of tables profiled in parallel: one per CPU, at most 4.
+# The default workers are threads: the process workers are opt-in, they only pay off for the large tables
+# counted in Python (holding the GIL) on several cores.
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+DEFAULT_EXECUTOR = 'thread'
+
+# Tables compared by the digest of their rows in the schema cache, the larger ones by their row count and largest rowid
+MAX_HASHED_ROWS = 10_000
+
+# Declared type names (or parts of them) of the columns whose min/max values are reported
+ORDERED_TYPES = ('INT', 'REAL', 'FLOA', 'DOUB', 'NUM', 'DEC', 'DATE', 'TIME')
+
+# Keywords starting a table constraint, instead of a column definition
+TABLE_CONSTRAINTS = ('CONSTRAINT', 'PRIMARY', 'UNIQUE', 'CHECK', 'FOREIGN')
+
+SQL_NAME = re.compile(r'\s*("(?:[^"]|"")*"|`[^`]*`|\[[^\]]*\]|[^\s(]+)')
+SQL_COLLATE = re.compile(r'\bCOLLATE\s+("(?:[^"]|"")*"|\w+)', re.IGNORECASE)
+
+
+class ProfileConfig:
+    """
+    Profiling options:
+    - approximate: sample the tables having more than `sample_threshold` rows,
+        reading `sample_rows` rows in random rowid ranges of `block_rows` rows,
+        and estimate the top values with a Misra-Gries sketch.
+    - table_time_budget, db_time_budget: seconds after which the profiling of a table (or of the whole database)
+        stops, returning the examples found so far.
+    - workers: number of tables profiled in parallel, by a pool of `executor` ('thread' or 'process') workers,
+        by default one thread per CPU, at most 4 (a single CPU profiles the tables sequentially).
+        The process workers are started by a fork server (or spawned), never forked from the calling process.
+    - max_hashed_rows: the schema cache reuses the profile of a table having at most `max_hashed_rows` rows
+        if the digest of its rows is unchanged, and of a larger table if its definition, row count and largest rowid
+        are unchanged (an in-place UPDATE is missed). None digests all the tables, at the cost of reading them in full.
+    """
+    def __init__(self,
+                 approximate=False,
+                 sample_threshold=1_000_000,
+                 sample_rows=100_000,
+                 block_rows=1_000,
+                 table_time_budget=None,
+                 db_time_budget=None,
+                 workers=DEFAULT_WORKERS,
+                 executor=DEFAULT_EXECUTOR,
+                 max_hashed_rows=MAX_HASHED_ROWS):
+        self.approximate = approximate
+        self.sample_threshold = sample_threshold
+        self.sample_rows = sample_rows
+        self.block_rows = block_rows
+        self.table_time_budget = table_time_budget
+        self.db_time_budget = db_time_budget
+        self.workers = workers
+        self.executor = executor
+        self.max_hashed_rows = max_hashed_rows
+
+    def to_dict(self):
+        """Options affecting the profiling results."""
+        return {key: value for key, value in vars(self).items() if key not in PARALLELISM_OPTIONS}
+
+
+def quote_identifier(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def sqlite_sort_key(value):
+    """Order values like SQLite does: NULL < numbers < text < blobs."""
+    if value is None:
+        return (0, 0)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    return (3, value)
+
+
+def top_values(value_count, top_k):
+    """
+    Most frequent values first, ties broken by value as in a GROUP BY, from the (value, count) pairs of a list
+    or dictionary items. The counts are ranked without a Python key, only the values tied at the last count kept
+    are ordered by value (e.g. the unique values of a high-cardinality column): directly unless their types differ.
+    """
+    counts = heapq.nlargest(top_k, (count for _, count in value_count))
+    if len(counts) < top_k:
+        return sorted(value_count, key=lambda item: (-item[1], sqlite_sort_key(item[0])))
+    min_count = counts[-1]
+    top = sorted(
+        [(value, count) for value, count in value_count if count > min_count],
+        key=lambda item: (-item[1], sqlite_sort_key(item[0])))
+    try:
+        # Numbers, texts or blobs only: they compare as in SQLite
+        ties = heapq.nsmallest(top_k - len(top), (value for value, count in value_count if count == min_count))
+    except TypeError:
+        ties = heapq.nsmallest(
+            top_k - len(top), (value for value, count in value_count if count == min_count), key=sqlite_sort_key)
+    return top + [(value, min_count) for value in ties]
+
+
+def get_primary_key(cursor, table_name):
+    cursor.execute(f'PRAGMA table_info({quote_identifier(table_name)});')
+    return [col[1] for col in sorted(cursor.fetchall(), key=lambda col: col[5]) if col[5]]
+
+
+def get_indexes(cursor, table_name):
+    """The indexes of a table: name, indexed columns (None for expressions), unique and partial flags."""
+    cursor.execute(f'PRAGMA index_list({quote_identifier(table_name)});')
+    indexes = []
+    for index in cursor.fetchall():
+        index_name, is_unique, is_partial = index[1], index[2], index[4]
+        cursor.execute(f'PRAGMA index_info({quote_identifier(index_name)});')
+        indexes.append({
+            'name': index_name,
+            'columns': [col[2] for col in cursor.fetchall()],
+            'unique': bool(is_unique),
+            'partial': bool(is_partial)
+        })
+    return indexes
+
+
+def get_foreign_keys(cursor, table_name):
+    """
+    The declared foreign keys of a table, one entry per column.
+    A None `ref_column` references the primary key of `ref_table`.
+    """
+    cursor.execute(f'PRAGMA foreign_key_list({quote_identifier(table_name)});')
+    return [
+        {'column': fk[3], 'ref_table': fk[2], 'ref_column': fk[4]}
+            for fk in cursor.fetchall()]
+
+
+def get_unique_columns(cursor, table_name):
+    """
+    Columns that cannot contain duplicated values: single-column primary keys,
+    and columns covered by a single-column (non-partial) UNIQUE index.
+    """
+    primary_key = get_primary_key(cursor, table_name)
+    unique_columns = set(primary_key) if len(primary_key) == 1 else set()
+
+    for index in get_indexes(cursor, table_name):
+        if not index['unique'] or index['partial']:
+            continue
+        if len(index['columns']) == 1 and index['columns'][0] is not None:
+            unique_columns.add(index['columns'][0])
+
+    return unique_columns
+
+
+def unquote_identifier(name):
+    if name[:1] in ('"', '`', '[') and len(name) > 1:
+        return name[1:-1].replace('""', '"') if name[0] == '"' else name[1:-1]
+    return name
+
+
+def split_definitions(sql):
+    """
+    The comma separated definitions between the outer parentheses of a CREATE TABLE statement,
+    with the text nested in parentheses (types sizes, CHECK expressions, defaults) removed.
+    """
+    definitions = []
+    current = []
+    depth = 0
+    quote = None
+    for char in sql:
+        if quote is not None:
+            if char == quote:
+                quote = None
+            if depth == 1:
+                current.append(char)
+        elif char in ('"', "'", '`', '['):
+            quote = ']' if char == '[' else char
+            if depth == 1:
+                current.append(char)
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+            if depth == 0:
+                break
+        elif char == ',' and depth == 1:
+            definitions.append(''.join(current))
+            current = []
+        elif depth == 1:
+            current.append(char)
+    definitions.append(''.join(current))
+    return definitions
+
+
+def get_collations(cursor, table_name):
+    """
+    The columns declared with a collating sequence other than BINARY (e.g. `COLLATE NOCASE`),
+    mapped to the collation name. Their values are compared by SQLite with that collation, not by Python equality.
+    """
+    cursor.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name=?;", (table_name,))
+    row = cursor.fetchone()
+    if row is None or not row[0]:
+        return {}
+
+    collations = {}
+    for definition in split_definitions(row[0]):
+        match = SQL_NAME.match(definition)
+        if match is None or match.group(1).upper() in TABLE_CONSTRAINTS:
+            continue
+        collate = SQL_COLLATE.search(definition, match.end())
+        if collate is not None and unquote_identifier(collate.group(1)).upper() != 'BINARY':
+            collations[unquote_identifier(match.group(1))] = unquote_identifier(collate.group(1)).upper()
+    return collations
+
+
+def has_ordered_values(column_type):
+    """Numeric and date/time columns, whose range is meaningful."""
+    column_type = (column_type or '').upper()
+    return any(type_name in column_type for type_name in ORDERED_TYPES)
+
+
+def value_range(values):
+    try:
+        return min(values), max(values)
+    except TypeError:
+        # Mixed types in the same column
+        return min(values, key=sqlite_sort_key), max(values, key=sqlite_sort_key)
+
+
+def read_sqlite_stat1(cursor, table_name):
+    """
+    Statistics stored by `ANALYZE`, if available: the table row count,
+    and the distinct count estimates of the leading columns of its indexes.
+    """
+    try:
+        cursor.execute("SELECT idx, stat FROM sqlite_stat1 WHERE tbl=?;", (table_name,))
+        stats = cursor.fetchall()
+    except sqlite3.OperationalError:
+        return None, {}
+
+    row_count = None
+    distinct_counts = {}
+    for index_name, stat in stats:
+        numbers = [int(number) for number in stat.split() if number.isdigit()]
+        if not numbers:
+            continue
+        row_count = numbers[0]
+        if index_name is not None and len(numbers) > 1:
+            cursor.execute(f'PRAGMA index_info({quote_identifier(index_name)});')
+            index_columns = [col[2] for col in cursor.fetchall()]
+            if index_columns and index_columns[0] is not None:
+                distinct_counts[index_columns[0]] = max(1, round(row_count / max(numbers[1], 1)))
+    return row_count, distinct_counts
+
+
+class ColumnStats:
+    """
+    Statistics of a column updated batch by batch: number of rows and nulls, min/max values,
+    and the set of its distinct values once `track_distinct()` is called (for the sampled tables).
+    """
+    def __init__(self, track_range):
+        self.track_range = track_range
+        self.rows = 0
+        self.nulls = 0
+        self.min = None
+        self.max = None
+        self.distinct = None
+
+    def track_distinct(self):
+        self.distinct = set()
+
+    def update(self, values):
+        self.rows += len(values)
+        nulls = values.count(None)
+        self.nulls += nulls
+        if nulls == len(values) or (not self.track_range and self.distinct is None):
+            return
+
+        non_null = [value for value in values if value is not None] if nulls else values
+        if self.distinct is not None:
+            self.distinct.update(non_null)
+        if self.track_range:
+            bounds = value_range(non_null)
+            if self.min is not None:
+                bounds = value_range([self.min, self.max, *bounds])
+            self.min, self.max = bounds
+
+    def to_dict(self, distinct_count=None, distinct_key='distinct_count'):
+        stats = {}
+        if self.nulls:
+            stats['null_fraction'] = round(self.nulls / self.rows, 4)
+        if self.min is not None:
+            stats['min'] = self.min
+            stats['max'] = self.max
+        if distinct_count is not None:
+            stats[distinct_key] = distinct_count
+        return stats
+
+
+class TableProfiler:
+    """
+    Computes the top-k (value, count) pairs and the statistics of every column of a table,
+    reading the low-cardinality columns of a table together in a single pass.
+
+    Unique columns are not counted: their top values and range are read from the index.
+    The columns expected to have more than MAX_TRACKED_VALUES distinct values, from their first batch of rows,
+    are counted in passes of a few columns holding at most HIGH_CARDINALITY_VALUES values,
+    or grouped by SQLite (one GROUP BY per column) when the table is too large,
+    as are all the columns of a large table with fewer than MIN_SCANNED_COLUMNS low-cardinality columns.
+    Columns with too many distinct values to be counted in memory also fall back to a GROUP BY.
+    Columns declared with a collation (e.g. `COLLATE NOCASE`) are grouped by SQLite, which applies the collation.
+    In approximate mode, large tables are sampled in blocks of consecutive rowids.
+    The profiling stops at the `deadline` (a `time.monotonic()` value), after reading at least one batch of rows.
+    """
+    def __init__(self, cursor, table_name, top_k, config=None, deadline=None):
+        self.cursor = cursor
+        self.table_name = table_name
+        self.top_k = top_k
+        self.config = config if config is not None else ProfileConfig()
+
+        if self.config.table_time_budget is not None:
+            table_deadline = time.monotonic() + self.config.table_time_budget
+            deadline = table_deadline if deadline is None else min(deadline, table_deadline)
+        self.deadline = deadline
+
+    def __execute(self, query, parameters=()):
+        self.cursor.execute(query, parameters)
+        return self.cursor.fetchall()
+
+    def __expired(self):
+        return self.deadline is not None and time.monotonic() > self.deadline
+
+    def __unique_column_profile(self, column_name, column_type, table_stats):
+        column = quote_identifier(column_name)
+        table = quote_identifier(self.table_name)
+        null_count = self.__execute(f'SELECT COUNT(*) FROM {table} WHERE {column} IS NULL;')[0][0]
+        value_count = [(None, null_count)] if null_count else []
+        first_values = self.__execute(
+            f'SELECT {column}, 1 FROM {table} WHERE {column} IS NOT NULL ORDER BY 1 LIMIT {self.top_k};')
+        value_count.extend(first_values)
+
+        stats = {}
+        row_count = table_stats['row_count']
+        if row_count and null_count:
+            stats['null_fraction'] = round(null_count / row_count, 4)
+        if has_ordered_values(column_type) and first_values:
+            stats['min'] = first_values[0][0]
+            stats['max'] = self.__execute(f'SELECT MAX({column}) FROM {table};')[0][0]
+        if row_count is not None:
+            distinct_key = 'distinct_count' if table_stats['row_count_exact'] else 'approx_distinct_count'
+            stats[distinct_key] = max(row_count - null_count, 0)
+        return top_values(value_count, self.top_k), stats
+
+    def __group_by_values(self, column_name, count_groups=True):
+        """
+        The top values of a column, and with `count_groups` its number of groups (NULL included), counted by the
+        same GROUP BY. Counting the groups is not free for the high-cardinality columns: they have as many groups.
+        """
+        column = quote_identifier(column_name)
+        groups = ', COUNT(*) OVER ()' if count_groups else ''
+        rows = self.__execute(
+            f'SELECT {column}, COUNT(*){groups} FROM {quote_identifier(self.table_name)} '
+            f'GROUP BY 1 ORDER BY COUNT(*) DESC, 1 LIMIT {self.top_k};')
+        if not count_groups:
+            return rows, None
+        return [(value, count) for value, count, _ in rows], rows[0][2] if rows else 0
+
+    def __probe_cardinality(self, columns):
+        """
+        The (distinct, non-null) values of each column in the first batch of rows,
+        None if the whole table fits in a batch.
+        """
+        select = ', '.join(quote_identifier(name) for name, _ in columns)
+        rows = self.__execute(f'SELECT {select} FROM {quote_identifier(self.table_name)} LIMIT {BATCH_SIZE};')
+        if len(rows) < BATCH_SIZE:
+            return None
+        probe = {}
+        for (name, _), values in zip(columns, zip(*rows)):
+            non_null = [value for value in values if value is not None]
+            probe[name] = (len(set(non_null)), len(non_null))
+        return probe
+
+    def __aggregate_stats(self, columns):
+        """The statistics of the columns not read in Python, computed by a single aggregate query, and the row count."""
+        aggregates = ['COUNT(*)']
+        for name, column_type in columns:
+            column = quote_identifier(name)
+            aggregates.append(f'COUNT({column})')
+            if has_ordered_values(column_type):
+                aggregates.extend([f'MIN({column})', f'MAX({column})'])
+        row = self.__execute(f'SELECT {", ".join(aggregates)} FROM {quote_identifier(self.table_name)};')[0]
+
+        row_count, values = row[0], iter(row[1:])
+        stats = {}
+        for name, column_type in columns:
+            column_stats = ColumnStats(has_ordered_values(column_type))
+            column_stats.rows = row_count
+            column_stats.nulls = row_count - next(values)
+            if column_stats.track_range:
+                column_stats.min, column_stats.max = next(values), next(values)
+            stats[name] = column_stats
+        return stats, row_count
+
+    def __grouped_distinct_count(self, name, value_counts, column_stats, probe, stat1_distinct_counts):
+        """
+        The distinct count of a high-cardinality column, whose groups were not counted, as a (count, key) pair:
+        exact when all its values are distinct, otherwise estimated from sqlite_stat1 or from the first batch of rows.
+        """
+        non_null = column_stats.rows - column_stats.nulls
+        counts = [count for value, count in value_counts if value is not None]
+        if len(value_counts) < self.top_k:
+            return len(counts), 'distinct_count'
+        if counts and max(counts) == 1:
+            return non_null, 'distinct_count'
+        if name in stat1_distinct_counts:
+            return stat1_distinct_counts[name], 'approx_distinct_count'
+        probe_distinct, probe_non_null = probe.get(name, (0, 0)) if probe else (0, 0)
+        if probe_distinct and probe_distinct >= 0.9 * probe_non_null:
+            # Almost every value of the first rows is distinct: extrapolate to the whole table
+            return round(probe_distinct * non_null / probe_non_null), 'approx_distinct_count'
+        return None, 'distinct_count'
+
+    def __group_by_blocks(self, column_name, block_starts):
+        """Top values of the sampled blocks of rowids, counted by SQLite with the collation of the column."""
+        blocks = ', '.join('(?)' for _ in block_starts)
+        return self.__execute(
+            f'WITH blocks(start) AS (VALUES {blocks}) '
+            f'SELECT t.{quote_identifier(column_name)}, COUNT(*) FROM blocks '
+            f'JOIN {quote_identifier(self.table_name)} AS t ON t.rowid >= blocks.start AND t.rowid < blocks.start + ? '
+            f'GROUP BY 1 ORDER BY COUNT(*) DESC, 1 LIMIT {self.top_k};',
+            (*block_starts, self.config.block_rows))
+
+    def __rowid_range(self):
+        try:
+            # Two subqueries: SQLite only reads a single MIN() or MAX() from the end of the b-tree
+            table = quote_identifier(self.table_name)
+            return self.__execute(f'SELECT (SELECT MIN(rowid) FROM {table}), (SELECT MAX(rowid) FROM {table});')[0]
+        except Exception:
+            # WITHOUT ROWID tables cannot be block-sampled
+            return None, None
+
+    def __sample_blocks(self, first_rowid, last_rowid):
+        block_rows = self.config.block_rows
+        n_blocks = max(1, self.config.sample_rows // block_rows)
+        n_slots = (last_rowid - first_rowid + 1) // block_rows
+        # Seeded to profile the same blocks across runs
+        slots = random.Random(self.table_name).sample(range(n_slots), min(n_blocks, n_slots))
+        return [first_rowid + slot * block_rows for slot in sorted(slots)]
+
+    def __count_values(self, columns, max_values=MAX_TRACKED_VALUES):
+        counters = {name: Counter() for name, _ in columns}
+        stats = {name: ColumnStats(has_ordered_values(column_type)) for name, column_type in columns}
+        if not columns:
+            return counters, stats, EXACT
+
+        quality = EXACT
+        column_names = [name for name, _ in columns]
+        select = ', '.join(map(quote_identifier, column_names))
+        self.cursor.execute(f'SELECT {select} FROM {quote_identifier(self.table_name)};')
+        while batch := self.cursor.fetchmany(BATCH_SIZE):
+            for name, values in zip(column_names, zip(*batch)):
+                stats[name].update(values)
+                counter = counters[name]
+                if counter is None:
+                    continue
+                counter.update(values)
+                if len(counter) > max_values:
+                    counters[name] = None
+
+            if self.__expired():
+                quality = PARTIAL
+                break
+
+        return counters, stats, quality
+
+    def __sample_values(self, columns, first_rowid, last_rowid, collated_columns=()):
+        column_names = [name for name, _ in columns]
+        sketches = {name: MisraGries(SKETCH_CAPACITY) for name in column_names if name not in collated_columns}
+        stats = {name: ColumnStats(has_ordered_values(column_type)) for name, column_type in columns}
+        for name in sketches:
+            stats[name].track_distinct()
+
+        select = ', '.join(map(quote_identifier, column_names))
+        query = f'SELECT {select} FROM {quote_identifier(self.table_name)} WHERE rowid >= ? AND rowid < ?;'
+
+        # Values seen in the sample, examples of the columns without heavy hitters
+        sampled_values = {name: {} for name in column_names}
+
+        quality = ESTIMATED
+        sampled_rows = 0
+        sampled_blocks = []
+        for block_start in self.__sample_blocks(first_rowid, last_rowid):
+            block = self.__execute(query, (block_start, block_start + self.config.block_rows))
+            sampled_rows += len(block)
+            sampled_blocks.append(block_start)
+            for name, values in zip(column_names, zip(*block)):
+                stats[name].update(values)
+                if name not in sketches:
+                    continue
+                sketches[name].update(values)
+                seen = sampled_values[name]
+                for value in values[:self.top_k - len(seen)]:
+                    seen[value] = 1
+            if self.__expired():
+                quality = PARTIAL
+                break
+
+        # Scale the sample counts to the estimated table size
+        scale = (last_rowid - first_rowid + 1) / max(sampled_rows, 1)
+        value_counts = {}
+        for name, sketch in sketches.items():
+            estimates = {value: max(1, round(count * scale)) for value, count in sketch.items()}
+            for value, count in sampled_values[name].items():
+                estimates.setdefault(value, count)
+            value_counts[name] = top_values(estimates.items(), self.top_k)
+        for name in collated_columns:
+            block_values = self.__group_by_blocks(name, sampled_blocks) if sampled_blocks else []
+            value_counts[name] = [(value, max(1, round(count * scale))) for value, count in block_values]
+        return value_counts, stats, sampled_rows, quality
+
+    def __row_count(self, first_rowid=None, last_rowid=None, stat1_row_count=None):
+        """Estimated row count, when the table was not fully read."""
+        if stat1_row_count is not None:
+            return stat1_row_count
+        if first_rowid is None:
+            first_rowid, last_rowid = self.__rowid_range()
+        if first_rowid is None:
+            return None
+        return last_rowid - first_rowid + 1
+
+    def __profile_exact(self, columns, collated_columns, stat1_row_count, stat1_distinct_counts):
+        """
+        Profiles the whole table: the low-cardinality columns in a single Python pass, the high-cardinality ones
+        in passes of a few columns when the table is small enough, the others by SQLite.
+        """
+        probe = self.__probe_cardinality(columns) if columns else None
+        high_cardinality = set()
+        estimated_rows = None
+        if probe is not None:
+            estimated_rows = self.__row_count(stat1_row_count=stat1_row_count)
+            for name, (distinct, non_null) in probe.items():
+                expected_distinct = distinct / BATCH_SIZE * estimated_rows if estimated_rows is not None else distinct
+                if distinct > HIGH_CARDINALITY_RATIO * non_null and expected_distinct > MAX_TRACKED_VALUES:
+                    high_cardinality.add(name)
+        scanned_columns = [
+            (name, col_type) for name, col_type in columns if name not in collated_columns | high_cardinality]
+        passes = [(scanned_columns, MAX_TRACKED_VALUES)]
+
+        # Every value of a high-cardinality column may be distinct: the passes hold at most HIGH_CARDINALITY_VALUES
+        counted_columns = [
+            (name, col_type) for name, col_type in columns if name in high_cardinality - collated_columns]
+        columns_per_pass = HIGH_CARDINALITY_VALUES // estimated_rows if estimated_rows else 0
+        if len(counted_columns) >= MIN_SCANNED_COLUMNS and columns_per_pass >= MIN_SCANNED_COLUMNS:
+            if len(scanned_columns) < MIN_SCANNED_COLUMNS:
+                # Too few low-cardinality columns for a pass of their own
+                counted_columns = scanned_columns + counted_columns
+                passes = []
+            n_passes = -(-len(counted_columns) // columns_per_pass)
+            pass_size = -(-len(counted_columns) // n_passes)
+            passes += [
+                (counted_columns[start:start + pass_size], estimated_rows)
+                    for start in range(0, len(counted_columns), pass_size)]
+        elif probe is not None and len(scanned_columns) < MIN_SCANNED_COLUMNS:
+            passes = []
+        read_columns = {name for pass_columns, _ in passes for name, _ in pass_columns}
+        grouped_columns = [(name, col_type) for name, col_type in columns if name not in read_columns]
+
+        profile = {}
+        stats = {}
+        row_count = None
+        for pass_columns, max_values in passes:
+            # The first pass reads at least one batch of rows, even once the probe exhausted the budget
+            if stats and self.__expired():
+                grouped_columns.extend(pass_columns)
+                continue
+            counters, pass_stats, quality = self.__count_values(pass_columns, max_values)
+            stats.update(pass_stats)
+            if pass_columns and quality == EXACT:
+                row_count = pass_stats[pass_columns[0][0]].rows
+            for name, counter in counters.items():
+                if counter is not None:
+                    value_counts = top_values(counter.items(), self.top_k)
+                    distinct_count = len(counter) - (None in counter)
+                    # The distinct values of the rows read before the time budget expired: a lower bound
+                    distinct_key = 'approx_distinct_count' if quality == PARTIAL else 'distinct_count'
+                    column_stats = stats[name].to_dict(distinct_count, distinct_key)
+                    profile[name] = {'value_counts': value_counts, 'quality': quality, 'stats': column_stats}
+                else:
+                    # Too many values to be counted in memory
+                    grouped_columns.append((name, None))
+
+        unread_columns = [(name, col_type) for name, col_type in grouped_columns if name not in stats]
+        if unread_columns and not self.__expired():
+            unread_stats, row_count = self.__aggregate_stats(unread_columns)
+            stats.update(unread_stats)
+
+        for name, _ in grouped_columns:
+            if self.__expired() or name not in stats:
+                profile[name] = {'value_counts': [], 'quality': PARTIAL, 'stats': stats[name].to_dict() if name in stats else {}}
+                continue
+            if name in high_cardinality:
+                value_counts, _ = self.__group_by_values(name, count_groups=False)
+                distinct_count, distinct_key = self.__grouped_distinct_count(
+                    name, value_counts, stats[name], probe, stat1_distinct_counts)
+            else:
+                value_counts, groups = self.__group_by_values(name)
+                distinct_count, distinct_key = groups - (stats[name].nulls > 0), 'distinct_count'
+            profile[name] = {
+                'value_counts': value_counts,
+                'quality': EXACT,
+                'stats': stats[name].to_dict(distinct_count, distinct_key)
+            }
+
+        if row_count is not None:
+            table_stats = {'row_count': row_count, 'row_count_exact': True}
+        elif columns:
+            table_stats = {'row_count': self.__row_count(stat1_row_count=stat1_row_count), 'row_count_exact': False}
+        else:
+            row_count = self.__execute(f'SELECT COUNT(*) FROM {quote_identifier(self.table_name)};')[0][0]
+            table_stats = {'row_count': row_count, 'row_count_exact': True}
+        return profile, table_stats
+
+    def profile(self, columns):
+        """
+        Profiles the given (name, type) columns, returning a tuple:
+        1. a dictionary mapping each column name to its profile:
+            a) value_counts: the top (value, count) pairs
+            b) quality: how the values were computed, `exact`, `estimated` (sampled), or `partial` (time budget exceeded)
+            c) stats: null_fraction (if any null), min and max (numeric and date/time columns),
+                distinct_count or approx_distinct_count
+        2. the table statistics: row_count, and row_count_exact
+        """
+        unique_columns = get_unique_columns(self.cursor, self.table_name)
+        counted_columns = [(name, col_type) for name, col_type in columns if name not in unique_columns]
+        stat1_row_count, stat1_distinct_counts = read_sqlite_stat1(self.cursor, self.table_name)
+        collated_columns = set(get_collations(self.cursor, self.table_name)) & {name for name, _ in counted_columns}
+
+        profile = {}
+        first_rowid, last_rowid = None, None
+        if self.config.approximate and counted_columns:
+            first_rowid, last_rowid = self.__rowid_range()
+
+        if first_rowid is not None and last_rowid - first_rowid + 1 > self.config.sample_threshold:
+            value_counts, stats, sampled_rows, quality = self.__sample_values(
+                counted_columns, first_rowid, last_rowid, collated_columns)
+            row_count = self.__row_count(first_rowid, last_rowid, stat1_row_count)
+            for name, _ in counted_columns:
+                distinct_count = None
+                sampled_distinct = len(stats[name].distinct) if stats[name].distinct is not None else 0
+                if name in stat1_distinct_counts:
+                    distinct_count = stat1_distinct_counts[name]
+                elif sampled_distinct and sampled_distinct >= 0.9 * (stats[name].rows - stats[name].nulls):
+                    # Almost every sampled value is distinct: extrapolate to the whole table
+                    distinct_count = round(sampled_distinct * row_count / max(sampled_rows, 1))
+                column_stats = stats[name].to_dict(distinct_count, 'approx_distinct_count')
+                profile[name] = {'value_counts': value_counts[name], 'quality': quality, 'stats': column_stats}
+            table_stats = {'row_count': row_count, 'row_count_exact': False}
+        else:
+            profile, table_stats = self.__profile_exact(
+                counted_columns, collated_columns, stat1_row_count, stat1_distinct_counts)
+
+        for name, col_type in columns:
+            if name in unique_columns:
+                value_counts, column_stats = self.__unique_column_profile(name, col_type, table_stats)
+                profile[name] = {'value_counts': value_counts, 'quality': EXACT, 'stats': column_stats}
+
+        return profile, table_stats
@@ -1,4 +1,17 @@
-STANDARD_FIELDS = {"name", "type", "distinct_values", "data_type"}
+import re
+
+from strands_data_analyst.join_graph import get_join_graph
+from strands_data_analyst.tokens import count_tokens
+
+
+STANDARD_FIELDS = {"name", "type", "distinct_values", "data_type", "examples_quality", "primary_key", "indexed"}
+STATS_FIELDS = {"min", "max", "distinct_count", "approx_distinct_count", "null_fraction"}
+
+SIMPLE_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+# Compact format degradation levels, tried in order until the schema fits the token budget:
+# (max examples per column, max characters per example)
+COMPACT_LEVELS = [(None, None), (3, None), (2, None), (1, None), (1, 24), (1, 12)]
 
 
 def format_example(example):
@@ -10,16 +23,22 @@ def format_example(example):
 
 def format_table_field(field):
     description = []
-    
+    quality = field.get('examples_quality', 'exact')
+    quality_description = "" if quality == 'exact' else f" ({quality})"
+
     if field['type'] == 'INTEGER' and set(field['distinct_values']) == {0, 1}:
         description.append("BINARY-FLAG (0, 1)")
     else:
         description.append(f"Type {field['type']}")
+        if field.get('primary_key'):
+            description.append("Primary Key")
+        elif field.get('indexed'):
+            description.append("Indexed")
         if len(field['distinct_values']) == 1:
-           examples_description = f"Unique Value: {field['distinct_values'][0]}"
+           examples_description = f"Unique Value{quality_description}: {field['distinct_values'][0]}"
         else:
             examples = ', '.join([format_example(example) for example in field['distinct_values']])
-            examples_description = f"Examples: {examples}"
+            examples_description = f"Examples{quality_description}: {examples}"
         description.append(examples_description)
 
     for key, value in field.items():
@@ -30,11 +49,147 @@ def format_table_field(field):
     return f"- {field['name']}: {'. '.join(description)}."
 
 
-def format_db_schema(db_schema):
+def format_row_count(info):
+    if info.get('row_count') is None:
+        return None
+    if info.get('row_count_exact', True):
+        return f"Rows: {info['row_count']:,}"
+    return f"Rows: ~{info['row_count']:,} (estimated)"
+
+
+def format_join_graph(joins):
+    if not joins:
+        return ""
+    join_descriptions = "\n".join(
+        f'- "{join["table"]}"."{join["column"]}" = "{join["ref_table"]}"."{join["ref_column"]}" ({join["source"]})'
+            for join in joins)
+    return f"#### Join Graph:\n{join_descriptions}"
+
+
+def format_db_schema(db_schema, table_info=None):
+    table_info = table_info or {}
     formatted_db_schema = []
     for table, table_schema in db_schema.items():
         table_description = [f'#### Table Name: "{table}"']
+        row_count = format_row_count(table_info.get(table, {}))
+        if row_count is not None:
+            table_description.append(row_count)
         field_descriptions = "\n".join(format_table_field(field) for field in table_schema)
         table_description.append(f"## Column Descriptions:\n{field_descriptions}")
         formatted_db_schema.append('\n'.join(table_description))
+
+    joins = format_join_graph(get_join_graph(db_schema, table_info))
+    if joins:
+        formatted_db_schema.append(joins)
     return '\n'.join(formatted_db_schema)
+
+
+def compact_identifier(name):
+    name = str(name)
+    if SIMPLE_IDENTIFIER.match(name):
+        return name
+    return '"' + name.replace('"', '""') + '"'
+
+
+def compact_example(example, max_chars=None):
+    if type(example) is str:
+        if max_chars is not None and len(example) > max_chars:
+            example = example[:max_chars] + "..."
+        return f'"{example}"'
+    return str(example)
+
+
+def compact_row_count(info):
+    if info.get('row_count') is None:
+        return ""
+    if info.get('row_count_exact', True):
+        return f" -- {info['row_count']:,} rows"
+    return f" -- ~{info['row_count']:,} rows"
+
+
+def format_compact_column(field):
+    column = f"{compact_identifier(field['name'])} {field['type']}"
+    if field.get('primary_key'):
+        column += " PK"
+    elif field.get('indexed'):
+        column += " IDX"
+    return column
+
+
+def format_compact_notes(field, max_examples=None, max_chars=None):
+    notes = []
+    values = field['distinct_values']
+    if field['type'] == 'INTEGER' and set(values) == {0, 1}:
+        notes.append("flag 0/1")
+    elif values:
+        examples = ", ".join(compact_example(example, max_chars) for example in values[:max_examples])
+        if max_examples is not None and len(values) > max_examples:
+            examples += ", ..."
+        quality = field.get('examples_quality', 'exact')
+        notes.append(examples if quality == 'exact' else f"{examples} ({quality})")
+    if field.get('min') is not None and field.get('min') != field.get('max'):
+        notes.append(f"{compact_example(field['min'], max_chars)}..{compact_example(field['max'], max_chars)}")
+    if field.get('distinct_count') is not None:
+        notes.append(f"{field['distinct_count']:,} distinct")
+    elif field.get('approx_distinct_count') is not None:
+        notes.append(f"~{field['approx_distinct_count']:,} distinct")
+    if field.get('null_fraction'):
+        notes.append(f"{field['null_fraction']:.0%} null")
+    for key, value in field.items():
+        if key not in STANDARD_FIELDS and key not in STATS_FIELDS:
+            notes.append(f"{key}={value}")
+
+    return '; '.join(notes)
+
+
+def format_compact_table(table, table_schema, info, max_examples=None, max_chars=None):
+    fields = []
+    for i, field in enumerate(table_schema, start=1):
+        column = "  " + format_compact_column(field) + ("," if i < len(table_schema) else "")
+        notes = format_compact_notes(field, max_examples, max_chars)
+        fields.append(f"{column} -- {notes}" if notes else column)
+    fields = "\n".join(fields)
+    return f"CREATE TABLE {compact_identifier(table)} ({compact_row_count(info)}\n{fields}\n);"
+
+
+def format_compact_table_summary(table, table_schema, info):
+    """Table-level summary: the column names and types only."""
+    columns = ", ".join(format_compact_column(field) for field in table_schema)
+    return f"CREATE TABLE {compact_identifier(table)} ({columns});{compact_row_count(info)}"
+
+
+def format_compact_joins(joins):
+    return "\n".join(
+        f"-- JOIN {compact_identifier(join['table'])}.{compact_identifier(join['column'])}"
+        f" = {compact_identifier(join['ref_table'])}.{compact_identifier(join['ref_column'])}"
+            for join in joins)
+
+
+def format_compact_db_schema(db_schema, table_info=None, token_budget=None):
+    """
+    DDL-style schema, with the examples and statistics of the columns in inline comments.
+    When a `token_budget` is given, the schema degrades until it fits the budget: fewer examples first,
+    then truncated long strings, then tables summarized to their column names, the largest tables first.
+    """
+    table_info = table_info or {}
+    joins = format_compact_joins(get_join_graph(db_schema, table_info))
+
+    def render(tables):
+        return "\n".join(list(tables.values()) + ([joins] if joins else []))
+
+    for max_examples, max_chars in COMPACT_LEVELS:
+        tables = {
+            table: format_compact_table(table, table_schema, table_info.get(table, {}), max_examples, max_chars)
+                for table, table_schema in db_schema.items()}
+        formatted_db_schema = render(tables)
+        if token_budget is None or count_tokens(formatted_db_schema) <= token_budget:
+            return formatted_db_schema
+
+    excess = count_tokens(formatted_db_schema) - token_budget
+    for table in sorted(tables, key=lambda table: -count_tokens(tables[table])):
+        summary = format_compact_table_summary(table, db_schema[table], table_info.get(table, {}))
+        excess -= count_tokens(tables[table]) - count_tokens(summary)
+        tables[table] = summary
+        if excess <= 0:
+            break
+    return render(tables)
@@ -0,0 +1,311 @@
+import os
+import time
+import weakref
+import threading
+import traceback
+import multiprocessing
+
+from strands_data_analyst.python_environment import PythonInterpreter
+from strands_data_analyst.telemetry import get_rss
+
+
+# Imported once by the fork server, and inherited by every worker forked from it
+PRELOADED_MODULES = ['numpy', 'pandas', 'matplotlib', 'matplotlib.pyplot', 'strands_data_analyst.python_environment']
+
+# Idle workers kept ready to be assigned to a new session
+SPARE_WORKERS = 2
+
+# Default per-call limits
+TIME_LIMIT = 120
+MEMORY_LIMIT = 2 * 1024 * 1024 * 1024
+
+POLL_INTERVAL = 0.05
+
+
+class WorkerKilled(Exception):
+    pass
+
+
+def set_memory_limit(memory_limit):
+    """Caps the address space of the worker, so that allocations beyond the limit raise a MemoryError."""
+    try:
+        import resource
+        with open(f"/proc/{os.getpid()}/statm") as statm:
+            virtual_memory = int(statm.read().split()[0]) * os.sysconf('SC_PAGE_SIZE')
+        resource.setrlimit(resource.RLIMIT_AS, (virtual_memory + memory_limit, resource.RLIM_INFINITY))
+    except (ImportError, OSError, ValueError):
+        pass
+
+
+def setup_worker(interpreter, code, settings, query_cache, workspace):
+    """
+    Sets the output limits and the telemetry settings of the interpreter, runs the setup code (e.g. opening `db_conn`),
+    whose variables are restored after every state reset, and sets the query cache and the workspace.
+    """
+    for name, value in settings.items():
+        setattr(interpreter, name, value)
+    if code is not None:
+        variables = {}
+        exec(code, variables)
+        variables.pop('__builtins__', None)
+        interpreter.injected.update(variables)
+    interpreter.set_query_cache(query_cache)
+    interpreter.workspace = workspace
+    if workspace is not None:
+        interpreter.injected['workspace'] = workspace
+    interpreter.clear_state()
+
+
+def run_worker(connection, memory_limit):
+    import matplotlib
+    matplotlib.use('svg')
+    if memory_limit is not None:
+        set_memory_limit(memory_limit)
+
+    interpreter = PythonInterpreter()
+    commands = {
+        'execute': interpreter.execute,
+        'setup': lambda *args: setup_worker(interpreter, *args),
+        'clear': interpreter.clear_state,
+        'contains': lambda name: name in interpreter.state,
+        'get': lambda name: interpreter.state[name],
+        'set': lambda name, value: interpreter.state.__setitem__(name, value),
+        'save_workspace': interpreter.save_workspace,
+        'workspace_inventory': interpreter.get_workspace_inventory,
+        'workspace_contains': interpreter.workspace_contains,
+        'clear_workspace': interpreter.clear_workspace,
+        'pop_events': interpreter.pop_events,
+    }
+    while True:
+        try:
+            command, args = connection.recv()
+        except EOFError:
+            return
+        try:
+            connection.send(('ok', commands[command](*args)))
+        except BaseException as e:
+            connection.send(('error', ''.join(traceback.format_exception_only(e)).strip()))
+
+
+class Worker:
+    """A worker process running the code of a single session, in its own persistent state."""
+    def __init__(self, context, memory_limit):
+        self.connection, worker_connection = context.Pipe()
+        self.process = context.Process(target=run_worker, args=(worker_connection, memory_limit), daemon=True)
+        self.process.start()
+        worker_connection.close()
+
+    def call(self, command, *args, time_limit=None, memory_limit=None):
+        try:
+            self.connection.send((command, args))
+        except OSError:
+            raise WorkerKilled("The Python worker died")
+        deadline = time.monotonic() + time_limit if time_limit is not None else None
+        while not self.connection.poll(POLL_INTERVAL):
+            if not self.process.is_alive():
+                raise WorkerKilled("The Python worker died")
+            if deadline is not None and time.monotonic() > deadline:
+                self.kill()
+                raise WorkerKilled(f"The code exceeded the time limit of {time_limit}s, and was killed")
+            rss = get_rss(self.process.pid) if memory_limit is not None else None
+            if rss is not None and rss > memory_limit:
+                self.kill()
+                raise WorkerKilled(f"The code exceeded the memory limit of {memory_limit // 2 ** 20}MB, and was killed")
+
+        try:
+            status, value = self.connection.recv()
+        except (EOFError, OSError):
+            raise WorkerKilled("The Python worker died")
+        if status == 'error':
+            raise Exception(value)
+        return value
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.connection.close()
+
+
+class WorkerPool:
+    """
+    Pool of worker processes forked from a fork server which pre-imported pandas, numpy and matplotlib.
+    Every session is assigned a dedicated worker, holding its state until the session ends,
+    and `spare_workers` workers are kept started to serve the new sessions without waiting.
+    """
+    def __init__(self, spare_workers=SPARE_WORKERS, memory_limit=MEMORY_LIMIT):
+        if 'forkserver' in multiprocessing.get_all_start_methods():
+            self.context = multiprocessing.get_context('forkserver')
+            self.context.set_forkserver_preload(PRELOADED_MODULES)
+        else:
+            self.context = multiprocessing.get_context('spawn')
+        self.spare_workers = spare_workers
+        self.memory_limit = memory_limit
+        self.spares = []
+        # Workers being started by the refills, counted under the lock so that concurrent refills do not overshoot
+        self.starting = 0
+        self.closed = False
+        self.lock = threading.Lock()
+        self.refill()
+
+    def start_worker(self):
+        return Worker(self.context, self.memory_limit)
+
+    def refill(self):
+        with self.lock:
+            missing = 0 if self.closed else self.spare_workers - len(self.spares) - self.starting
+            self.starting += max(missing, 0)
+        for _ in range(missing):
+            try:
+                worker = self.start_worker()
+            except Exception:
+                with self.lock:
+                    self.starting -= 1
+                raise
+            with self.lock:
+                self.starting -= 1
+                if not self.closed:
+                    self.spares.append(worker)
+                    continue
+            worker.kill()
+
+    def acquire(self):
+        with self.lock:
+            worker = self.spares.pop() if self.spares else None
+        if worker is None:
+            worker = self.start_worker()
+        threading.Thread(target=self.refill, daemon=True).start()
+        return worker
+
+    def release(self, worker):
+        # Workers are not reused across sessions, their modules and globals could leak state
+        worker.kill()
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            spares, self.spares = self.spares, []
+        for worker in spares:
+            worker.kill()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_worker_pool():
+    """The worker pool shared by all the sessions of the process."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = WorkerPool()
+        return _pool
+
+
+class RemoteState:
+    """Read access to the state of the worker of a session, the values are copied from the worker on access."""
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+
+    def __contains__(self, name):
+        return self.interpreter.call('contains', name)
+
+    def __getitem__(self, name):
+        return self.interpreter.call('get', name)
+
+    def __setitem__(self, name, value):
+        self.interpreter.call('set', name, value)
+
+    def get(self, name, default=None):
+        return self[name] if name in self else default
+
+
+class RemotePythonInterpreter(PythonInterpreter):
+    """
+    Python interpreter executing the code in a worker process of the pool, with the same `python_repl` tool.
+    A call exceeding the `time_limit` (seconds) or the `memory_limit` (bytes) kills the worker:
+    the session continues on a new worker, with a new state.
+    """
+    def __init__(self, pool=None, time_limit=TIME_LIMIT, memory_limit=MEMORY_LIMIT, **options):
+        self.worker = None
+        self.finalizer = None
+        # The baseline namespace is built by the worker
+        super().__init__(baseline=False, **options)
+        self.pool = pool or get_worker_pool()
+        self.time_limit = time_limit
+        self.memory_limit = memory_limit
+        self.state = RemoteState(self)
+        self.setup_code = None
+
+    def call(self, command, *args, time_limit=None):
+        new_worker = self.worker is None
+        if new_worker:
+            self.worker = self.pool.acquire()
+            self.finalizer = weakref.finalize(self, self.pool.release, self.worker)
+        try:
+            if new_worker:
+                self.setup(self.worker)
+            return self.worker.call(command, *args, time_limit=time_limit, memory_limit=self.memory_limit)
+        except WorkerKilled:
+            self.finalizer.detach()
+            self.worker = None
+            raise
+
+    def setup(self, worker):
+        worker.call(
+            'setup', self.setup_code, self.get_settings(), self.query_cache, self.workspace,
+            time_limit=self.time_limit, memory_limit=self.memory_limit)
+
+    def set_db(self, db, query_cache=False):
+        self.setup_code = db.get_connection_code()[0]
+        self.query_cache = db.get_query_cache() if query_cache else None
+        if self.worker is not None:
+            self.call(
+                'setup', self.setup_code, self.get_settings(), self.query_cache, self.workspace,
+                time_limit=self.time_limit)
+
+    def release_db(self):
+        self.setup_code = None
+        self.query_cache = None
+
+    def clear_state(self):
+        if self.worker is not None:
+            self.call('clear')
+
+    def save_workspace(self, query=None, query_number=None):
+        if self.worker is not None:
+            self.call('save_workspace', query, query_number)
+
+    def get_workspace_inventory(self):
+        return self.call('workspace_inventory') if self.worker is not None else ""
+
+    def workspace_contains(self, name):
+        # The workspace of the worker, the data-frames saved since its setup are not in the local copy
+        return self.call('workspace_contains', name)
+
+    def clear_workspace(self):
+        if self.worker is not None:
+            self.call('clear_workspace')
+
+    def pop_events(self):
+        events = self.call('pop_events') if self.worker is not None else []
+        return super().pop_events() + events
+
+    def execute(self, code):
+        start = time.perf_counter()
+        try:
+            return self.call('execute', code, time_limit=self.time_limit)
+        except WorkerKilled as e:
+            if self.telemetry:
+                # The events of the killed worker are lost, the call is recorded here
+                self.events.append({
+                    'event': 'python_repl',
+                    'code_lines': code.count('\n') + 1,
+                    'wall_time': time.perf_counter() - start,
+                    'error': type(e).__name__,
+                })
+            raise Exception(f"{e}: the Python state was reset")
+
+    def close(self):
+        if self.worker is not None:
+            self.finalizer()
+            self.worker = None
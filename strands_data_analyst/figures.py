@@ -0,0 +1,281 @@
+import time
+import builtins
+import threading
+from functools import wraps
+from collections import OrderedDict
+
+
+# pyplot functions applied to the current figure instead of the current axes, and the Figure methods they call
+FIGURE_FUNCTIONS = {
+    'suptitle': 'suptitle', 'supxlabel': 'supxlabel', 'supylabel': 'supylabel', 'tight_layout': 'tight_layout',
+    'subplots_adjust': 'subplots_adjust', 'savefig': 'savefig', 'figtext': 'text', 'figimage': 'figimage',
+    'figlegend': 'legend',
+}
+
+# pyplot functions named after the `set_`/`get_` accessors of the current axes
+AXES_ACCESSORS = ['title', 'xlabel', 'ylabel', 'xscale', 'yscale']
+AXES_LIMITS = ['xlim', 'ylim']
+AXES_TICKS = ['xticks', 'yticks']
+
+# subplots() arguments which are not Figure arguments
+SUBPLOTS_ARGUMENTS = ['sharex', 'sharey', 'squeeze', 'width_ratios', 'height_ratios', 'subplot_kw', 'gridspec_kw']
+
+
+def timed(function):
+    """Adds the time spent in a pyplot function to the `elapsed` time of the pyplot stand-in (not counting nested calls)."""
+    @wraps(function)
+    def timed_function(self, *args, **kwargs):
+        if self.timing:
+            return function(self, *args, **kwargs)
+        self.timing = True
+        start = time.perf_counter()
+        try:
+            return function(self, *args, **kwargs)
+        finally:
+            self.elapsed += time.perf_counter() - start
+            self.timing = False
+    return timed_function
+
+
+class ThreadFigures:
+    """
+    Replacement of the figure registry of the global pyplot state (`Gcf.figs`), holding one registry per thread:
+    the libraries drawing with the global pyplot (seaborn, `DataFrame.plot`) only see the figures of their thread.
+    """
+    def __init__(self, figures):
+        self.local = threading.local()
+        self.local.figures = figures
+
+    def get_figures(self):
+        figures = getattr(self.local, 'figures', None)
+        if figures is None:
+            figures = self.local.figures = OrderedDict()
+        return figures
+
+    def __getattr__(self, name):
+        return getattr(self.get_figures(), name)
+
+    def __getitem__(self, key):
+        return self.get_figures()[key]
+
+    def __setitem__(self, key, value):
+        self.get_figures()[key] = value
+
+    def __delitem__(self, key):
+        del self.get_figures()[key]
+
+    def __contains__(self, key):
+        return key in self.get_figures()
+
+    def __iter__(self):
+        return iter(self.get_figures())
+
+    def __len__(self):
+        return len(self.get_figures())
+
+
+_figures_lock = threading.Lock()
+
+
+def get_thread_figures():
+    """
+    The global pyplot registry, installing the `ThreadFigures` the first time: it is never uninstalled,
+    the figures registered before (by the installing thread) stay in the registry of that thread.
+    """
+    from matplotlib._pylab_helpers import Gcf
+    with _figures_lock:
+        if not isinstance(Gcf.figs, ThreadFigures):
+            Gcf.figs = ThreadFigures(Gcf.figs)
+        return Gcf
+
+
+class Pyplot:
+    """
+    Stand-in for `matplotlib.pyplot` in the namespace of an interpreter: the figures are `matplotlib.figure.Figure`
+    objects owned by the interpreter, not registered in the global pyplot state, so that several interpreters
+    can draw from different threads. The functions which do not depend on the current figure are the pyplot ones.
+    The time spent in its functions is added up in `elapsed`.
+
+    During a call (between `activate()` and `release()`), the current figure is also the active figure
+    of the global pyplot registry of the thread: the libraries drawing with the global pyplot draw on it,
+    and the figures they create are adopted by the interpreter, then removed from the registry by `release()`.
+    """
+    def __init__(self):
+        self.figures = []
+        self.current = None
+        self.elapsed = 0.0
+        self.timing = False
+
+    @timed
+    def figure(self, num=None, figsize=None, dpi=None, *, clear=False, FigureClass=None, **kwargs):
+        from matplotlib.figure import Figure
+        if isinstance(num, Figure):
+            self.current = num
+            return num
+        if isinstance(num, int) and 0 < num <= len(self.figures):
+            self.current = self.figures[num - 1]
+            return self.current
+        figure = (FigureClass or Figure)(figsize=figsize, dpi=dpi, **kwargs)
+        self.figures.append(figure)
+        self.set_current(figure)
+        return figure
+
+    def set_current(self, figure):
+        """Makes the figure current, and the active figure of the global pyplot registry of the thread."""
+        from matplotlib import pyplot
+        self.current = figure
+        if figure is None:
+            return
+        registry = get_thread_figures()
+        manager = figure.canvas.manager
+        if manager is None:
+            number = max(pyplot.get_fignums(), default=0) + 1
+            manager = pyplot._get_backend_mod().new_figure_manager_given_figure(number, figure)
+        registry._set_new_active_manager(manager)
+
+    def adopt(self):
+        """Adopts the figures created by the global pyplot of the thread, the active one becoming current."""
+        registry = get_thread_figures()
+        for manager in registry.get_all_fig_managers():
+            if manager.canvas.figure not in self.figures:
+                self.figures.append(manager.canvas.figure)
+        active = registry.get_active()
+        if active is not None:
+            self.current = active.canvas.figure
+
+    def activate(self):
+        """Starts a call: the current figure is made the active figure of the global pyplot of the thread."""
+        get_thread_figures().figs.clear()
+        self.set_current(self.current)
+
+    def release(self):
+        """Ends a call: adopts the figures of the global pyplot of the thread, and empties its registry."""
+        self.adopt()
+        get_thread_figures().figs.clear()
+
+    @timed
+    def subplots(self, nrows=1, ncols=1, **kwargs):
+        options = {name: kwargs.pop(name) for name in SUBPLOTS_ARGUMENTS if name in kwargs}
+        figure = self.figure(**kwargs)
+        return figure, figure.subplots(nrows, ncols, **options)
+
+    @timed
+    def subplot(self, *args, **kwargs):
+        return self.gcf().add_subplot(*args, **kwargs)
+
+    def gcf(self):
+        self.adopt()
+        return self.current if self.current is not None else self.figure()
+
+    def gca(self):
+        return self.gcf().gca()
+
+    def sca(self, axes):
+        self.set_current(axes.figure)
+        axes.figure.sca(axes)
+
+    def gci(self):
+        axes = self.gca()
+        artists = axes.images + axes.collections
+        return artists[-1] if artists else None
+
+    @timed
+    def colorbar(self, mappable=None, **kwargs):
+        return self.gcf().colorbar(mappable if mappable is not None else self.gci(), **kwargs)
+
+    def get_fignums(self):
+        return list(range(1, len(self.figures) + 1))
+
+    def close(self, figure=None):
+        self.adopt()
+        if figure is None:
+            figure = self.current
+        registry = get_thread_figures()
+        if figure == 'all':
+            self.figures.clear()
+            registry.figs.clear()
+        elif figure in self.figures:
+            self.figures.remove(figure)
+            if figure.canvas.manager is not None and registry.figs.get(figure.canvas.manager.num) is figure.canvas.manager:
+                registry.figs.pop(figure.canvas.manager.num)
+        if figure == 'all' or figure is self.current:
+            self.set_current(self.figures[-1] if self.figures else None)
+
+    def show(self, *args, **kwargs):
+        pass
+
+    def __getattr__(self, name):
+        if name in FIGURE_FUNCTIONS:
+            return lambda *args, **kwargs: self.call(lambda: getattr(self.gcf(), FIGURE_FUNCTIONS[name]), args, kwargs)
+        if name in AXES_ACCESSORS:
+            return lambda *args, **kwargs: self.call(lambda: getattr(self.gca(), f"set_{name}"), args, kwargs)
+        if name in AXES_LIMITS:
+            return lambda *args, **kwargs: self.limits(name, *args, **kwargs)
+        if name in AXES_TICKS:
+            return lambda *args, **kwargs: self.ticks(name, *args, **kwargs)
+
+        from matplotlib import pyplot
+        from matplotlib.axes import Axes
+        if hasattr(Axes, name):
+            return lambda *args, **kwargs: self.call(lambda: getattr(self.gca(), name), args, kwargs)
+        return getattr(pyplot, name)
+
+    @timed
+    def call(self, get_function, args, kwargs):
+        return get_function()(*args, **kwargs)
+
+    @timed
+    def limits(self, name, *args, **kwargs):
+        axes = self.gca()
+        if not args and not kwargs:
+            return getattr(axes, f"get_{name}")()
+        return getattr(axes, f"set_{name}")(*args, **kwargs)
+
+    @timed
+    def ticks(self, name, ticks=None, labels=None, *, minor=False, **kwargs):
+        axes = self.gca()
+        if ticks is None:
+            locations = getattr(axes, f"get_{name}")(minor=minor)
+            if labels is not None:
+                raise TypeError(f"{name}(): set the ticks with the labels")
+        else:
+            locations = getattr(axes, f"set_{name}")(ticks, minor=minor)
+        if labels is None:
+            labels = getattr(axes, f"get_{name[0]}ticklabels")(minor=minor)
+            for label in labels:
+                label.update(kwargs)
+        else:
+            labels = getattr(axes, f"set_{name[0]}ticklabels")(labels, minor=minor, **kwargs)
+        return locations, labels
+
+
+class Matplotlib:
+    """Stand-in for the `matplotlib` package, whose `pyplot` is the interpreter one, and whose backend is fixed."""
+    def __init__(self, pyplot):
+        self.pyplot = pyplot
+
+    def use(self, backend, force=True):
+        pass
+
+    def __getattr__(self, name):
+        import matplotlib
+        return getattr(matplotlib, name)
+
+
+def get_builtins(package):
+    """The builtins of an interpreter namespace, whose `import` statements of matplotlib return the interpreter ones."""
+    pyplot = package.pyplot
+
+    def import_module(name, globals=None, locals=None, fromlist=(), level=0):
+        module = builtins.__import__(name, globals, locals, fromlist, level)
+        if level == 0 and (name == 'matplotlib' or name.startswith('matplotlib.')):
+            # `import matplotlib.<module>` binds `matplotlib`, which has to stay the interpreter one
+            if not fromlist or name == 'matplotlib':
+                return package
+            if name == 'matplotlib.pyplot':
+                return pyplot
+        return module
+
+    namespace = dict(vars(builtins))
+    namespace['__import__'] = import_module
+    return namespace
@@ -1,4 +1,5 @@
 import os
+import threading
 from uuid import uuid4
 
 
@@ -19,9 +20,12 @@ class ImageHandler:
         self.img_dir = img_dir
         self.img_url = img_url
         self.images = []
+        # The goal agents of a parallel exploration save their images at the same time
+        self.lock = threading.Lock()
 
     def reset(self):
-        self.images = []
+        with self.lock:
+            self.images = []
 
     def save_img(self, img, caption):
         filename = f"{uuid4()}.png"
@@ -32,7 +36,8 @@ class ImageHandler:
             filepath,
             os.path.join(self.img_url, filename),
             caption)
-        self.images.append(image)
+        with self.lock:
+            self.images.append(image)
         return image
 
     def update_paths(self, html):
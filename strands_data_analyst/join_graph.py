@@ -0,0 +1,120 @@
+import re
+
+
+# Key names too generic to infer a join from the column name alone
+GENERIC_KEYS = {"id", "key", "code", "name", "type"}
+
+DECLARED = 'foreign key'
+INFERRED = 'inferred'
+
+
+def normalize_name(name):
+    return re.sub(r'[^a-z0-9]', '', str(name).lower())
+
+
+def singular(name):
+    if name.endswith('ies'):
+        return name[:-3] + 'y'
+    if name.endswith('s') and not name.endswith('ss'):
+        return name[:-1]
+    return name
+
+
+def is_unique_column(field, info):
+    """A column whose distinct values are as many as the table rows."""
+    return (
+        info.get('row_count_exact', False)
+            and info.get('row_count')
+            and field.get('distinct_count') == info['row_count'])
+
+
+def get_table_key(table, table_schema, info):
+    """
+    The column referenced by the other tables joining this one: the single-column primary key,
+    otherwise a unique column named after the table (e.g. `id`, `customer_id`).
+    """
+    primary_key = info.get('primary_key') or []
+    if len(primary_key) == 1:
+        return primary_key[0]
+
+    table_name = normalize_name(table)
+    key_names = {"id", f"{table_name}id", f"{singular(table_name)}id"}
+    for field in table_schema:
+        if normalize_name(field['name']) in key_names and is_unique_column(field, info):
+            return field['name']
+    return None
+
+
+def get_reference_names(table, key):
+    """The normalized names a column can have to reference the `key` of `table`."""
+    key_name = normalize_name(key)
+    table_name = normalize_name(table)
+    names = {f"{table_name}{key_name}", f"{singular(table_name)}{key_name}"}
+    if key_name not in GENERIC_KEYS:
+        names.add(key_name)
+    return names
+
+
+def get_join_graph(db_schema, table_info=None):
+    """
+    Returns the list of joins between the tables, each one a dictionary with the fields:
+    table, column, ref_table, ref_column, and source: `foreign key` (declared) or `inferred` (from the column names).
+    """
+    table_info = table_info or {}
+    joins = []
+    declared = set()
+    for table in db_schema:
+        for fk in table_info.get(table, {}).get('foreign_keys', []):
+            ref_column = fk['ref_column']
+            if ref_column is None:
+                ref_primary_key = table_info.get(fk['ref_table'], {}).get('primary_key') or [None]
+                ref_column = ref_primary_key[0]
+            joins.append({
+                'table': table,
+                'column': fk['column'],
+                'ref_table': fk['ref_table'],
+                'ref_column': ref_column,
+                'source': DECLARED
+            })
+            declared.add((table, fk['column']))
+
+    table_keys = {}
+    for table, table_schema in db_schema.items():
+        key = get_table_key(table, table_schema, table_info.get(table, {}))
+        if key is not None:
+            table_keys[table] = (key, get_reference_names(table, key))
+
+    joined = {frozenset([(join['table'], join['column']), (join['ref_table'], join['ref_column'])]) for join in joins}
+    for table, table_schema in db_schema.items():
+        for field in table_schema:
+            if (table, field['name']) in declared:
+                continue
+            column_name = normalize_name(field['name'])
+            for ref_table, (ref_column, reference_names) in table_keys.items():
+                if ref_table == table or column_name not in reference_names:
+                    continue
+                join_columns = frozenset([(table, field['name']), (ref_table, ref_column)])
+                if join_columns in joined:
+                    continue
+                joined.add(join_columns)
+                joins.append({
+                    'table': table,
+                    'column': field['name'],
+                    'ref_table': ref_table,
+                    'ref_column': ref_column,
+                    'source': INFERRED
+                })
+
+    return joins
+
+
+def get_join_neighbours(joins, tables):
+    """The tables directly joined to any of the given tables."""
+    tables = set(tables)
+    neighbours = set()
+    for join in joins:
+        if join['table'] in tables:
+            neighbours.add(join['ref_table'])
+        if join['ref_table'] in tables:
+            neighbours.add(join['table'])
+    return neighbours - tables
@@ -0,0 +1,86 @@
+import re
+import json
+
+from json_repair import repair_json
+
+
+class JSONArrayParser:
+    """
+    Incremental parser of a streamed JSON array of objects (e.g. the output of a model), returning each of its items
+    as soon as it is complete. The text around the array (e.g. a markdown fence) is skipped, as well as the
+    arrays without objects (e.g. `[3]` in a preamble), and the items which are not valid JSON are repaired.
+    """
+    def __init__(self):
+        self.item = ""
+        # Objects of the current array, an array completed without objects is skipped
+        self.objects = 0
+        # 1 inside the array, 0 before and after it
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.done = False
+
+    def feed(self, text):
+        """Parses the next chunk of the text, returning the items completed by it."""
+        items = []
+        for char in text:
+            if self.done:
+                break
+            if self.depth == 0:
+                if char == '[':
+                    self.depth = 1
+                continue
+
+            if self.in_string:
+                self.item += char
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.item += char
+                self.in_string = True
+            elif char in '[{':
+                self.item += char
+                self.depth += 1
+            elif char in ']}':
+                self.depth -= 1
+                if self.depth == 0:
+                    # End of the array, the parsing goes on after the arrays without objects
+                    items += self.flush()
+                    self.done = self.objects > 0
+                else:
+                    self.item += char
+                    if self.depth == 1:
+                        # The objects and arrays are complete without waiting for the next comma
+                        items += self.flush()
+            elif char == ',' and self.depth == 1:
+                items += self.flush()
+            else:
+                self.item += char
+        return items
+
+    def flush(self):
+        text, self.item = self.item.strip(), ""
+        if not text:
+            return []
+        try:
+            item = json.loads(text)
+        except ValueError:
+            item = repair_json(text, return_objects=True)
+            if item == "":
+                return []
+        if isinstance(item, dict):
+            self.objects += 1
+        return [item]
+
+
+ARRAY_OF_OBJECTS = re.compile(r"\[\s*\{")
+
+
+def parse_array_of_objects(text):
+    """Parses (and repairs) the whole text, from its first array of objects if any."""
+    match = ARRAY_OF_OBJECTS.search(text)
+    return repair_json(text[match.start():] if match else text, return_objects=True)
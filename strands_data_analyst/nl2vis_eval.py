@@ -15,6 +15,7 @@ from viseval.evaluate import Evaluator, CheckResult, EvaluationResult, Evaluatio
 
 from strands_data_analyst.agent import DataAnalystAgent
 from strands_data_analyst.databases import SQLiteDB
+from strands_data_analyst.schema_cache import SchemaCache
 
 
 
@@ -25,6 +26,7 @@ DATA_DIR = pathlib.Path(__file__).parent.resolve() / ".." / "data"
 CACHE_DIR = DATA_DIR / "cache"
 
 VISEVAL_CACHE_DIR = CACHE_DIR / "visEval"
+SCHEMA_CACHE_DIR = CACHE_DIR / "schema"
 VISEVAL_TESTS = DATA_DIR / "visEval_tests.jsonl"
 VISEVAL_DBS = DATA_DIR / "visEval_dataset" / "databases"
 
@@ -66,7 +68,8 @@ def execute_test(test, analyst, verbose):
 
 def execution_check(test, analyst, context, verbose):
     try:
-        analyst.set_db(test["db_id"], SQLiteDB({'db_location': test["dp_path"]}))
+        db = SQLiteDB({'db_location': test["dp_path"]}, schema_cache=SchemaCache(SCHEMA_CACHE_DIR))
+        analyst.set_db(test["db_id"], db)
         output = execute_test(test, analyst, verbose)
         vis = output['visualization']
         f = StringIO()
@@ -118,30 +121,36 @@ def evaluate_test(test, analyst, verbose):
     return test, results
 
 
-def evaluate_parallel(tests):
+def evaluate_parallel(tests, prompt_caching=False):
     # Get an agent for each DB, to avoid repeating the DB introspection code
     agent_workers = {}
     for test in tests:
         db = test['db_id']
         if db in agent_workers: continue
         def run_db_test(test):
-            analyst = DataAnalystAgent(verbose=False, always_reset=True)
-            return evaluate_test(test, analyst, verbose=False)
+            analyst = DataAnalystAgent(verbose=False, always_reset=True, prompt_caching=prompt_caching)
+            try:
+                return evaluate_test(test, analyst, verbose=False)
+            finally:
+                analyst.close()
         agent_workers[db] = run_db_test
     with joblib_progress("Running Tests", total=len(tests)):
         processed = Parallel(n_jobs=10)(delayed(agent_workers[test['db_id']])(test) for test in tests)
     return processed
 
 
-def evaluate(parallel):
+def evaluate(parallel, prompt_caching=False):
     print("# NL2VIS Benchmark")
     os.makedirs(VISEVAL_CACHE_DIR, exist_ok=True)
     tests = list(get_tests())
     if parallel:
-        processed = evaluate_parallel(tests)
+        processed = evaluate_parallel(tests, prompt_caching)
     else:
-        analyst = DataAnalystAgent(verbose=False, always_reset=True)
-        processed = [evaluate_test(test, analyst, verbose=True) for test in tests]
+        analyst = DataAnalystAgent(verbose=False, always_reset=True, prompt_caching=prompt_caching)
+        try:
+            processed = [evaluate_test(test, analyst, verbose=True) for test in tests]
+        finally:
+            analyst.close()
 
     eval_results = defaultdict(list)
     for test, results in processed:
@@ -156,9 +165,10 @@ if __name__ == "__main__":
     from argparse import ArgumentParser
     parser = ArgumentParser()
     parser.add_argument("--debug", action="store_true")
+    parser.add_argument("--prompt-caching", action="store_true", help="Cache the system prompt and the DB schema")
     args = parser.parse_args()
 
-    result = evaluate(parallel=(not args.debug))
+    result = evaluate(parallel=(not args.debug), prompt_caching=args.prompt_caching)
     
     print("Scores:")
     scores = result.score()
@@ -0,0 +1,210 @@
+import re
+import ast
+
+from strands_data_analyst.query_cache import normalize_sql
+
+
+# Tables with more rows are not read whole
+LARGE_TABLE_ROWS = 100_000
+
+# LIMIT added to the `SELECT *` queries reading a whole large table
+PREVIEW_ROWS = 1_000
+
+# Queries allowed in a loop over a literal sequence (or a constant range) of at most this length
+MAX_LOOP_QUERIES = 10
+
+# Functions and methods running a SQL query given as first argument
+QUERY_FUNCTIONS = ['read_sql_query', 'read_sql', 'execute']
+# Methods fetching the results of `db_conn.execute(sql_query)`
+FETCH_METHODS = ['df', 'fetchdf', 'fetchall', 'fetch_df']
+# Data-frame methods aggregating in pandas what could be aggregated in SQL
+AGGREGATE_METHODS = ['groupby', 'pivot_table', 'value_counts']
+
+SQL_START = re.compile(r"^\s*(select|with)\b")
+SQL_TABLE = re.compile(r"\b(?:from|join)\s+(\"(?:[^\"]|\"\")+\"|`[^`]+`|\[[^\]]+\]|[\w.]+)")
+SQL_AGGREGATE = re.compile(r"\b(count|sum|avg|min|max|total|group_concat|string_agg)\s*\(")
+SQL_RESTRICTION = re.compile(r"\b(where|group\s+by|having|limit)\b")
+SELECT_STAR = re.compile(r"^\s*select\s+(distinct\s+)?\*\s+from\b")
+
+
+class PreflightError(Exception):
+    pass
+
+
+def get_name(node):
+    """The function or method name of a call."""
+    if isinstance(node.func, ast.Name):
+        return node.func.id
+    if isinstance(node.func, ast.Attribute):
+        return node.func.attr
+    return None
+
+
+def get_root_name(node):
+    """The variable at the root of an attribute/subscript chain, e.g. `data_frame` of `data_frame[['a']].groupby`."""
+    while isinstance(node, (ast.Attribute, ast.Subscript, ast.Call)):
+        node = node.func if isinstance(node, ast.Call) else node.value
+    return node.id if isinstance(node, ast.Name) else None
+
+
+def is_bounded_loop(node):
+    """Loops over a literal sequence, or a constant range, of at most MAX_LOOP_QUERIES items."""
+    if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+        return len(node.elts) <= MAX_LOOP_QUERIES
+    if isinstance(node, ast.Call) and get_name(node) == 'range' and node.args:
+        bound = node.args[1] if len(node.args) > 1 else node.args[0]
+        return isinstance(bound, ast.Constant) and isinstance(bound.value, int) and bound.value <= MAX_LOOP_QUERIES
+    return False
+
+
+def get_source_offset(lines, lineno, col_offset):
+    return sum(len(line) for line in lines[:lineno - 1]) + col_offset
+
+
+class Preflight:
+    """
+    Static analysis of the generated code before its execution, using the row counts of the tables:
+    1. the code querying the database in a loop (N+1 queries) is rejected,
+    2. the code aggregating with pandas a whole large table (e.g. `groupby`) is rejected, the aggregation belongs in SQL,
+    3. the `SELECT *` queries of a whole large table get a LIMIT, for a preview.
+    `check()` returns the (possibly rewritten) code and the notes on the rewrites, or raises a `PreflightError`.
+    """
+    def __init__(self, table_info, large_table_rows=LARGE_TABLE_ROWS, preview_rows=PREVIEW_ROWS):
+        self.row_counts = {
+            table.lower(): info['row_count'] for table, info in table_info.items() if info.get('row_count') is not None}
+        self.large_table_rows = large_table_rows
+        self.preview_rows = preview_rows
+
+    def get_large_tables(self, sql_query):
+        """The large tables read whole by a query: no filter, no aggregation and no limit."""
+        sql_query = normalize_sql(sql_query)
+        if not SQL_START.match(sql_query) or SQL_AGGREGATE.search(sql_query) or SQL_RESTRICTION.search(sql_query):
+            return []
+        tables = []
+        for table in SQL_TABLE.findall(sql_query):
+            # The quoted identifiers keep their case in the normalized SQL, the row counts are by lower-case name
+            table = table.split('.')[-1].strip('"`[]').replace('""', '"').lower()
+            if self.row_counts.get(table, 0) > self.large_table_rows:
+                tables.append((table, self.row_counts[table]))
+        return tables
+
+    def check(self, code):
+        try:
+            tree = ast.parse(code)
+        except SyntaxError:
+            # Reported by the execution
+            return code, []
+
+        sql_strings = {}
+        full_reads = {}
+        rejections = []
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Assign) and isinstance(node.value, ast.Constant) and isinstance(node.value.value, str):
+                for target in node.targets:
+                    if isinstance(target, ast.Name):
+                        sql_strings[target.id] = node.value.value
+
+        for node in ast.walk(tree):
+            if isinstance(node, (ast.For, ast.AsyncFor, ast.While, ast.ListComp, ast.SetComp, ast.DictComp,
+                                 ast.GeneratorExp)):
+                rejections.extend(self.check_loop(node))
+            elif isinstance(node, ast.Assign) and isinstance(node.value, ast.Call):
+                tables = self.get_read_tables(node.value, sql_strings)
+                for target in node.targets:
+                    if isinstance(target, ast.Name) and tables:
+                        full_reads[target.id] = tables
+
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Call) and get_name(node) in AGGREGATE_METHODS and isinstance(node.func, ast.Attribute):
+                name = get_root_name(node.func.value)
+                if name in full_reads:
+                    table, rows = full_reads[name][0]
+                    rejections.append(
+                        f"line {node.lineno}: `{name}.{get_name(node)}()` aggregates in pandas all the {rows:,} rows "
+                        f"of the {table} table: aggregate in the SQL query instead (GROUP BY, COUNT, SUM, AVG, ...).")
+
+        if rejections:
+            raise PreflightError("\n".join(dict.fromkeys(rejections)))
+        return self.limit_queries(code, tree)
+
+    def check_loop(self, node):
+        if isinstance(node, (ast.For, ast.AsyncFor)):
+            if is_bounded_loop(node.iter):
+                return []
+            body = node.body
+        elif isinstance(node, ast.While):
+            body = node.body
+        else:
+            if all(is_bounded_loop(generator.iter) for generator in node.generators):
+                return []
+            body = [node.elt] if not isinstance(node, ast.DictComp) else [node.key, node.value]
+
+        return [
+            f"line {call.lineno}: `{get_name(call)}()` runs a SQL query in a loop: fetch all the rows "
+            f"with a single query instead (e.g. with a JOIN, an IN (...) filter or a GROUP BY)."
+                for statement in body for call in ast.walk(statement)
+                    if isinstance(call, ast.Call) and get_name(call) in QUERY_FUNCTIONS and call.args]
+
+    def get_read_tables(self, call, sql_strings):
+        """The large tables read whole by a `read_sql_query(...)`, or `db_conn.execute(...).df()` call."""
+        if get_name(call) in FETCH_METHODS and isinstance(call.func, ast.Attribute) and isinstance(call.func.value, ast.Call):
+            call = call.func.value
+        if get_name(call) not in QUERY_FUNCTIONS or not call.args:
+            return []
+        argument = call.args[0]
+        if isinstance(argument, ast.Constant) and isinstance(argument.value, str):
+            return self.get_large_tables(argument.value)
+        if isinstance(argument, ast.Name) and argument.id in sql_strings:
+            return self.get_large_tables(sql_strings[argument.id])
+        return []
+
+    def get_query_literals(self, tree):
+        """
+        The string literals run as queries: the first argument of the query functions,
+        or the string assigned to the variable given as first argument.
+        """
+        query_names = set()
+        literals = []
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Call) and get_name(node) in QUERY_FUNCTIONS and node.args:
+                argument = node.args[0]
+                if isinstance(argument, ast.Constant) and isinstance(argument.value, str):
+                    literals.append(argument)
+                elif isinstance(argument, ast.Name):
+                    query_names.add(argument.id)
+
+        for node in ast.walk(tree):
+            if (isinstance(node, ast.Assign) and isinstance(node.value, ast.Constant) and isinstance(node.value.value, str)
+                    and any(isinstance(target, ast.Name) and target.id in query_names for target in node.targets)):
+                literals.append(node.value)
+        return literals
+
+    def limit_queries(self, code, tree):
+        """Adds a LIMIT to the `SELECT *` queries reading a whole large table."""
+        replacements = []
+        notes = []
+        for node in self.get_query_literals(tree):
+            if not SELECT_STAR.match(normalize_sql(node.value)):
+                continue
+            tables = self.get_large_tables(node.value)
+            if not tables:
+                continue
+            table, rows = tables[0]
+            limited = node.value.rstrip().rstrip(';').rstrip() + f" LIMIT {self.preview_rows}"
+            replacements.append((node, repr(limited)))
+            notes.append(
+                f"the query of line {node.lineno} reads all the {rows:,} rows of the {table} table: "
+                f"LIMIT {self.preview_rows} was added, its data-frame holds only a preview. "
+                f"Filter or aggregate in SQL to use all the rows.")
+
+        if not replacements:
+            return code, notes
+
+        # The AST offsets count UTF-8 bytes
+        lines = code.encode().splitlines(keepends=True)
+        source = b"".join(lines)
+        for node, literal in sorted(replacements, key=lambda item: (item[0].lineno, item[0].col_offset), reverse=True):
+            start = get_source_offset(lines, node.lineno, node.col_offset)
+            end = get_source_offset(lines, node.end_lineno, node.end_col_offset)
+            source = source[:start] + literal.encode() + source[end:]
+        return source.decode(), notes
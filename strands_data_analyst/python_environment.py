@@ -1,15 +1,359 @@
 import io
-from contextlib import redirect_stdout, redirect_stderr
+import sys
+import builtins
+import threading
+from collections import deque
+from contextlib import contextmanager, nullcontext
 
 from strands import tool
 
+from strands_data_analyst.figures import Pyplot, Matplotlib, get_builtins
+from strands_data_analyst.connection_pool import SharedSQLiteConnection, SharedConnection
+from strands_data_analyst.telemetry import CallRecorder
+from strands_data_analyst.preflight import PreflightError
+from strands_data_analyst.workspace import SCRATCH_NAMES
+
+
+# Characters of stdout (and of stderr) returned to the model, half from the head and half from the tail of the output
+MAX_OUTPUT_CHARS = 10_000
+
+# Printed data-frames with more rows are summarized
+MAX_FRAME_ROWS = 30
+# Head and tail rows of a data-frame summary
+FRAME_PREVIEW_ROWS = 5
+
+
+# Modules imported in the baseline namespace of every interpreter, built once per process
+BASELINE_CODE = """
+import sqlite3
+import numpy as np
+import pandas as pd
+import matplotlib
+matplotlib.use('svg')
+import matplotlib.pyplot as plt
+"""
+
+_baseline = None
+_baseline_lock = threading.Lock()
+
+
+def get_baseline_namespace():
+    """The common modules, imported and configured (SVG matplotlib backend) only once."""
+    global _baseline
+    with _baseline_lock:
+        if _baseline is None:
+            namespace = {}
+            exec(BASELINE_CODE, namespace)
+            namespace.pop('__builtins__', None)
+            _baseline = namespace
+        return _baseline
+
+
+class ThreadOutput:
+    """
+    Replacement of `sys.stdout` (or `sys.stderr`) writing to the stream captured by the current thread,
+    or to the original stream: unlike `redirect_stdout`, several threads can capture their own output.
+    """
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def get_stream(self):
+        stream = getattr(self.local, 'stream', None)
+        return stream if stream is not None else self.stream
+
+    def write(self, text):
+        return self.get_stream().write(text)
+
+    def flush(self):
+        self.get_stream().flush()
+
+    def __getattr__(self, name):
+        return getattr(self.get_stream(), name)
+
+
+_output_lock = threading.Lock()
+
+
+def get_thread_output(name):
+    """
+    The `ThreadOutput` installed as `sys.stdout` or `sys.stderr`, installing it the first time.
+    It is never uninstalled, since the other threads may be capturing their output: outside of `capture_output`,
+    it writes to the stream it replaced, so it is transparent to the rest of the process.
+    """
+    with _output_lock:
+        output = getattr(sys, name)
+        if not isinstance(output, ThreadOutput):
+            output = ThreadOutput(output)
+            setattr(sys, name, output)
+        return output
+
+
+@contextmanager
+def capture_output(stdout, stderr):
+    """Redirects the stdout and stderr of the current thread only."""
+    outputs = [(get_thread_output('stdout'), stdout), (get_thread_output('stderr'), stderr)]
+    previous = [getattr(output.local, 'stream', None) for output, _ in outputs]
+    for output, stream in outputs:
+        output.local.stream = stream
+    try:
+        yield
+    finally:
+        for (output, _), stream in zip(outputs, previous):
+            output.local.stream = stream
+
+
+class BoundedOutput(io.TextIOBase):
+    """Text stream keeping only the head and the tail of what is written, counting the characters dropped in between."""
+    def __init__(self, max_chars):
+        self.head_chars = max_chars // 2
+        self.tail_chars = max_chars - self.head_chars
+        self.head = []
+        self.head_size = 0
+        self.tail = deque()
+        self.tail_size = 0
+        self.dropped = 0
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        size = len(text)
+        if self.head_size < self.head_chars:
+            room = self.head_chars - self.head_size
+            self.head.append(text[:room])
+            self.head_size += min(size, room)
+            text = text[room:]
+        if text:
+            self.tail.append(text)
+            self.tail_size += len(text)
+            while self.tail_size > self.tail_chars:
+                excess = self.tail_size - self.tail_chars
+                if len(self.tail[0]) <= excess:
+                    dropped = len(self.tail.popleft())
+                else:
+                    self.tail[0] = self.tail[0][excess:]
+                    dropped = excess
+                self.tail_size -= dropped
+                self.dropped += dropped
+        return size
+
+    def getvalue(self):
+        head = ''.join(self.head)
+        tail = ''.join(self.tail)
+        if not self.dropped:
+            return head + tail
+        return (
+            f"{head}\n[... {self.dropped:,} characters truncated, print less data (e.g. aggregates, head()) ...]\n{tail}")
+
+
+def is_data_frame(value):
+    pandas = sys.modules.get('pandas')
+    return pandas is not None and isinstance(value, (pandas.DataFrame, pandas.Series))
+
+
+def summarize_data_frame(data_frame, preview_rows=FRAME_PREVIEW_ROWS):
+    """Compact description of a large data-frame (or series): shape, dtypes, head and tail rows, numeric statistics."""
+    if data_frame.ndim == 1:
+        data_frame = data_frame.to_frame()
+        shape = f"Series with {len(data_frame):,} rows"
+    else:
+        shape = f"DataFrame with {data_frame.shape[0]:,} rows x {data_frame.shape[1]:,} columns"
+    summary = [
+        f"{shape} (summarized, showing the first and last {preview_rows} rows)",
+        "dtypes: " + ", ".join(f"{name}: {dtype}" for name, dtype in data_frame.dtypes.items()),
+        data_frame.head(preview_rows).to_string(),
+        "...",
+        data_frame.tail(preview_rows).to_string(header=False),
+    ]
+    numeric = data_frame.select_dtypes('number')
+    if not numeric.empty:
+        summary.append("describe():\n" + numeric.describe().to_string())
+    return '\n'.join(summary)
+
 
 class PythonInterpreter:
-    def __init__(self):
+    def __init__(self,
+                 max_output_chars=MAX_OUTPUT_CHARS,
+                 max_frame_rows=MAX_FRAME_ROWS,
+                 frame_preview_rows=FRAME_PREVIEW_ROWS,
+                 workspace=None,
+                 baseline=True,
+                 telemetry=False,
+                 profile_dir=None):
         self.state = {}
-    
+        # Namespace restored by every state reset, before the injected variables
+        self.baseline = get_baseline_namespace() if baseline else {}
+        self.max_output_chars = max_output_chars
+        self.max_frame_rows = max_frame_rows
+        self.frame_preview_rows = frame_preview_rows
+        # Figures of the generated code, independent of the global pyplot state and of the other interpreters
+        self.pyplot = Pyplot()
+        matplotlib = Matplotlib(self.pyplot)
+        # Variables restored after every state reset
+        self.injected = {
+            '__builtins__': get_builtins(matplotlib),
+            'matplotlib': matplotlib,
+            'plt': self.pyplot,
+            'print': self.print,
+            'display': self.display,
+        }
+        # Data-frames kept across the state resets
+        self.workspace = workspace
+        if workspace is not None:
+            self.injected['workspace'] = workspace
+        self.clear_state()
+        self.db_pool = None
+        self.query_cache = None
+        # Telemetry events of the calls, and the directory of their sampled profiles (if any)
+        self.telemetry = telemetry
+        self.profile_dir = profile_dir
+        self.events = []
+        self.recorder = None
+        # Static checks of the code before its execution
+        self.preflight = None
+
+    def set_db(self, db, query_cache=False):
+        """
+        Lends a pooled read-only connection to the generated code, as the `db_conn` variable,
+        and with `query_cache` a `read_sql_query(sql_query, params=None)` function caching the query results.
+        """
+        self.release_db()
+        self.db_pool = db.get_connection_pool()
+        self.injected['db_conn'] = self.db_pool.acquire()
+        self.state['db_conn'] = self.injected['db_conn']
+        self.set_query_cache(db.get_query_cache() if query_cache else None)
+
+    def set_query_cache(self, query_cache):
+        self.query_cache = query_cache
+        if query_cache is None:
+            self.injected.pop('read_sql_query', None)
+            self.state.pop('read_sql_query', None)
+        else:
+            self.injected['read_sql_query'] = self.read_sql_query
+            self.state['read_sql_query'] = self.read_sql_query
+
+    def read_sql_query(self, sql_query, params=None):
+        return self.query_cache.read_sql_query(self.injected['db_conn'], sql_query, params)
+
+    def release_db(self):
+        if self.db_pool is not None:
+            self.db_pool.release(self.injected.pop('db_conn'))
+            self.state.pop('db_conn', None)
+            self.db_pool = None
+
+    def close(self):
+        self.release_db()
+
     def clear_state(self):
+        self.pyplot.close('all')
         self.state.clear()
+        self.state.update(self.baseline)
+        self.state.update(self.injected)
+
+    def save_workspace(self, query=None, query_number=None):
+        """
+        Saves the data-frames of the state in the workspace, under their variable names,
+        suffixed by the query number for the scratch names reused by every query.
+        """
+        for name, value in list(self.state.items()):
+            if name.startswith('_') or name in self.injected:
+                continue
+            if is_data_frame(value) and value.ndim == 2:
+                if name in SCRATCH_NAMES and query_number is not None:
+                    name = f"{name}_{query_number}"
+                self.workspace.save(name, value, query)
+
+    def get_workspace_inventory(self):
+        return self.workspace.inventory()
+
+    def workspace_contains(self, name):
+        return self.workspace is not None and name in self.workspace
+
+    def clear_workspace(self):
+        self.workspace.clear()
+
+    def format_value(self, value):
+        if is_data_frame(value) and len(value) > self.max_frame_rows:
+            return summarize_data_frame(value, self.frame_preview_rows)
+        return value
+
+    def print(self, *args, **kwargs):
+        """The `print` of the generated code, summarizing the large data-frames."""
+        if kwargs.get('file') is None:
+            args = [self.format_value(arg) for arg in args]
+        builtins.print(*args, **kwargs)
+
+    def display(self, *args):
+        self.print(*args, sep='\n')
+
+    def get_settings(self):
+        return {
+            'max_output_chars': self.max_output_chars,
+            'max_frame_rows': self.max_frame_rows,
+            'frame_preview_rows': self.frame_preview_rows,
+            'telemetry': self.telemetry,
+            'profile_dir': self.profile_dir,
+        }
+
+    def pop_events(self):
+        """The telemetry events of the calls since the last pop."""
+        events, self.events = self.events, []
+        return events
+
+    def set_preflight(self, preflight):
+        self.preflight = preflight
+
+    def run(self, code):
+        """Runs the code once checked by the preflight (if any): the rejected code is not executed."""
+        notes = []
+        if self.preflight is not None:
+            try:
+                code, notes = self.preflight.check(code)
+            except PreflightError as e:
+                if self.telemetry:
+                    self.events.append({'event': 'python_repl', 'code_lines': code.count('\n') + 1, 'error': 'PreflightError'})
+                return f"REJECTED, the code was not executed:\n{e}"
+        return '\n'.join([self.execute(code)] + [f"NOTE: {note}" for note in notes])
+
+    def execute(self, code):
+        stdout_buffer = BoundedOutput(self.max_output_chars)
+        stderr_buffer = BoundedOutput(self.max_output_chars)
+        if self.telemetry:
+            self.recorder = CallRecorder(code, self.pyplot, self.profile_dir)
+        # The queries of the lent pooled connection are measured by the recorder,
+        # not those of the plain connections opened by the setup code of the remote workers
+        db_conn = self.injected.get('db_conn')
+        if not isinstance(db_conn, (SharedSQLiteConnection, SharedConnection)):
+            db_conn = None
+        if db_conn is not None:
+            db_conn.recorder = self.recorder
+        try:
+            self.pyplot.activate()
+            with capture_output(stdout_buffer, stderr_buffer), self.recorder or nullcontext():
+                exec(code, self.state)
+        finally:
+            self.pyplot.release()
+            if db_conn is not None:
+                db_conn.recorder = None
+            if self.recorder is not None:
+                self.events.append(self.recorder.event)
+                self.recorder = None
+                    
+        observation = []
+
+        stdout_output = stdout_buffer.getvalue().strip()
+        if stdout_output:
+            observation.append(f"STDOUT: {stdout_output}")
+        
+        stderr_output = stderr_buffer.getvalue().strip()
+        if stderr_output:
+            observation.append(f"STDERR: {stderr_output}")
+        
+        if not observation:
+            observation.append("Code executed successfully.")
+        
+        return '\n'.join(observation)
 
     def get_tool(self):
         @tool
@@ -20,24 +364,6 @@ class PythonInterpreter:
             Args:
                 code: The Python code to execute
             """
-            stdout_buffer = io.StringIO()
-            stderr_buffer = io.StringIO()
-            with redirect_stdout(stdout_buffer), redirect_stderr(stderr_buffer):
-                exec(code, self.state)
-                        
-            observation = []
-
-            stdout_output = stdout_buffer.getvalue().strip()
-            if stdout_output:
-                observation.append(f"STDOUT: {stdout_output}")
-            
-            stderr_output = stderr_buffer.getvalue().strip()
-            if stderr_output:
-                observation.append(f"STDERR: {stderr_output}")
-            
-            if not observation:
-                observation.append("Code executed successfully.")
-            
-            return '\n'.join(observation)
+            return self.run(code)
 
         return python_repl
@@ -0,0 +1,112 @@
+import re
+import time
+import logging
+from collections import OrderedDict
+
+
+# Memory held by the cached results of a session
+QUERY_CACHE_BYTES = 256 * 1024 * 1024
+
+# Quoted strings and identifiers are kept verbatim, comments are dropped
+SQL_TOKENS = re.compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*"|--[^\n]*|/\*.*?\*/)""", re.DOTALL)
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_sql(sql_query):
+    """SQL text without comments, with collapsed whitespace and lower-cased outside of the quoted strings."""
+    normalized = []
+    text = ""
+    for token in SQL_TOKENS.split(sql_query):
+        if token[:1] in ("'", '"'):
+            normalized.append(re.sub(r"\s+", " ", text.lower()) + token)
+            text = ""
+        elif token[:2] in ("--", "/*"):
+            text += " "
+        else:
+            text += token
+    normalized.append(re.sub(r"\s+", " ", text.lower()))
+    return "".join(normalized).strip().rstrip(";").rstrip()
+
+
+def read_with_pandas(db_conn, sql_query, params=None):
+    import pandas as pd
+    return pd.read_sql_query(sql_query, db_conn, params=params)
+
+
+def read_with_duckdb(db_conn, sql_query, params=None):
+    return db_conn.execute(sql_query, params).df()
+
+
+# How the results of a query are fetched as a data-frame, for each database type (see `DB.QUERY_CODE`)
+QUERY_READERS = {
+    'SQLite': read_with_pandas,
+    'DuckDB': read_with_duckdb,
+}
+
+
+def share_data_frame(data_frame):
+    """A copy of a cached data-frame which can be modified without affecting the cache."""
+    import pandas as pd
+    if int(pd.__version__.split('.')[0]) >= 3 or pd.options.mode.copy_on_write is True:
+        # Copy-on-write: the data is only copied when modified
+        return data_frame.copy(deep=False)
+    return data_frame.copy()
+
+
+class QueryCache:
+    """
+    LRU cache of the data-frames returned by the SQL queries of a session, holding at most `max_bytes`.
+    The results are keyed by the normalized SQL text, the query parameters, and the `fingerprint()` of the database,
+    so that they are invalidated when the database changes. It has to be picklable, to be sent to a worker process.
+    """
+    def __init__(self, db_type, fingerprint, max_bytes=QUERY_CACHE_BYTES):
+        self.read = QUERY_READERS[db_type]
+        self.fingerprint = fingerprint
+        self.max_bytes = max_bytes
+        self.results = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def read_sql_query(self, db_conn, sql_query, params=None):
+        key = (normalize_sql(sql_query), repr(params), repr(self.fingerprint()))
+        start = time.perf_counter()
+        if key in self.results:
+            self.results.move_to_end(key)
+            data_frame = self.results[key][0]
+            self.hits += 1
+            hit = True
+        else:
+            data_frame = self.read(db_conn, sql_query, params)
+            self.misses += 1
+            hit = False
+            self.add(key, data_frame)
+
+        logger.info(
+            f"SQL query {'hit' if hit else 'miss'} in {(time.perf_counter() - start) * 1000:.1f}ms, "
+            f"{len(data_frame):,} rows, hit rate {self.hit_rate():.0%}: {key[0][:200]}")
+        return share_data_frame(data_frame)
+
+    def add(self, key, data_frame):
+        size = int(data_frame.memory_usage(index=True, deep=True).sum())
+        if size > self.max_bytes:
+            return
+        self.results[key] = (data_frame, size)
+        self.size += size
+        while self.size > self.max_bytes:
+            _, (_, evicted_size) = self.results.popitem(last=False)
+            self.size -= evicted_size
+
+    def hit_rate(self):
+        queries = self.hits + self.misses
+        return self.hits / queries if queries else 0.0
+
+    def get_stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hit_rate(),
+            'cached_queries': len(self.results),
+            'cached_bytes': self.size,
+        }
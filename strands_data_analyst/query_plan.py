@@ -0,0 +1,204 @@
+import re
+import time
+import sqlite3
+import threading
+
+from strands import tool
+
+from strands_data_analyst.preflight import LARGE_TABLE_ROWS
+from strands_data_analyst.query_cache import normalize_sql
+
+
+# Maximum time spent planning a query, in seconds
+EXPLAIN_TIME_LIMIT = 2.0
+
+# SQLite virtual machine instructions between two checks of the time limit
+PROGRESS_INSTRUCTIONS = 1000
+
+SQL_ALIAS = re.compile(
+    r"\b(?:from|join)\s+(\"(?:[^\"]|\"\")+\"|`[^`]+`|\[[^\]]+\]|[\w.]+)"
+    r"(?:\s+(?:as\s+)?(?!(?:where|join|inner|left|right|full|cross|natural|on|using|group|order|limit|union)\b)(\w+))?")
+PLAN_STEP = re.compile(r"^(SCAN|SEARCH) (\S+)(?: USING (.*?)(?: \((.*)\))?)?$")
+INDEX_NAME = re.compile(r"INDEX (\S+)$")
+
+
+def get_table_aliases(sql_query):
+    """Maps the lower-case table names and aliases of a query to the lower-case table names."""
+    aliases = {}
+    for table, alias in SQL_ALIAS.findall(normalize_sql(sql_query)):
+        # The quoted identifiers keep their case in the normalized SQL
+        table = table.split('.')[-1].strip('"`[]').replace('""', '"').lower()
+        aliases[table] = table
+        if alias:
+            aliases[alias.lower()] = table
+    return aliases
+
+
+def format_rows(rows):
+    return f"~{rows:,} row{'s' if rows != 1 else ''}"
+
+
+class QueryPlanner:
+    """
+    The `explain_sql` tool: the query plan of the database (SQLite `EXPLAIN QUERY PLAN`, DuckDB `EXPLAIN`),
+    planned within a time limit and without running the query. The SQLite plans are annotated with row estimates,
+    from `sqlite_stat1` when the database was analyzed or from the schema profile otherwise,
+    and the full scans of large tables and the temporary B-trees are flagged.
+    """
+    def __init__(self, time_limit=EXPLAIN_TIME_LIMIT, large_table_rows=LARGE_TABLE_ROWS, telemetry=False):
+        self.time_limit = time_limit
+        self.large_table_rows = large_table_rows
+        self.db = None
+        self.telemetry = telemetry
+        self.events = []
+
+    def set_db(self, db, db_tables, table_info):
+        self.db = db
+        self.table_info = {table.lower(): info for table, info in table_info.items()}
+        self.distinct_counts = {
+            table.lower(): {
+                field['name'].lower(): field.get('distinct_count') or field.get('approx_distinct_count')
+                    for field in fields}
+                for table, fields in db_tables.items()}
+        self.stat1 = None
+
+    def get_stat1(self, connection):
+        """The `sqlite_stat1` statistics of the indexes: (table, index) -> [rows, rows per key prefix, ...]"""
+        if self.stat1 is None:
+            self.stat1 = {}
+            try:
+                rows = connection.execute("SELECT tbl, idx, stat FROM sqlite_stat1;").fetchall()
+            except sqlite3.OperationalError:
+                rows = []
+            for table, index, stat in rows:
+                numbers = [int(number) for number in stat.split() if number.isdigit()]
+                if index is not None and numbers:
+                    self.stat1[(table.lower(), index.lower())] = numbers
+        return self.stat1
+
+    def estimate_search(self, table, index, constraints, connection):
+        """Rows per lookup of an index search, from the equality constraints on its leading columns."""
+        equalities = [constraint.split('=')[0] for constraint in constraints.split(' AND ') if '=' in constraint
+                      and not any(operator in constraint for operator in ['<', '>'])]
+        if not equalities:
+            return None
+        if index in ['INTEGER PRIMARY KEY', 'PRIMARY KEY']:
+            return 1
+        index_name = INDEX_NAME.search(index)
+        stats = self.get_stat1(connection).get((table, index_name.group(1).lower())) if index_name else None
+        if stats is not None and len(stats) > len(equalities):
+            return stats[len(equalities)]
+        row_count = self.table_info.get(table, {}).get('row_count')
+        distinct_count = self.distinct_counts.get(table, {}).get(equalities[0].lower())
+        if row_count is not None and distinct_count:
+            return max(1, round(row_count / distinct_count))
+        return None
+
+    def annotate(self, detail, aliases, connection):
+        """The estimates of a plan step, and its warning if it is expensive."""
+        if detail.startswith('USE TEMP B-TREE'):
+            return "temporary B-tree: the rows are sorted (or de-duplicated) after being read", True
+
+        step = PLAN_STEP.match(detail)
+        if step is None:
+            return None, False
+        operation, name, index, constraints = step.groups()
+        table = aliases.get(name.lower(), name.lower())
+        row_count = self.table_info.get(table, {}).get('row_count')
+        if operation == 'SCAN':
+            if row_count is None:
+                return "full scan", False
+            # A covering index scan reads all the rows too, from the smaller index
+            large = row_count > self.large_table_rows
+            return f"full {'index ' if index else ''}scan of {table}, {format_rows(row_count)}", large and index is None
+
+        if constraints is None or index is None:
+            return None, False
+        if index.startswith('AUTOMATIC'):
+            # Index built by the query on the whole table
+            if row_count is None:
+                return "automatic index", False
+            return f"automatic index built on the {row_count:,} rows of {table}", row_count > self.large_table_rows
+        rows = self.estimate_search(table, index, constraints, connection)
+        if rows is None:
+            return "index range search", False
+        return f"{format_rows(rows)} per lookup", False
+
+    def explain_sqlite(self, connection, sql_query):
+        deadline = time.monotonic() + self.time_limit
+        connection.set_progress_handler(lambda: time.monotonic() > deadline, PROGRESS_INSTRUCTIONS)
+        try:
+            plan = connection.execute(f"EXPLAIN QUERY PLAN {sql_query}").fetchall()
+        except sqlite3.OperationalError as e:
+            if 'interrupted' in str(e):
+                raise Exception(f"The query planning exceeded the time limit of {self.time_limit}s")
+            raise
+        finally:
+            connection.set_progress_handler(None, PROGRESS_INSTRUCTIONS)
+
+        aliases = get_table_aliases(sql_query)
+        depths = {0: -1}
+        lines = []
+        scans = []
+        sorts = []
+        for step_id, parent_id, _, detail in plan:
+            depths[step_id] = depths.get(parent_id, -1) + 1
+            annotation, expensive = self.annotate(detail, aliases, connection)
+            line = "  " * depths[step_id] + detail
+            if annotation is not None:
+                line += f"  [{annotation}]"
+            lines.append(line)
+            if expensive:
+                (sorts if detail.startswith('USE TEMP B-TREE') else scans).append(detail)
+
+        if scans:
+            # The sorts are only expensive on the rows of large tables
+            verdict = (
+                "EXPENSIVE: " + "; ".join(scans + sorts) + ". If the query needs only some of the rows, "
+                "filter on the primary key or indexed columns; if it needs all of them, aggregate in SQL.")
+        else:
+            verdict = "OK: no full scan of a large table."
+        return "Query plan:\n" + "\n".join(lines) + "\n" + verdict
+
+    def explain_duckdb(self, connection, sql_query):
+        timer = threading.Timer(self.time_limit, connection.interrupt)
+        timer.start()
+        try:
+            plan = connection.execute(f"EXPLAIN {sql_query}").fetchall()
+        finally:
+            timer.cancel()
+        return "Query plan (with the estimated cardinalities):\n" + "\n".join(row[-1] for row in plan)
+
+    def explain(self, sql_query):
+        if self.db is None:
+            raise Exception("No database is selected")
+        sql_query = sql_query.strip().rstrip(';')
+        with self.db.get_connection_pool().connection() as connection:
+            if self.db.DB_TYPE == 'SQLite':
+                return self.explain_sqlite(connection, sql_query)
+            return self.explain_duckdb(connection, sql_query)
+
+    def get_tool(self):
+        @tool
+        def explain_sql(sql_query: str) -> str:
+            """
+            Returns the query plan of a SQL query without running it, with the estimated rows read,
+            flagging the full scans of large tables and the sorts. Check the expensive queries before running them.
+
+            Args:
+                sql_query: The SQL query to explain
+            """
+            start = time.perf_counter()
+            try:
+                return self.explain(sql_query)
+            except Exception as e:
+                return f"ERROR: {e}"
+            finally:
+                if self.telemetry:
+                    self.events.append({'event': 'explain_sql', 'wall_time': time.perf_counter() - start})
+
+        return explain_sql
+
+    def pop_events(self):
+        events, self.events = self.events, []
+        return events
@@ -0,0 +1,145 @@
+import os
+import pickle
+import hashlib
+import pathlib
+import sqlite3
+import logging
+import tempfile
+
+from strands_data_analyst.db_profiler import quote_identifier
+
+
+CACHE_DIR = pathlib.Path(__file__).parent.resolve() / ".." / "data" / "cache" / "schema"
+
+# Offsets in the 100 bytes SQLite database header
+HEADER_SIZE = 100
+FILE_CHANGE_COUNTER_OFFSET = 24
+SCHEMA_COOKIE_OFFSET = 40
+
+# Write-ahead logs of a database file: SQLite `<db>-wal`, DuckDB `<db>.wal`
+WAL_SUFFIXES = ['-wal', '.wal']
+
+# Rows fetched at once by the content digest of a table
+HASH_BATCH_ROWS = 10_000
+
+
+def get_file_fingerprint(db_path):
+    """
+    Identity of a SQLite database file, computed without opening a connection:
+    path, size, mtime, and the file change counter and schema cookie from the header
+    (the persistent counterparts of `PRAGMA data_version` and `PRAGMA schema_version`,
+    which are only meaningful within a single connection).
+    A pending write-ahead log (SQLite or DuckDB) is part of the identity, since its changes are not reflected
+    in the database file yet.
+    """
+    db_path = os.path.realpath(db_path)
+    stat = os.stat(db_path)
+    with open(db_path, 'rb') as db_file:
+        header = db_file.read(HEADER_SIZE)
+
+    wal = None
+    for suffix in WAL_SUFFIXES:
+        if os.path.exists(db_path + suffix):
+            wal_stat = os.stat(db_path + suffix)
+            wal = (suffix, wal_stat.st_size, wal_stat.st_mtime_ns)
+
+    return {
+        'path': db_path,
+        'size': stat.st_size,
+        'mtime': stat.st_mtime_ns,
+        'change_counter': header[FILE_CHANGE_COUNTER_OFFSET:FILE_CHANGE_COUNTER_OFFSET + 4],
+        'schema_version': header[SCHEMA_COOKIE_OFFSET:SCHEMA_COOKIE_OFFSET + 4],
+        'wal': wal
+    }
+
+
+def get_directory_fingerprint(data_dir):
+    """Identity of the data files of a directory: their relative paths, sizes and mtimes."""
+    files = []
+    for root, _, file_names in os.walk(data_dir):
+        for file_name in file_names:
+            file_path = os.path.join(root, file_name)
+            stat = os.stat(file_path)
+            files.append((os.path.relpath(file_path, data_dir), stat.st_size, stat.st_mtime_ns))
+    return sorted(files)
+
+
+def get_content_digest(cursor, quoted_table, batch_rows=HASH_BATCH_ROWS):
+    """Digest of the rows of a table, read in a single scan: any INSERT, UPDATE or DELETE changes it."""
+    digest = hashlib.blake2b(digest_size=16)
+    cursor.execute(f'SELECT * FROM {quoted_table};')
+    while True:
+        rows = cursor.fetchmany(batch_rows)
+        if not rows:
+            break
+        digest.update(repr(rows).encode())
+    return digest.hexdigest()
+
+
+def get_table_fingerprint(cursor, table_name, max_hashed_rows=None):
+    """
+    Signature of a table content: its definition, row count, largest rowid, and the digest of its rows.
+    Tables having more than `max_hashed_rows` rows are not read in full: their digest is None,
+    their signature misses the in-place updates keeping the row count and largest rowid.
+    """
+    quoted_table = quote_identifier(table_name)
+    cursor.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name=?;", (table_name,))
+    table_sql = cursor.fetchone()[0]
+    cursor.execute(f'SELECT COUNT(*) FROM {quoted_table};')
+    row_count = cursor.fetchone()[0]
+    try:
+        cursor.execute(f'SELECT MAX(rowid) FROM {quoted_table};')
+        max_rowid = cursor.fetchone()[0]
+    except sqlite3.OperationalError:
+        # WITHOUT ROWID table
+        max_rowid = None
+    content_digest = None
+    if max_hashed_rows is None or row_count <= max_hashed_rows:
+        content_digest = get_content_digest(cursor, quoted_table)
+    return (table_sql, row_count, max_rowid, content_digest)
+
+
+class SchemaCache:
+    """
+    On-disk cache of database schemas, one pickle file per database path.
+
+    An entry is a dictionary with the following fields:
+    - `options`: the profiling options used to build the schema, a mismatch invalidates the entry.
+    - `fingerprint`: the database file fingerprint, if unchanged the cached schema is returned as is.
+    - `tables`: for each table, its fingerprint and its schema, to re-profile only the modified tables.
+    """
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = pathlib.Path(cache_dir)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def __entry_path(self, db_path):
+        key = hashlib.sha1(os.path.realpath(db_path).encode()).hexdigest()
+        return self.cache_dir / f"{key}.pkl"
+
+    def load(self, db_path, options):
+        entry_path = self.__entry_path(db_path)
+        if not entry_path.exists():
+            return None
+
+        try:
+            with open(entry_path, 'rb') as entry_file:
+                entry = pickle.load(entry_file)
+        except Exception as e:
+            logging.warning(f"Ignoring corrupted schema cache {entry_path}: {e}")
+            return None
+
+        if entry.get('options') != options:
+            return None
+        return entry
+
+    def save(self, db_path, options, fingerprint, tables):
+        entry = {
+            'options': options,
+            'fingerprint': fingerprint,
+            'tables': tables
+        }
+        # Atomic replace, the same database can be introspected by parallel workers
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, 'wb') as entry_file:
+            pickle.dump(entry, entry_file)
+        os.replace(tmp_path, self.__entry_path(db_path))
@@ -0,0 +1,85 @@
+import re
+import math
+from collections import Counter
+
+from strands_data_analyst.join_graph import get_join_graph, get_join_neighbours
+
+
+# Term weights of the different parts of a table description
+TABLE_NAME_WEIGHT = 3
+COLUMN_NAME_WEIGHT = 2
+EXAMPLE_WEIGHT = 1
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+WORD_PATTERN = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+")
+
+
+def stem(word):
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+
+def tokenize(text):
+    """Lower-cased, stemmed words, splitting camelCase and snake_case identifiers."""
+    return [stem(word.lower()) for word in WORD_PATTERN.findall(str(text))]
+
+
+def get_table_terms(table, table_schema):
+    terms = Counter()
+    for term in tokenize(table):
+        terms[term] += TABLE_NAME_WEIGHT
+    for field in table_schema:
+        for term in tokenize(field['name']):
+            terms[term] += COLUMN_NAME_WEIGHT
+        for example in field.get('distinct_values', []):
+            if isinstance(example, str):
+                for term in tokenize(example):
+                    terms[term] += EXAMPLE_WEIGHT
+    return terms
+
+
+class SchemaIndex:
+    """
+    Local BM25 index over the tables of a database: table names, column names, and example values.
+    Used to render only the tables relevant to a query, for databases too large to fit every turn.
+    """
+    def __init__(self, db_schema, table_info=None):
+        self.table_terms = {table: get_table_terms(table, table_schema) for table, table_schema in db_schema.items()}
+        self.lengths = {table: sum(terms.values()) for table, terms in self.table_terms.items()}
+        self.avg_length = sum(self.lengths.values()) / max(len(self.lengths), 1)
+
+        document_frequency = Counter()
+        for terms in self.table_terms.values():
+            document_frequency.update(terms.keys())
+        n_tables = len(self.table_terms)
+        self.idf = {
+            term: math.log(1 + (n_tables - frequency + 0.5) / (frequency + 0.5))
+                for term, frequency in document_frequency.items()}
+
+        self.joins = get_join_graph(db_schema, table_info)
+
+    def score(self, query):
+        query_terms = set(tokenize(query))
+        scores = {}
+        for table, terms in self.table_terms.items():
+            length_norm = K1 * (1 - B + B * self.lengths[table] / max(self.avg_length, 1))
+            scores[table] = sum(
+                self.idf[term] * terms[term] * (K1 + 1) / (terms[term] + length_norm)
+                    for term in query_terms if term in terms)
+        return scores
+
+    def search(self, query, top_n):
+        """The `top_n` tables matching the query, best first (an empty list when no table matches)."""
+        scores = self.score(query)
+        ranked = sorted((table for table, score in scores.items() if score > 0), key=lambda table: -scores[table])
+        return ranked[:top_n]
+
+    def with_join_neighbours(self, tables):
+        """The given tables and the tables directly joined to them."""
+        return set(tables) | get_join_neighbours(self.joins, tables)
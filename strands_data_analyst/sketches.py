@@ -0,0 +1,32 @@
+from collections import Counter
+
+
+class MisraGries:
+    """
+    Misra-Gries heavy hitters summary, keeping at most `capacity` counters.
+    Every value occurring more than n / (capacity + 1) times in a stream of n values is retained,
+    and its count is underestimated by at most n / (capacity + 1).
+
+    Batches of values are merged with the mergeable-summaries rule: the counts are summed,
+    then the (capacity + 1)-th largest count is subtracted from all of them.
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.counters = Counter()
+        self.n = 0
+
+    def update(self, values):
+        batch = Counter(values)
+        self.n += sum(batch.values())
+        self.counters.update(batch)
+        if len(self.counters) <= self.capacity:
+            return
+
+        counts = sorted(self.counters.values(), reverse=True)
+        threshold = counts[self.capacity]
+        self.counters = Counter({
+            value: count - threshold
+                for value, count in self.counters.items() if count > threshold})
+
+    def items(self):
+        return self.counters.items()
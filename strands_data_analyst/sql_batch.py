@@ -0,0 +1,151 @@
+import time
+import keyword
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from strands import tool
+
+from strands_data_analyst.python_environment import BoundedOutput
+
+
+# Queries of a batch running at the same time, each on its own pooled connection
+MAX_BATCH_WORKERS = 8
+
+# Maximum time of a query of the batch, in seconds
+BATCH_TIME_LIMIT = 60
+
+# SQLite virtual machine instructions between two checks of the time limit
+PROGRESS_INSTRUCTIONS = 10_000
+
+# Variables of the interpreter state which are not replaced by the data-frames
+RESERVED_NAMES = ['db_conn', 'read_sql_query', 'workspace', 'pd', 'np', 'plt', 'matplotlib', 'sqlite3']
+
+
+def fetch_rows(connection, sql_query, time_limit):
+    """The column names and the rows of a query, interrupted beyond the time limit."""
+    if isinstance(connection, sqlite3.Connection):
+        deadline = time.monotonic() + time_limit
+        connection.set_progress_handler(lambda: time.monotonic() > deadline, PROGRESS_INSTRUCTIONS)
+        try:
+            cursor = connection.execute(sql_query)
+            return [column[0] for column in cursor.description], cursor.fetchall()
+        except sqlite3.OperationalError as e:
+            if 'interrupted' in str(e):
+                raise Exception(f"The query exceeded the time limit of {time_limit}s")
+            raise
+        finally:
+            connection.set_progress_handler(None, PROGRESS_INSTRUCTIONS)
+
+    timer = threading.Timer(time_limit, connection.interrupt)
+    timer.start()
+    try:
+        cursor = connection.execute(sql_query)
+        return [column[0] for column in cursor.description], cursor.fetchall()
+    finally:
+        timer.cancel()
+
+
+class SQLBatch:
+    """
+    The `run_sql_batch` tool: runs named independent queries at the same time, on the read-only connections
+    of the database pool, and stores their data-frames in the state of the interpreter under their names.
+    The names of existing variables (e.g. `data_frame`) and of workspace data-frames are rejected, not replaced,
+    unless they were created by a previous batch (e.g. a batch run again after an error).
+    Only the SQL runs in the worker threads (SQLite and DuckDB release the GIL): the data-frames are built by
+    the calling thread. The queries reading a whole large table are rejected by the interpreter preflight (if any).
+    """
+    def __init__(self, interpreter, max_workers=MAX_BATCH_WORKERS, time_limit=BATCH_TIME_LIMIT):
+        self.interpreter = interpreter
+        self.max_workers = max_workers
+        self.time_limit = time_limit
+        self.db = None
+        # Names of the data-frames stored by the previous batches, which can be replaced
+        self.created_names = set()
+
+    def set_db(self, db):
+        self.db = db
+
+    def run_query(self, sql_query):
+        start = time.perf_counter()
+        with self.db.get_connection_pool().connection() as connection:
+            columns, rows = fetch_rows(connection, sql_query.strip().rstrip(';'), self.time_limit)
+        return columns, rows, time.perf_counter() - start
+
+    def check(self, name, sql_query):
+        if not name.isidentifier() or keyword.iskeyword(name) or name in RESERVED_NAMES + list(self.interpreter.injected):
+            return f"`{name}` is not a valid variable name"
+        # The existing variables and workspace data-frames are not replaced, they are looked up in the interpreter
+        # (the worker process of a remote interpreter)
+        if name not in self.created_names:
+            if name in self.interpreter.state:
+                return f"`{name}` is already a variable of the Python REPL: choose another name"
+            if self.interpreter.workspace_contains(name):
+                return f"`{name}` is already a data-frame of the workspace: choose another name"
+        large_tables = self.interpreter.preflight.get_large_tables(sql_query) if self.interpreter.preflight else []
+        if large_tables:
+            table, rows = large_tables[0]
+            return f"reads all the {rows:,} rows of the {table} table: filter or aggregate in SQL"
+        return None
+
+    def run(self, queries):
+        import pandas as pd
+
+        if self.db is None:
+            raise Exception("No database is selected")
+        start = time.perf_counter()
+        errors = {name: self.check(name, sql_query) for name, sql_query in queries.items()}
+        valid = {name: sql_query for name, sql_query in queries.items() if errors[name] is None}
+        futures = {}
+        if valid:
+            with ThreadPoolExecutor(min(self.max_workers, len(valid))) as executor:
+                futures = {name: executor.submit(self.run_query, sql_query) for name, sql_query in valid.items()}
+
+        output = BoundedOutput(self.interpreter.max_output_chars)
+        query_time = 0.0
+        total_rows = 0
+        for name in queries:
+            if name in futures:
+                try:
+                    columns, rows, elapsed = futures[name].result()
+                except Exception as e:
+                    errors[name] = str(e)
+                else:
+                    data_frame = pd.DataFrame.from_records(rows, columns=columns)
+                    self.interpreter.state[name] = data_frame
+                    self.created_names.add(name)
+                    query_time += elapsed
+                    total_rows += len(data_frame)
+                    output.write(
+                        f"{name}: {len(data_frame):,} rows x {len(columns)} columns ({elapsed * 1000:.0f}ms)\n"
+                        f"{self.interpreter.format_value(data_frame)}\n\n")
+            if errors[name] is not None:
+                output.write(f"{name}: ERROR, {errors[name]}\n\n")
+
+        elapsed = time.perf_counter() - start
+        if self.interpreter.telemetry:
+            self.interpreter.events.append({
+                'event': 'run_sql_batch',
+                'sql_queries': len(queries),
+                'sql_rows': total_rows,
+                'sql_time': query_time,
+                'wall_time': elapsed,
+            })
+        return output.getvalue().strip() + f"\n\n{len(queries)} queries in {elapsed * 1000:.0f}ms"
+
+    def get_tool(self):
+        @tool
+        def run_sql_batch(queries: dict[str, str]) -> str:
+            """
+            Runs independent SQL queries at the same time, and stores their results as pandas data-frames
+            in the Python REPL state, under their names. Returns the data-frames (summarized when large).
+
+            Args:
+                queries: The SQL queries, by new data-frame variable name, e.g. {"sales_per_region": "SELECT ..."}
+            """
+            try:
+                return self.run(queries)
+            except Exception as e:
+                return f"ERROR: {e}"
+
+        return run_sql_batch
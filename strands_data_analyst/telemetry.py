@@ -0,0 +1,142 @@
+import os
+import sys
+import json
+import time
+import threading
+import tracemalloc
+from collections import Counter
+from uuid import uuid4
+
+
+# Interval between two stack samples of the profiler, in seconds
+SAMPLING_INTERVAL = 0.005
+
+
+def get_rss(pid):
+    """Resident memory of a process in bytes, None where `/proc` is not available."""
+    try:
+        with open(f"/proc/{pid}/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return None
+
+
+def format_frame(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Samples the stack of a thread from a background thread, and writes the sampled stacks in the folded format
+    (`root;caller;callee count` lines) read by the flame graph tools, e.g. flamegraph.pl or speedscope.
+    """
+    def __init__(self, thread_id, interval=SAMPLING_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def sample(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(format_frame(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def write(self, file_path):
+        with open(file_path, 'w') as profile:
+            for stack, count in self.stacks.most_common():
+                profile.write(f"{stack} {count}\n")
+
+
+# Calls being recorded in the process
+_recording = set()
+_recording_lock = threading.Lock()
+
+
+class CallRecorder:
+    """
+    Measures a `python_repl` call, as a telemetry event: wall and CPU time of the calling thread, memory,
+    time and rows of the queries run on `db_conn`, and time spent in the `plt` functions.
+    The memory is the peak of the Python allocations when tracemalloc is tracing (process wide),
+    the resident memory delta otherwise: when other calls are recorded at the same time, it cannot be
+    attributed to the call, and `memory_overlapped` is set instead.
+    With a `profile_dir`, the call is profiled by a `SamplingProfiler`.
+    """
+    def __init__(self, code, pyplot, profile_dir=None):
+        self.pyplot = pyplot
+        self.profile_dir = profile_dir
+        self.profiler = None
+        self.event = {
+            'event': 'python_repl',
+            'code_lines': code.count('\n') + 1,
+            'sql_queries': 0,
+            'sql_rows': 0,
+            'sql_time': 0.0,
+        }
+
+    def add_sql(self, elapsed, rows=0, queries=0):
+        self.event['sql_queries'] += queries
+        self.event['sql_rows'] += rows
+        self.event['sql_time'] += elapsed
+
+    def __enter__(self):
+        # The memory measures are process wide: they are only reported for the calls not overlapping other calls
+        with _recording_lock:
+            self.overlapped = bool(_recording)
+            for recorder in _recording:
+                recorder.overlapped = True
+            _recording.add(self)
+            if tracemalloc.is_tracing():
+                if not self.overlapped:
+                    tracemalloc.reset_peak()
+                self.memory = tracemalloc.get_traced_memory()[0]
+            else:
+                self.memory = get_rss(os.getpid())
+        if self.profile_dir is not None:
+            self.profiler = SamplingProfiler(threading.get_ident())
+            self.profiler.start()
+        self.figure_time = self.pyplot.elapsed
+        self.cpu_time = time.thread_time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.event['wall_time'] = time.perf_counter() - self.start
+        self.event['cpu_time'] = time.thread_time() - self.cpu_time
+        self.event['figure_time'] = self.pyplot.elapsed - self.figure_time
+        with _recording_lock:
+            _recording.discard(self)
+            if self.overlapped:
+                self.event['memory_overlapped'] = True
+            elif tracemalloc.is_tracing():
+                self.event['peak_memory'] = tracemalloc.get_traced_memory()[1] - self.memory
+            elif self.memory is not None:
+                self.event['rss_delta'] = get_rss(os.getpid()) - self.memory
+        if self.profiler is not None:
+            self.profiler.stop()
+            os.makedirs(self.profile_dir, exist_ok=True)
+            self.event['profile'] = os.path.join(self.profile_dir, f"python_repl_{uuid4().hex}.folded")
+            self.profiler.write(self.event['profile'])
+        if exc_type is not None:
+            self.event['error'] = exc_type.__name__
+        return False
+
+
+def export_events(events, file_path):
+    """Appends the telemetry events to a JSONL file."""
+    with open(file_path, 'a') as jsonl:
+        for event in events:
+            jsonl.write(json.dumps(event, default=str) + '\n')
@@ -0,0 +1,14 @@
+import math
+
+
+# Average number of characters per token of English text and code, a rule of thumb rather than a measure:
+# tables of numbers, identifiers and non-English text use more tokens per character.
+CHARS_PER_TOKEN = 4
+
+
+def count_tokens(text):
+    """
+    Approximate number of LLM tokens of a text, without calling the model tokenizer: len(text) / CHARS_PER_TOKEN.
+    Use it to compare and budget texts, not to predict the exact token usage of a request.
+    """
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
@@ -0,0 +1,138 @@
+import os
+import shutil
+import tempfile
+import weakref
+from collections import OrderedDict
+
+from strands_data_analyst.query_cache import share_data_frame
+
+
+# Memory held by the data-frames of a workspace, the least recently used are spilled to disk beyond it
+WORKSPACE_BYTES = 512 * 1024 * 1024
+
+# Columns listed for each data-frame in the inventory, and characters of the query which produced it
+INVENTORY_COLUMNS = 8
+INVENTORY_QUERY_CHARS = 120
+
+# Generic variable names reused by every query (see `DB.QUERY_CODE`): saved with the query number as suffix,
+# instead of replacing the data-frame of the previous query
+SCRATCH_NAMES = ['data_frame', 'df']
+
+
+def spill_data_frame(data_frame, file_path):
+    """Writes a data-frame to Parquet, or to Feather, falling back to pickle. Returns the file path."""
+    for extension, write in [('.parquet', data_frame.to_parquet), ('.feather', data_frame.to_feather)]:
+        try:
+            write(file_path + extension)
+            return file_path + extension
+        except Exception:
+            # Missing pyarrow, or data types not supported by the format
+            if os.path.exists(file_path + extension):
+                os.remove(file_path + extension)
+    data_frame.to_pickle(file_path + '.pkl')
+    return file_path + '.pkl'
+
+
+def load_data_frame(file_path):
+    import pandas as pd
+    if file_path.endswith('.parquet'):
+        return pd.read_parquet(file_path)
+    if file_path.endswith('.feather'):
+        return pd.read_feather(file_path)
+    return pd.read_pickle(file_path)
+
+
+class WorkspaceFrame:
+    def __init__(self, data_frame, query):
+        self.data_frame = data_frame
+        self.query = query
+        self.size = int(data_frame.memory_usage(index=True, deep=True).sum())
+        self.shape = data_frame.shape
+        self.dtypes = [(str(name), str(dtype)) for name, dtype in data_frame.dtypes.items()]
+        self.file_path = None
+
+
+class Workspace:
+    """
+    Named data-frames kept across the queries of a session, accessed by the generated code as `workspace["name"]`.
+    At most `max_bytes` of data-frames are kept in memory: the least recently used ones are spilled to
+    local files, and loaded back when accessed.
+    """
+    def __init__(self, max_bytes=WORKSPACE_BYTES):
+        self.max_bytes = max_bytes
+        self.frames = OrderedDict()
+        self.spill_dir = None
+        self.spilled = 0
+
+    def __contains__(self, name):
+        return name in self.frames
+
+    def __len__(self):
+        return len(self.frames)
+
+    def keys(self):
+        return self.frames.keys()
+
+    def __getitem__(self, name):
+        frame = self.frames[name]
+        if frame.data_frame is None:
+            frame.data_frame = load_data_frame(frame.file_path)
+        self.frames.move_to_end(name)
+        self.evict()
+        return share_data_frame(frame.data_frame)
+
+    def __setitem__(self, name, data_frame):
+        self.save(name, data_frame)
+
+    def save(self, name, data_frame, query=None):
+        self.remove(name)
+        self.frames[name] = WorkspaceFrame(share_data_frame(data_frame), query)
+        self.evict()
+
+    def remove(self, name):
+        frame = self.frames.pop(name, None)
+        if frame is not None and frame.file_path is not None:
+            os.remove(frame.file_path)
+
+    def memory_size(self):
+        return sum(frame.size for frame in self.frames.values() if frame.data_frame is not None)
+
+    def evict(self):
+        size = self.memory_size()
+        for name, frame in self.frames.items():
+            if size <= self.max_bytes:
+                break
+            if frame.data_frame is None:
+                continue
+            if frame.file_path is None:
+                self.spilled += 1
+                file_path = os.path.join(self.get_spill_dir(), f"frame_{self.spilled}")
+                frame.file_path = spill_data_frame(frame.data_frame, file_path)
+            frame.data_frame = None
+            size -= frame.size
+
+    def get_spill_dir(self):
+        if self.spill_dir is None:
+            self.spill_dir = tempfile.mkdtemp(prefix="workspace-")
+            weakref.finalize(self, shutil.rmtree, self.spill_dir, ignore_errors=True)
+        return self.spill_dir
+
+    def clear(self):
+        for name in list(self.frames):
+            self.remove(name)
+
+    def inventory(self):
+        """Compact listing of the data-frames: name, shape, columns, and the query which produced them."""
+        lines = []
+        for name, frame in self.frames.items():
+            columns = ", ".join(f"{column}: {dtype}" for column, dtype in frame.dtypes[:INVENTORY_COLUMNS])
+            if len(frame.dtypes) > INVENTORY_COLUMNS:
+                columns += ", ..."
+            origin = ""
+            if frame.query is not None:
+                query = " ".join(frame.query.split())
+                if len(query) > INVENTORY_QUERY_CHARS:
+                    query = query[:INVENTORY_QUERY_CHARS - 3] + "..."
+                origin = f', from the query "{query}"'
+            lines.append(f'- workspace["{name}"]: {frame.shape[0]:,} rows x {frame.shape[1]} columns ({columns}){origin}')
+        return "\n".join(lines)
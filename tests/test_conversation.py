@@ -0,0 +1,60 @@
+from types import SimpleNamespace
+
+from strands_data_analyst.conversation import (
+    DigestConversationManager, count_message_tokens, DIGEST_PREFIX, SUMMARY_PREFIX)
+
+
+def make_query(number, result_lines):
+    """The 4 messages of a query: question, `python_repl` call, its result and the answer."""
+    tool_use_id = f"tool-{number}"
+    code = f"sql_query = 'SELECT category, SUM(amount) FROM events WHERE day = {number} GROUP BY category'"
+    output = "\n".join(f"{i} category_{i} {i * 1000.5}" for i in range(result_lines))
+    return [
+        {'role': 'user', 'content': [{'text': f"Question {number}?"}]},
+        {'role': 'assistant', 'content': [
+            {'toolUse': {'toolUseId': tool_use_id, 'name': 'python_repl', 'input': {'code': code}}}]},
+        {'role': 'user', 'content': [
+            {'toolResult': {'toolUseId': tool_use_id, 'status': 'success', 'content': [{'text': output}]}}]},
+        {'role': 'assistant', 'content': [{'text': f"Answer {number}."}]},
+    ]
+
+
+def run_session(manager, n_queries, result_lines):
+    agent = SimpleNamespace(messages=[])
+    for number in range(n_queries):
+        agent.messages.extend(make_query(number, result_lines))
+        manager.apply_management(agent)
+    return agent.messages
+
+
+def get_texts(messages, key):
+    return [item['text'] for message in messages for block in message['content'] if key in block
+            for item in (block[key]['content'] if key == 'toolResult' else [block])]
+
+
+def test_large_results_are_digested_within_the_budget():
+    manager = DigestConversationManager(token_budget=3000)
+    messages = run_session(manager, 12, result_lines=200)
+
+    assert count_message_tokens(messages) <= 3000
+    # Only the tool result of the latest query is kept whole
+    results = get_texts(messages, 'toolResult')
+    assert not results[-1].startswith(DIGEST_PREFIX)
+    assert all(result.startswith(DIGEST_PREFIX) and "SELECT category" in result for result in results[:-1])
+    # The folded queries are summarized before the first query kept, with their questions and answers
+    first_text = messages[0]['content'][0]['text']
+    assert first_text.startswith(SUMMARY_PREFIX)
+    assert "Q: Question 0?" in first_text and "A: Answer 0." in first_text
+
+
+def test_small_results_use_fewer_tokens_than_the_sliding_window():
+    # The printed data-frames are summarized by the interpreter to about 24 lines
+    manager = DigestConversationManager()
+    messages = run_session(manager, 30, result_lines=24)
+
+    # Within the default budget, the queries beyond `max_queries` are still folded into the summary
+    questions = [text for text in get_texts(messages, 'text') if text.startswith("Question")]
+    assert questions == [f"Question {number}?" for number in range(25, 30)]
+    # The sliding window of 40 messages keeps the last 10 queries whole
+    window = [message for number in range(20, 30) for message in make_query(number, result_lines=24)]
+    assert count_message_tokens(messages) < count_message_tokens(window)
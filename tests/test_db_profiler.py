@@ -0,0 +1,159 @@
+import sqlite3
+
+import pytest
+
+from strands_data_analyst import databases, db_profiler
+from strands_data_analyst.connection_pool import connect_read_only
+from strands_data_analyst.databases import SQLiteDB
+from strands_data_analyst.db_profiler import TableProfiler, ProfileConfig, get_collations
+
+
+@pytest.fixture
+def cursor():
+    connection = sqlite3.connect(":memory:")
+    connection.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT COLLATE NOCASE, city VARCHAR(20, 2), code TEXT);")
+    names = ["Alice", "alice", "ALICE", "Bob", "bob", "Carol"]
+    connection.executemany(
+        "INSERT INTO t (name, city, code) VALUES (?, ?, ?);",
+        [(names[i % len(names)], f"city {i % 3}", name) for i, name in enumerate(names * 1000)])
+    yield connection.cursor()
+    connection.close()
+
+
+def test_collations_are_read_from_the_declaration(cursor):
+    assert get_collations(cursor, 't') == {'name': 'NOCASE'}
+
+
+@pytest.mark.parametrize("config", [
+    ProfileConfig(),
+    ProfileConfig(approximate=True, sample_threshold=1_000, sample_rows=2_000, block_rows=100),
+])
+def test_collated_column_is_counted_with_its_collation(cursor, config):
+    columns = [('name', 'TEXT'), ('city', 'VARCHAR(20, 2)'), ('code', 'TEXT')]
+    profile, _ = TableProfiler(cursor, 't', 10, config).profile(columns)
+    name_counts = profile['name']['value_counts']
+    assert len(name_counts) == 3
+    assert name_counts[0][0].lower() == 'alice'
+    assert [count for _, count in name_counts] == sorted((count for _, count in name_counts), reverse=True)
+    # The BINARY collation keeps the case
+    assert len(profile['code']['value_counts']) == 6
+    if not config.approximate:
+        assert [count for _, count in name_counts] == [3000, 2000, 1000]
+        assert profile['name']['stats']['distinct_count'] == 3
+
+
+def build_tables(db_path, n_tables):
+    connection = sqlite3.connect(db_path)
+    for table in range(n_tables):
+        connection.execute(f"CREATE TABLE t{table} (id INTEGER PRIMARY KEY, value TEXT);")
+        connection.executemany(f"INSERT INTO t{table} (value) VALUES (?);", [(f"v{i % 7}",) for i in range(100)])
+    connection.commit()
+    connection.close()
+
+
+@pytest.mark.parametrize("executor", ['thread', 'process'])
+def test_parallel_profiling_closes_its_connections(tmp_path, monkeypatch, executor):
+    db_path = str(tmp_path / "test.sqlite")
+    build_tables(db_path, 4)
+    sequential = SQLiteDB({'db_location': db_path}, profile_config=ProfileConfig(workers=1)).get_schema()
+
+    opened = []
+    def connect(*args, **kwargs):
+        opened.append(connect_read_only(*args, **kwargs))
+        return opened[-1]
+    monkeypatch.setattr(databases, 'connect_read_only', connect)
+
+    config = ProfileConfig(workers=2, executor=executor)
+    assert SQLiteDB({'db_location': db_path}, profile_config=config).get_schema() == sequential
+    # The owner connection, and the connections of the thread workers
+    assert len(opened) == (3 if executor == 'thread' else 1)
+    for connection in opened:
+        with pytest.raises(sqlite3.ProgrammingError):
+            connection.execute("SELECT 1;")
+
+
+def test_distinct_count_of_the_columns_counted_by_sqlite(cursor, monkeypatch):
+    # The `code` column overflows the in-memory counters, and falls back to a GROUP BY
+    monkeypatch.setattr(db_profiler, 'MAX_TRACKED_VALUES', 4)
+    profile, _ = TableProfiler(cursor, 't', 10).profile([('name', 'TEXT'), ('code', 'TEXT')])
+    assert profile['code']['stats']['distinct_count'] == 6
+    assert profile['name']['stats']['distinct_count'] == 3
+
+
+def test_high_cardinality_columns_are_grouped_by_sqlite(monkeypatch):
+    monkeypatch.setattr(db_profiler, 'BATCH_SIZE', 100)
+    monkeypatch.setattr(db_profiler, 'MAX_TRACKED_VALUES', 500)
+    connection = sqlite3.connect(":memory:")
+    connection.execute("CREATE TABLE t (user TEXT, amount INTEGER, category TEXT, flag INTEGER, city TEXT);")
+    connection.executemany(
+        "INSERT INTO t VALUES (?, ?, ?, ?, ?);",
+        [(f"user {i}", i % 1_500, f"cat {i % 3}", i % 2, None if i % 4 else "Paris") for i in range(2_000)])
+    columns = [('user', 'TEXT'), ('amount', 'INTEGER'), ('category', 'TEXT'), ('flag', 'INTEGER'), ('city', 'TEXT')]
+
+    profile, table_stats = TableProfiler(connection.cursor(), 't', 5).profile(columns)
+    assert table_stats == {'row_count': 2_000, 'row_count_exact': True}
+    # All the values are distinct
+    assert profile['user']['value_counts'][0] == ('user 0', 1)
+    assert profile['user']['stats'] == {'distinct_count': 2_000}
+    # Extrapolated from the first batch of rows, all distinct
+    assert profile['amount']['value_counts'][:2] == [(0, 2), (1, 2)]
+    assert profile['amount']['stats'] == {'min': 0, 'max': 1_499, 'approx_distinct_count': 2_000}
+    assert profile['category']['stats'] == {'distinct_count': 3}
+    assert profile['city']['stats'] == {'null_fraction': 0.75, 'distinct_count': 1}
+
+
+def test_high_cardinality_columns_of_a_small_table_are_counted_in_passes(monkeypatch):
+    monkeypatch.setattr(db_profiler, 'BATCH_SIZE', 100)
+    monkeypatch.setattr(db_profiler, 'MAX_TRACKED_VALUES', 500)
+    # At most 3 columns of 2000 values per pass
+    monkeypatch.setattr(db_profiler, 'HIGH_CARDINALITY_VALUES', 6_000)
+    connection = sqlite3.connect(":memory:")
+    connection.execute("CREATE TABLE t (a TEXT, b INTEGER, c TEXT, d REAL, category TEXT);")
+    connection.executemany(
+        "INSERT INTO t VALUES (?, ?, ?, ?, ?);",
+        [(f"a {i}", i % 1_500, f"c {i * 7 % 2_000}", i / 2, f"cat {i % 3}") for i in range(2_000)])
+    columns = [('a', 'TEXT'), ('b', 'INTEGER'), ('c', 'TEXT'), ('d', 'REAL'), ('category', 'TEXT')]
+    statements = []
+    connection.set_trace_callback(statements.append)
+
+    profile, table_stats = TableProfiler(connection.cursor(), 't', 5).profile(columns)
+    # The single low-cardinality column is read with the others, in 2 passes of 3 columns at most
+    assert not any('GROUP BY' in statement for statement in statements)
+    assert [statement for statement in statements if statement.endswith('FROM "t";')] == [
+        'SELECT "category", "a", "b" FROM "t";', 'SELECT "c", "d" FROM "t";']
+    assert table_stats == {'row_count': 2_000, 'row_count_exact': True}
+    for name, _ in columns:
+        expected = connection.execute(
+            f'SELECT {name}, COUNT(*) FROM t GROUP BY 1 ORDER BY COUNT(*) DESC, 1 LIMIT 5;').fetchall()
+        assert profile[name]['value_counts'] == expected
+    assert profile['b']['stats'] == {'min': 0, 'max': 1_499, 'distinct_count': 1_500}
+    assert profile['c']['stats'] == {'distinct_count': 2_000}
+
+
+def test_process_workers_are_opt_in_and_not_forked():
+    assert ProfileConfig().executor == 'thread'
+    assert databases.get_process_context().get_start_method() in ('forkserver', 'spawn')
+
+
+def test_profile_is_partial_when_the_time_budget_expires(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_profiler, 'BATCH_SIZE', 100)
+    db_path = str(tmp_path / "test.sqlite")
+    connection = sqlite3.connect(db_path)
+    connection.execute("CREATE TABLE t (a INTEGER, b TEXT, c INTEGER);")
+    connection.executemany("INSERT INTO t VALUES (?, ?, ?);", [(i % 5, f"b {i % 7}", i % 2) for i in range(1_000)])
+    connection.commit()
+    columns = [('a', 'INTEGER'), ('b', 'TEXT'), ('c', 'INTEGER')]
+
+    # The budget expires after the first batch of rows, whose values are kept
+    config = ProfileConfig(table_time_budget=0)
+    profile, table_stats = TableProfiler(connection.cursor(), 't', 10, config).profile(columns)
+    connection.close()
+    assert table_stats['row_count_exact'] is False
+    for name, _ in columns:
+        assert profile[name]['quality'] == 'partial'
+        assert sum(count for _, count in profile[name]['value_counts']) == 100
+    assert profile['a']['stats']['approx_distinct_count'] == 5
+    assert 'distinct_count' not in profile['a']['stats']
+
+    schema = SQLiteDB({'db_location': db_path}, profile_config=config).get_schema()
+    assert all(field['examples_quality'] == 'partial' for field in schema['t'])
@@ -0,0 +1,24 @@
+import pytest
+
+from strands_data_analyst.databases import DuckDBDB
+
+
+def get_column(schema, table, column):
+    return next(field for field in schema[table] if field['name'] == column)
+
+
+def test_summary_statistics(tmp_path):
+    duckdb = pytest.importorskip("duckdb")
+    db_path = str(tmp_path / "test.duckdb")
+    connection = duckdb.connect(db_path)
+    connection.execute(
+        "CREATE TABLE t AS SELECT range AS id, range / 4 AS amount, 'user ' || range AS name FROM range(1000);")
+    connection.close()
+
+    schema = DuckDBDB({'db_location': db_path}).get_schema()
+    # The min and max have the type of the column, not the text of SUMMARIZE
+    assert (get_column(schema, 't', 'id')['min'], get_column(schema, 't', 'id')['max']) == (0, 999)
+    assert get_column(schema, 't', 'amount')['max'] == 249.75
+    assert 'min' not in get_column(schema, 't', 'name')
+    # The approximate distinct counts do not exceed the row count
+    assert all(field['approx_distinct_count'] <= 1000 for field in schema['t'])
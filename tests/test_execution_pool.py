@@ -0,0 +1,92 @@
+import sqlite3
+
+import pytest
+
+from strands_data_analyst.databases import SQLiteDB
+from strands_data_analyst.execution_pool import WorkerPool, WorkerKilled, RemotePythonInterpreter
+from strands_data_analyst.workspace import Workspace
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = WorkerPool(spare_workers=1)
+    yield pool
+    pool.close()
+
+
+@pytest.fixture
+def sqlite_db(tmp_path):
+    db_path = str(tmp_path / "test.sqlite")
+    connection = sqlite3.connect(db_path)
+    connection.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, value REAL);")
+    connection.executemany("INSERT INTO t (value) VALUES (?);", [(i,) for i in range(10)])
+    connection.commit()
+    connection.close()
+    return SQLiteDB({'db_location': db_path})
+
+
+@pytest.mark.parametrize("telemetry", [False, True])
+def test_query_runs_in_the_worker(pool, sqlite_db, telemetry):
+    interpreter = RemotePythonInterpreter(pool=pool, telemetry=telemetry)
+    interpreter.set_db(sqlite_db)
+    output = interpreter.run("data_frame = pd.read_sql_query('SELECT SUM(value) AS total FROM t', db_conn)\nprint(data_frame['total'][0])")
+    assert output == "STDOUT: 45.0"
+    assert len(interpreter.pop_events()) == int(telemetry)
+    interpreter.close()
+
+
+def test_worker_commands(pool):
+    worker = pool.acquire()
+    assert worker.call('execute', "x = 21\nprint(x * 2)") == "STDOUT: 42"
+    assert worker.call('contains', 'x')
+    with pytest.raises(Exception, match="KeyError"):
+        worker.call('get', 'missing')
+    pool.release(worker)
+    assert not worker.process.is_alive()
+    with pytest.raises(WorkerKilled):
+        worker.call('execute', "print(1)")
+
+
+def test_state_is_kept_in_the_worker(pool, sqlite_db):
+    interpreter = RemotePythonInterpreter(pool=pool)
+    interpreter.set_db(sqlite_db)
+    interpreter.run("data_frame = pd.read_sql_query('SELECT * FROM t', db_conn)")
+    assert 'data_frame' in interpreter.state
+    assert len(interpreter.state['data_frame']) == 10
+    interpreter.state['threshold'] = 5
+    assert interpreter.run("print(len(data_frame[data_frame['value'] >= threshold]))") == "STDOUT: 5"
+
+    # The state reset keeps the connection opened by the setup code
+    interpreter.clear_state()
+    assert interpreter.state.get('data_frame') is None
+    assert interpreter.run("print(db_conn.execute('SELECT COUNT(*) FROM t').fetchone()[0])") == "STDOUT: 10"
+    interpreter.close()
+
+
+def test_workspace_is_saved_in_the_worker(pool):
+    interpreter = RemotePythonInterpreter(pool=pool, workspace=Workspace())
+    assert interpreter.get_workspace_inventory() == ""
+    interpreter.run("data_frame = pd.DataFrame({'a': range(3)})")
+    interpreter.save_workspace("How many rows?", 1)
+    assert interpreter.workspace_contains('data_frame_1')
+    assert 'workspace["data_frame_1"]: 3 rows x 1 columns' in interpreter.get_workspace_inventory()
+    interpreter.clear_workspace()
+    assert not interpreter.workspace_contains('data_frame_1')
+    interpreter.close()
+
+
+def test_time_limit_kills_the_worker(pool, sqlite_db):
+    interpreter = RemotePythonInterpreter(pool=pool, time_limit=2, telemetry=True)
+    interpreter.set_db(sqlite_db)
+    interpreter.run("x = 1")
+    worker = interpreter.worker
+    with pytest.raises(Exception, match="time limit of 2s.*the Python state was reset"):
+        interpreter.run("import time\ntime.sleep(60)")
+    assert not worker.process.is_alive()
+    assert interpreter.pop_events()[-1]['error'] == 'WorkerKilled'
+
+    # The session continues on a new worker, set up with the database connection
+    assert interpreter.run("print('x' in globals())") == "STDOUT: False"
+    assert interpreter.run("print(db_conn.execute('SELECT COUNT(*) FROM t').fetchone()[0])") == "STDOUT: 10"
+    assert interpreter.worker is not worker
+    interpreter.close()
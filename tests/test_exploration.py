@@ -0,0 +1,69 @@
+import sqlite3
+
+from strands.models.model import Model
+
+from strands_data_analyst.agent import DataAnalystAgent, iterate_async
+from strands_data_analyst.databases import SQLiteDB
+
+
+QUESTIONS = ["Which categories sell the most?", "How do the sales evolve?", "Who are the best customers?"]
+
+
+class AnswerStubModel(Model):
+    """Model answering every request with a fixed text, without any tool call."""
+    def __init__(self):
+        self.config = {}
+
+    def update_config(self, **model_config):
+        self.config.update(model_config)
+
+    def get_config(self):
+        return self.config
+
+    async def structured_output(self, output_model, prompt, system_prompt=None, **kwargs):
+        raise NotImplementedError("The stub model has no structured output")
+        yield
+
+    async def stream(self, messages, tool_specs=None, system_prompt=None, **kwargs):
+        yield {'messageStart': {'role': 'assistant'}}
+        yield {'contentBlockDelta': {'delta': {'text': "The sales are steady."}}}
+        yield {'contentBlockStop': {}}
+        yield {'messageStop': {'stopReason': 'end_turn'}}
+
+
+def test_goals_are_explored_on_their_own_agents(tmp_path, capsys):
+    db_path = str(tmp_path / "test.sqlite")
+    connection = sqlite3.connect(db_path)
+    connection.execute("CREATE TABLE sales (id INTEGER PRIMARY KEY, category TEXT, amount REAL);")
+    connection.executemany("INSERT INTO sales (category, amount) VALUES (?, ?);", [("books", 1.0), ("games", 2.0)])
+    connection.commit()
+    connection.close()
+    agent = DataAnalystAgent(verbose=True, model=AnswerStubModel())
+    agent.set_db('test', SQLiteDB({'db_location': db_path}))
+    capsys.readouterr()
+
+    goals = [{'goal_question': question, 'goal_progress': f"[Goal {i + 1}]"} for i, question in enumerate(QUESTIONS)]
+
+    async def generate_goals():
+        for goal in goals:
+            yield goal
+
+    events = list(iterate_async(agent.explore_goals_async(generate_goals(), max_parallel_goals=2)))
+    answered = [msg['goal_question'] for msg_type, msg in events if msg_type == 'goal']
+    assert sorted(answered) == sorted(QUESTIONS)
+    for goal in goals:
+        progress = [msg['type'] for msg_type, msg in events if msg_type == 'progress' and msg['goal'] == goal['goal_progress']]
+        assert progress[0] == 'query_start'
+        assert progress[-1] == 'query_end'
+    # Every goal is followed by its response
+    for i, (msg_type, msg) in enumerate(events):
+        if msg_type == 'goal':
+            assert events[i + 1] == ('query_response', events[i + 1][1])
+            assert events[i + 1][1]['answer'] == "The sales are steady."
+
+    # The conversations of the goals are merged, in completion order
+    questions = [message for message in agent.agent.messages if message['role'] == 'user']
+    assert len(questions) == len(QUESTIONS)
+    # The goal agents do not print their messages, interleaved with the other goals
+    assert capsys.readouterr().out == ""
+    agent.close()
@@ -0,0 +1,38 @@
+import threading
+
+from matplotlib._pylab_helpers import Gcf
+
+from strands_data_analyst.python_environment import PythonInterpreter
+
+
+CODE = """
+import matplotlib.ticker
+data_frame = pd.DataFrame({'x': [1, 2, 3], 'y': [4, 5, 6]})
+visualization = plt.figure()
+data_frame.plot(x='x', y='y', ax=plt.gca())
+other = data_frame.plot(x='x', y='y')
+plt.title('{name}')
+print(type(matplotlib).__name__, len(plt.get_fignums()), other.get_title())
+"""
+
+
+def test_submodule_import_keeps_interpreter_matplotlib():
+    interpreter = PythonInterpreter()
+    assert interpreter.run("import matplotlib.ticker\nprint(type(matplotlib).__name__)") == "STDOUT: Matplotlib"
+
+
+def test_global_pyplot_figures_are_owned_per_interpreter():
+    outputs = {}
+
+    def run(name):
+        outputs[name] = PythonInterpreter().run(CODE.replace('{name}', name))
+
+    threads = [threading.Thread(target=run, args=(f"plot{i}",)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for name, output in outputs.items():
+        assert output == f"STDOUT: Matplotlib 2 {name}"
+    assert len(Gcf.figs) == 0
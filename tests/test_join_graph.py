@@ -0,0 +1,65 @@
+import sqlite3
+
+import pytest
+
+from strands_data_analyst.databases import SQLiteDB
+from strands_data_analyst.db_schema import format_db_schema, format_compact_db_schema
+from strands_data_analyst.join_graph import get_join_graph, get_join_neighbours, DECLARED, INFERRED
+
+
+@pytest.fixture
+def sqlite_db(tmp_path):
+    db_path = str(tmp_path / "test.sqlite")
+    connection = sqlite3.connect(db_path)
+    connection.executescript("""
+        CREATE TABLE customers (id INTEGER PRIMARY KEY, name TEXT);
+        CREATE TABLE products (product_id INTEGER PRIMARY KEY, label TEXT);
+        CREATE TABLE orders (
+            id INTEGER PRIMARY KEY,
+            customer_id INTEGER REFERENCES customers(id),
+            product_id INTEGER,
+            amount REAL);
+        CREATE INDEX orders_product ON orders (product_id);
+        CREATE TABLE notes (id INTEGER PRIMARY KEY, text TEXT);
+    """)
+    connection.executemany("INSERT INTO customers (name) VALUES (?);", [("alice",), ("bob",)])
+    connection.executemany("INSERT INTO products (label) VALUES (?);", [("book",), ("game",)])
+    connection.executemany(
+        "INSERT INTO orders (customer_id, product_id, amount) VALUES (?, ?, ?);", [(1, 1, 9.5), (2, 2, 20.0)])
+    connection.commit()
+    connection.close()
+    return SQLiteDB({'db_location': db_path})
+
+
+def get_joins(db):
+    return {(join['table'], join['column'], join['ref_table'], join['ref_column']): join['source']
+            for join in get_join_graph(db.get_schema(), db.get_table_info())}
+
+
+def test_declared_and_inferred_joins(sqlite_db):
+    assert get_joins(sqlite_db) == {
+        ('orders', 'customer_id', 'customers', 'id'): DECLARED,
+        ('orders', 'product_id', 'products', 'product_id'): INFERRED,
+    }
+
+
+def test_join_neighbours(sqlite_db):
+    joins = get_join_graph(sqlite_db.get_schema(), sqlite_db.get_table_info())
+    assert get_join_neighbours(joins, ['orders']) == {'customers', 'products'}
+    assert get_join_neighbours(joins, ['customers']) == {'orders'}
+    assert get_join_neighbours(joins, ['customers', 'orders']) == {'products'}
+    assert get_join_neighbours(joins, ['notes']) == set()
+
+
+def test_joins_and_indexes_are_rendered(sqlite_db):
+    schema, table_info = sqlite_db.get_schema(), sqlite_db.get_table_info()
+
+    formatted = format_db_schema(schema, table_info)
+    assert '#### Join Graph:\n- "orders"."customer_id" = "customers"."id" (foreign key)' in formatted
+    assert '- "orders"."product_id" = "products"."product_id" (inferred)' in formatted
+    assert "- product_id: Type INTEGER. Indexed." in formatted
+
+    compact = format_compact_db_schema(schema, table_info)
+    assert "-- JOIN orders.customer_id = customers.id" in compact
+    assert "-- JOIN orders.product_id = products.product_id" in compact
+    assert "product_id INTEGER IDX" in compact
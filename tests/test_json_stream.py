@@ -0,0 +1,25 @@
+import json
+
+from strands_data_analyst.json_stream import JSONArrayParser, parse_array_of_objects
+
+
+GOALS = [{'goal_question': "Which categories sell the most?"}, {'goal_question': "How do sales [by month] evolve?"}]
+
+
+def feed_chunks(text, chunk_size=7):
+    parser = JSONArrayParser()
+    items = []
+    for start in range(0, len(text), chunk_size):
+        items += parser.feed(text[start:start + chunk_size])
+    return items
+
+
+def test_items_are_parsed_from_the_stream():
+    text = "```json\n" + json.dumps(GOALS, indent=2) + "\n```"
+    assert feed_chunks(text) == GOALS
+
+
+def test_arrays_without_objects_are_skipped():
+    text = "Here are the [3] goals:\n" + json.dumps(GOALS)
+    assert [item for item in feed_chunks(text) if isinstance(item, dict)] == GOALS
+    assert parse_array_of_objects(text) == GOALS
@@ -0,0 +1,28 @@
+from strands_data_analyst.preflight import Preflight
+
+
+TABLE_INFO = {'events': {'row_count': 1_000_000}, 'users': {'row_count': 100}}
+
+
+def test_select_star_query_gets_a_limit():
+    code = "sql_query = 'SELECT * FROM events'\ndata_frame = pd.read_sql_query(sql_query, db_conn)\n"
+    checked, notes = Preflight(TABLE_INFO).check(code)
+    assert "'SELECT * FROM events LIMIT 1000'" in checked
+    assert len(notes) == 1
+
+
+def test_select_star_strings_not_run_are_unchanged():
+    code = '"""\nSELECT * FROM events\n"""\nlabel = "SELECT * FROM events"\nprint(label)\n'
+    assert Preflight(TABLE_INFO).check(code) == (code, [])
+
+
+def test_small_table_is_not_limited():
+    code = "data_frame = pd.read_sql_query('SELECT * FROM users', db_conn)\n"
+    assert Preflight(TABLE_INFO).check(code) == (code, [])
+
+
+def test_quoted_mixed_case_table_gets_a_limit():
+    code = "data_frame = pd.read_sql_query('SELECT * FROM \"Events\"', db_conn)\n"
+    checked, notes = Preflight({'Events': {'row_count': 1_000_000}}).check(code)
+    assert "LIMIT 1000" in checked
+    assert "rows of the events table" in notes[0]
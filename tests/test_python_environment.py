@@ -0,0 +1,42 @@
+from strands_data_analyst.python_environment import BoundedOutput, PythonInterpreter
+
+
+def test_bounded_output_keeps_the_head_and_the_tail():
+    output = BoundedOutput(100)
+    text = "".join(f"line {i}\n" for i in range(1_000))
+    for line in text.splitlines(keepends=True):
+        output.write(line)
+
+    assert output.head_size == 50 and output.tail_size == 50
+    assert output.dropped == len(text) - 100
+    value = output.getvalue()
+    assert value.startswith(text[:50])
+    assert value.endswith(text[-50:])
+    assert f"[... {len(text) - 100:,} characters truncated" in value
+
+
+def test_bounded_output_under_the_cap_is_unchanged():
+    output = BoundedOutput(100)
+    output.write("a" * 60)
+    output.write("b" * 40)
+    assert output.getvalue() == "a" * 60 + "b" * 40
+    assert output.dropped == 0
+
+
+def test_large_outputs_are_capped():
+    interpreter = PythonInterpreter(max_output_chars=1_000)
+    result = interpreter.run("for i in range(100_000):\n    print(i)")
+    assert len(result) < 1_200
+    assert result.startswith("STDOUT: 0\n1\n2")
+    assert result.endswith("99998\n99999")
+    assert "characters truncated" in result
+
+
+def test_large_data_frames_are_summarized():
+    interpreter = PythonInterpreter(max_frame_rows=30, frame_preview_rows=5)
+    result = interpreter.run("data_frame = pd.DataFrame({'value': range(1_000)})\nprint(data_frame)")
+    assert "DataFrame with 1,000 rows x 1 columns (summarized, showing the first and last 5 rows)" in result
+    assert "dtypes: value: int64" in result
+    assert "describe():" in result
+    # Up to `max_frame_rows` rows, the data-frame is printed whole: the header and 30 rows
+    assert interpreter.run("print(data_frame.head(30))").count("\n") == 30
@@ -0,0 +1,78 @@
+import sqlite3
+
+import pytest
+
+from strands_data_analyst.databases import SQLiteDB
+from strands_data_analyst.python_environment import PythonInterpreter
+from strands_data_analyst.query_cache import QueryCache, normalize_sql
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    db_path = str(tmp_path / "test.sqlite")
+    connection = sqlite3.connect(db_path)
+    connection.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT);")
+    connection.executemany("INSERT INTO t (name) VALUES (?);", [("Alpha",), ("beta",)])
+    connection.commit()
+    connection.close()
+    return db_path
+
+
+def test_normalized_sql():
+    sql_query = "SELECT  name\n  FROM t -- the names\n WHERE name = 'Alpha  Beta' /* case kept */;"
+    assert normalize_sql(sql_query) == "select name from t where name = 'Alpha  Beta'"
+    assert normalize_sql('SELECT "Name" FROM T') == 'select "Name" from t'
+
+
+def test_equivalent_queries_hit_the_cache(db_path):
+    cache = SQLiteDB({'db_location': db_path}).get_query_cache()
+    connection = sqlite3.connect(db_path)
+    data_frame = cache.read_sql_query(connection, "SELECT name FROM t WHERE name = 'Alpha';")
+    cache.read_sql_query(connection, "select name\nfrom t -- again\nwhere name = 'Alpha'")
+    assert cache.get_stats()['hits'] == 1
+    # The quoted strings and the parameters are part of the key
+    assert cache.read_sql_query(connection, "SELECT name FROM t WHERE name = 'alpha'").empty
+    cache.read_sql_query(connection, "SELECT name FROM t WHERE name = ?", params=("Alpha",))
+    cache.read_sql_query(connection, "SELECT name FROM t WHERE name = ?", params=("beta",))
+    assert (cache.hits, cache.misses) == (1, 4)
+
+    # The returned data-frames are copies, modifying them does not change the cache
+    data_frame['name'] = "changed"
+    assert cache.read_sql_query(connection, "SELECT name FROM t WHERE name = 'Alpha'")['name'][0] == "Alpha"
+    connection.close()
+
+
+def test_database_change_invalidates_the_cache(db_path):
+    cache = SQLiteDB({'db_location': db_path}).get_query_cache()
+    connection = sqlite3.connect(db_path)
+    assert len(cache.read_sql_query(connection, "SELECT * FROM t")) == 2
+    connection.execute("INSERT INTO t (name) VALUES ('gamma');")
+    connection.commit()
+    assert len(cache.read_sql_query(connection, "SELECT * FROM t")) == 3
+    assert (cache.hits, cache.misses) == (0, 2)
+    connection.close()
+
+
+def test_least_recently_used_results_are_evicted(db_path):
+    connection = sqlite3.connect(db_path)
+    cache = QueryCache('SQLite', lambda: None)
+    cache.read_sql_query(connection, "SELECT * FROM t")
+    cache.max_bytes = cache.size * 2
+    cache.read_sql_query(connection, "SELECT * FROM t WHERE id = 1")
+    cache.read_sql_query(connection, "SELECT * FROM t")
+    # The query on id 1 is the least recently used
+    cache.read_sql_query(connection, "SELECT * FROM t WHERE id = 2")
+    assert [key[0] for key in cache.results] == ["select * from t", "select * from t where id = 2"]
+    assert cache.size <= cache.max_bytes
+    connection.close()
+
+
+def test_generated_code_reads_through_the_cache(db_path):
+    db = SQLiteDB({'db_location': db_path})
+    interpreter = PythonInterpreter()
+    interpreter.set_db(db, query_cache=True)
+    code = "data_frame = read_sql_query('SELECT COUNT(*) AS n FROM t')\nprint(data_frame['n'][0])"
+    assert interpreter.run(code) == "STDOUT: 2"
+    assert interpreter.run(code) == "STDOUT: 2"
+    assert interpreter.query_cache.get_stats()['hits'] == 1
+    interpreter.release_db()
@@ -0,0 +1,39 @@
+import sqlite3
+
+import pytest
+
+from strands_data_analyst.databases import SQLiteDB
+from strands_data_analyst.query_plan import QueryPlanner, get_table_aliases
+
+
+@pytest.fixture
+def planner(tmp_path):
+    db_path = str(tmp_path / "test.sqlite")
+    connection = sqlite3.connect(db_path)
+    connection.execute('CREATE TABLE "Events" (id INTEGER PRIMARY KEY, user_id INTEGER, amount REAL);')
+    connection.execute('CREATE INDEX events_user ON "Events" (user_id);')
+    connection.executemany('INSERT INTO "Events" (user_id, amount) VALUES (?, ?);', [(i % 50, i) for i in range(1_000)])
+    connection.commit()
+    connection.close()
+
+    db = SQLiteDB({'db_location': db_path})
+    planner = QueryPlanner(large_table_rows=100)
+    planner.set_db(db, db.get_schema(), db.get_table_info())
+    return planner
+
+
+def test_aliases_are_lower_case():
+    assert get_table_aliases('SELECT * FROM "Events" AS E JOIN main.Users u ON u.id = E.user_id') == {
+        'events': 'events', 'e': 'events', 'users': 'users', 'u': 'users'}
+
+
+def test_full_scan_of_an_aliased_quoted_table_is_flagged(planner):
+    plan = planner.explain('SELECT SUM(e.amount) FROM "Events" AS e')
+    assert "full scan of events, ~1,000 rows" in plan
+    assert plan.splitlines()[-1].startswith("EXPENSIVE")
+
+
+def test_index_search_is_estimated(planner):
+    plan = planner.explain('SELECT e.amount FROM "Events" e WHERE e.user_id = 3')
+    assert "~20 rows per lookup" in plan
+    assert plan.splitlines()[-1].startswith("OK")
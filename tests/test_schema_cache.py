@@ -0,0 +1,96 @@
+import os
+import sys
+import sqlite3
+import subprocess
+
+import pytest
+
+from strands_data_analyst.databases import SQLiteDB, DuckDBDB
+from strands_data_analyst.db_profiler import ProfileConfig
+from strands_data_analyst.schema_cache import SchemaCache
+
+
+def build_database(db_path, names):
+    connection = sqlite3.connect(db_path)
+    connection.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT);")
+    connection.executemany("INSERT INTO t (name) VALUES (?);", [(name,) for name in names])
+    connection.execute("CREATE TABLE other (value INTEGER);")
+    connection.executemany("INSERT INTO other VALUES (?);", [(value,) for value in range(10)])
+    connection.commit()
+    connection.close()
+
+
+def get_column(schema, table, column):
+    return next(field for field in schema[table] if field['name'] == column)
+
+
+def test_cached_schema_is_reused(tmp_path):
+    db_path = str(tmp_path / "test.sqlite")
+    build_database(db_path, ["alpha", "beta"])
+    cache = SchemaCache(tmp_path / "cache")
+
+    schema = SQLiteDB({'db_location': db_path}, schema_cache=cache).get_schema()
+    assert SQLiteDB({'db_location': db_path}, schema_cache=cache).get_schema() == schema
+
+
+def test_update_invalidates_cached_table(tmp_path):
+    db_path = str(tmp_path / "test.sqlite")
+    build_database(db_path, ["alpha", "beta"])
+    cache = SchemaCache(tmp_path / "cache")
+    SQLiteDB({'db_location': db_path}, schema_cache=cache).get_schema()
+
+    # Same row count and largest rowid, only the content changes
+    connection = sqlite3.connect(db_path)
+    connection.execute("UPDATE t SET name = 'gamma';")
+    connection.commit()
+    connection.close()
+
+    schema = SQLiteDB({'db_location': db_path}, schema_cache=cache).get_schema()
+    name = get_column(schema, 't', 'name')
+    assert name['distinct_values'] == ['gamma']
+    assert name['examples_quality'] == 'exact'
+    assert get_column(schema, 'other', 'value')['distinct_values'][:3] == [0, 1, 2]
+
+
+@pytest.mark.parametrize("max_hashed_rows, name", [(10, "alpha"), (None, "gamma")])
+def test_large_tables_are_hashed_on_demand(tmp_path, max_hashed_rows, name):
+    db_path = str(tmp_path / "test.sqlite")
+    build_database(db_path, ["alpha"] * 20)
+    cache = SchemaCache(tmp_path / "cache")
+    config = ProfileConfig(max_hashed_rows=max_hashed_rows)
+    SQLiteDB({'db_location': db_path}, schema_cache=cache, profile_config=config).get_schema()
+
+    connection = sqlite3.connect(db_path)
+    connection.execute("UPDATE t SET name = 'gamma';")
+    connection.execute("UPDATE other SET value = value + 1;")
+    connection.commit()
+    connection.close()
+
+    # The small table is always re-profiled, the in-place update of the large table is only seen by its digest
+    schema = SQLiteDB({'db_location': db_path}, schema_cache=cache, profile_config=config).get_schema()
+    assert get_column(schema, 't', 'name')['distinct_values'] == [name]
+    assert get_column(schema, 'other', 'value')['distinct_values'][:3] == [1, 2, 3]
+
+
+WAL_WRITE = """
+import os, sys, duckdb
+connection = duckdb.connect(sys.argv[1])
+connection.execute("PRAGMA disable_checkpoint_on_shutdown;")
+connection.execute("INSERT INTO t SELECT range FROM range(100, 150);")
+os._exit(0)
+"""
+
+
+def test_duckdb_wal_invalidates_cached_schema(tmp_path):
+    duckdb = pytest.importorskip("duckdb")
+    db_path = str(tmp_path / "test.duckdb")
+    connection = duckdb.connect(db_path)
+    connection.execute("CREATE TABLE t AS SELECT range AS id FROM range(5);")
+    connection.close()
+    cache = SchemaCache(tmp_path / "cache")
+    assert DuckDBDB({'db_location': db_path}, schema_cache=cache).get_table_info()['t']['row_count'] == 5
+
+    # The rows are only in the write-ahead log, the database file is not checkpointed
+    subprocess.run([sys.executable, "-c", WAL_WRITE, db_path], check=True)
+    assert os.path.exists(db_path + ".wal")
+    assert DuckDBDB({'db_location': db_path}, schema_cache=cache).get_table_info()['t']['row_count'] == 55
@@ -0,0 +1,17 @@
+from collections import Counter
+
+from strands_data_analyst.sketches import MisraGries
+
+
+def test_heavy_hitters_are_kept():
+    values = ["a"] * 500 + ["b"] * 300 + [f"rare {i}" for i in range(1000)]
+    sketch = MisraGries(capacity=10)
+    for start in range(0, len(values), 100):
+        sketch.update(values[start:start + 100])
+
+    counts = dict(sketch.items())
+    assert len(counts) <= 10
+    # Underestimated by at most n / (capacity + 1)
+    for value, count in Counter(values).items():
+        if count > len(values) / 11:
+            assert count - len(values) / 11 <= counts[value] <= count
@@ -0,0 +1,80 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from strands_data_analyst.databases import SQLiteDB
+from strands_data_analyst.execution_pool import WorkerPool, RemotePythonInterpreter
+from strands_data_analyst.python_environment import PythonInterpreter
+from strands_data_analyst.sql_batch import SQLBatch
+from strands_data_analyst.workspace import Workspace
+
+
+@pytest.fixture
+def db(tmp_path):
+    db_path = str(tmp_path / "test.sqlite")
+    connection = sqlite3.connect(db_path)
+    connection.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, value REAL);")
+    connection.executemany("INSERT INTO t (value) VALUES (?);", [(i,) for i in range(10)])
+    connection.commit()
+    connection.close()
+    return SQLiteDB({'db_location': db_path})
+
+
+def test_existing_names_are_not_replaced(db):
+    workspace = Workspace()
+    workspace.save('totals', pd.DataFrame({'a': [1]}))
+    interpreter = PythonInterpreter(workspace=workspace)
+    interpreter.set_db(db)
+    interpreter.run("data_frame = 'kept'")
+    batch = SQLBatch(interpreter)
+    batch.set_db(db)
+
+    output = batch.run({
+        'data_frame': "SELECT * FROM t",
+        'totals': "SELECT SUM(value) FROM t",
+        'counts': "SELECT COUNT(*) AS n FROM t",
+    })
+    assert "data_frame: ERROR, `data_frame` is already a variable of the Python REPL" in output
+    assert "totals: ERROR, `totals` is already a data-frame of the workspace" in output
+    assert interpreter.state['data_frame'] == 'kept'
+    assert interpreter.state['counts']['n'][0] == 10
+    interpreter.close()
+
+
+def test_failed_batch_can_be_run_again(db):
+    interpreter = PythonInterpreter(workspace=Workspace())
+    interpreter.set_db(db)
+    batch = SQLBatch(interpreter)
+    batch.set_db(db)
+
+    output = batch.run({'counts': "SELECT COUNT(*) AS n FROM t", 'totals': "SELECT SUM(missing) FROM t"})
+    assert "totals: ERROR" in output
+    # End of the query: the data-frames are saved in the workspace, and the state is reset
+    interpreter.save_workspace()
+    interpreter.clear_state()
+
+    output = batch.run({'counts': "SELECT COUNT(*) AS n FROM t", 'totals': "SELECT SUM(value) AS total FROM t"})
+    assert "ERROR" not in output
+    assert interpreter.state['totals']['total'][0] == 45
+    interpreter.close()
+
+
+def test_names_are_checked_in_the_worker(db):
+    pool = WorkerPool(spare_workers=0)
+    interpreter = RemotePythonInterpreter(pool=pool, workspace=Workspace())
+    interpreter.set_db(db)
+    batch = SQLBatch(interpreter)
+    batch.set_db(db)
+
+    # Saved in the workspace of the worker, not in the local copy
+    interpreter.run("totals = pd.DataFrame({'total': [0]})")
+    interpreter.save_workspace()
+    interpreter.clear_state()
+    assert 'totals' not in interpreter.workspace
+
+    output = batch.run({'totals': "SELECT SUM(value) AS total FROM t", 'counts': "SELECT COUNT(*) AS n FROM t"})
+    assert "totals: ERROR, `totals` is already a data-frame of the workspace" in output
+    assert interpreter.state['counts']['n'][0] == 10
+    interpreter.close()
+    pool.close()
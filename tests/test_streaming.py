@@ -0,0 +1,64 @@
+import json
+import sqlite3
+
+from strands.models.model import Model
+
+from strands_data_analyst.agent import DataAnalystAgent
+from strands_data_analyst.databases import SQLiteDB
+
+
+ANSWER = ["There are ", "3 sales."]
+
+
+class ToolStubModel(Model):
+    """Model answering a query with one `python_repl` call, then with a text streamed in several chunks."""
+    def __init__(self):
+        self.config = {}
+
+    def update_config(self, **model_config):
+        self.config.update(model_config)
+
+    def get_config(self):
+        return self.config
+
+    async def structured_output(self, output_model, prompt, system_prompt=None, **kwargs):
+        raise NotImplementedError("The stub model has no structured output")
+        yield
+
+    async def stream(self, messages, tool_specs=None, system_prompt=None, **kwargs):
+        yield {'messageStart': {'role': 'assistant'}}
+        if any('toolResult' in block for block in messages[-1]['content']):
+            for chunk in ANSWER:
+                yield {'contentBlockDelta': {'delta': {'text': chunk}}}
+            yield {'contentBlockStop': {}}
+            yield {'messageStop': {'stopReason': 'end_turn'}}
+            return
+        code = "print(db_conn.execute('SELECT COUNT(*) FROM sales').fetchone()[0])"
+        yield {'contentBlockStart': {'start': {'toolUse': {'toolUseId': 'tool-1', 'name': 'python_repl'}}}}
+        yield {'contentBlockDelta': {'delta': {'toolUse': {'input': json.dumps({'code': code})}}}}
+        yield {'contentBlockStop': {}}
+        yield {'messageStop': {'stopReason': 'tool_use'}}
+
+
+def test_stream_query_events_are_in_order(tmp_path):
+    db_path = str(tmp_path / "test.sqlite")
+    connection = sqlite3.connect(db_path)
+    connection.execute("CREATE TABLE sales (id INTEGER PRIMARY KEY, amount REAL);")
+    connection.executemany("INSERT INTO sales (amount) VALUES (?);", [(1.0,), (2.0,), (3.0,)])
+    connection.commit()
+    connection.close()
+    agent = DataAnalystAgent(verbose=False, model=ToolStubModel())
+    agent.set_db('test', SQLiteDB({'db_location': db_path}))
+
+    events = list(agent.stream_query("How many sales are there?"))
+    assert [event['type'] for event in events] == ['tool_start', 'tool_end'] + ['text_delta'] * len(ANSWER) + ['response']
+    tool_start, tool_end = events[:2]
+    assert (tool_start['tool_use_id'], tool_start['name']) == ('tool-1', 'python_repl')
+    assert "SELECT COUNT(*) FROM sales" in tool_start['input']['code']
+    assert (tool_end['tool_use_id'], tool_end['status'], tool_end['output']) == ('tool-1', 'success', "STDOUT: 3")
+    assert tool_end['elapsed'] >= 0
+    assert [event['text'] for event in events if event['type'] == 'text_delta'] == ANSWER
+    assert events[-1]['response']['answer'] == "".join(ANSWER)
+    # The streaming listener is removed once the query is done
+    assert agent.tool_listener is None
+    agent.close()
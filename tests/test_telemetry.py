@@ -0,0 +1,49 @@
+import sqlite3
+
+import pytest
+
+from strands_data_analyst.databases import SQLiteDB, DuckDBDB
+from strands_data_analyst.python_environment import PythonInterpreter
+
+
+@pytest.fixture
+def sqlite_db(tmp_path):
+    db_path = str(tmp_path / "test.sqlite")
+    connection = sqlite3.connect(db_path)
+    connection.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, value REAL);")
+    connection.executemany("INSERT INTO t (value) VALUES (?);", [(i / 10,) for i in range(100)])
+    connection.commit()
+    connection.close()
+    return SQLiteDB({'db_location': db_path})
+
+
+@pytest.mark.parametrize("code, queries, rows", [
+    ("data_frame = pd.read_sql_query('SELECT * FROM t', db_conn)", 1, 100),
+    ("rows = db_conn.execute('SELECT id FROM t WHERE id <= 10').fetchall()", 1, 10),
+    ("data_frame = read_sql_query('SELECT * FROM t LIMIT 5')", 1, 5),
+])
+def test_sql_is_recorded_on_the_connection(sqlite_db, code, queries, rows):
+    interpreter = PythonInterpreter(telemetry=True)
+    interpreter.set_db(sqlite_db, query_cache=True)
+    interpreter.run(code)
+    event, = interpreter.pop_events()
+    assert event['sql_queries'] == queries
+    assert event['sql_rows'] == rows
+    assert event['sql_time'] > 0
+    interpreter.close()
+
+
+def test_duckdb_sql_is_recorded(tmp_path):
+    duckdb = pytest.importorskip("duckdb")
+    db_path = str(tmp_path / "test.duckdb")
+    connection = duckdb.connect(db_path)
+    connection.execute("CREATE TABLE t AS SELECT range AS id FROM range(50);")
+    connection.close()
+
+    interpreter = PythonInterpreter(telemetry=True)
+    interpreter.set_db(DuckDBDB({'db_location': db_path}))
+    interpreter.run("data_frame = db_conn.execute('SELECT * FROM t').df()")
+    event, = interpreter.pop_events()
+    assert event['sql_queries'] == 1
+    assert event['sql_rows'] == 50
+    interpreter.close()
@@ -0,0 +1,17 @@
+from strands_data_analyst.python_environment import PythonInterpreter
+from strands_data_analyst.workspace import Workspace
+
+
+def test_scratch_frames_are_kept_per_query():
+    interpreter = PythonInterpreter(workspace=Workspace())
+    for number, query in enumerate(["Revenue per month?", "Top customers?"], start=1):
+        interpreter.clear_state()
+        interpreter.run(f"data_frame = pd.DataFrame({{'a': range({number})}})\ntotals = data_frame.sum().to_frame()")
+        interpreter.save_workspace(query, number)
+
+    workspace = interpreter.workspace
+    assert sorted(workspace.keys()) == ['data_frame_1', 'data_frame_2', 'totals']
+    assert len(workspace['data_frame_2']) == 2
+    inventory = interpreter.get_workspace_inventory()
+    assert 'workspace["data_frame_1"]: 1 rows x 1 columns (a: int64), from the query "Revenue per month?"' in inventory
+    assert 'workspace["totals"]: 1 rows x 1 columns (0: int64), from the query "Top customers?"' in inventory
@@ -31,6 +31,7 @@ if agent.data_analyst.document:
 
 
 SKIP_MSG_TYPES = {'code', 'dataframe'}
+PROGRESS_MSG_TYPES = {'query_start', 'text_delta', 'tool_start', 'tool_end', 'query_end'}
 
 def display_message(msg):
     if msg is None or msg['type'] in SKIP_MSG_TYPES:
@@ -52,6 +53,72 @@ def display_message(msg):
                         st.markdown(msg['content'])
 
 
+class QueryProgress:
+    """The tool calls of the query in progress in a status box, and the text of the model as it is generated."""
+    def __init__(self, goal=None):
+        self.title = f"{goal} " if goal else ""
+        with chat_container:
+            with st.chat_message('assistant'):
+                self.status = st.status(f"{self.title}Thinking...")
+                self.text_placeholder = st.empty()
+        self.text = ""
+
+    def update(self, event):
+        if event['type'] == 'query_start':
+            self.status.markdown(f"**{event['question']}**")
+            return
+
+        if event['type'] == 'text_delta':
+            self.text += event['text']
+            self.text_placeholder.markdown(self.text + "▌")
+            return
+
+        # The text preceding a tool call explains it
+        if self.text:
+            self.status.markdown(self.text)
+            self.text = ""
+            self.text_placeholder.empty()
+
+        if event['type'] == 'tool_start':
+            self.status.update(label=f"{self.title}Running `{event['name']}`...")
+            if 'code' in event['input']:
+                self.status.code(event['input']['code'], language='python')
+            else:
+                self.status.json(event['input'], expanded=False)
+        elif event['type'] == 'tool_end':
+            self.status.update(label=f"{self.title}Thinking...")
+            self.status.caption(f"`{event['name']}`: {event['status']} in {event['elapsed']:.1f}s")
+
+    def close(self):
+        self.text_placeholder.empty()
+        self.status.update(label=f"{self.title}Done", state="complete", expanded=False)
+
+
+def display_messages(messages):
+    """
+    Renders the messages as they are produced, the query progress being replaced by the answer.
+    The goals of a parallel exploration have their own progress, done at their `query_end`.
+    """
+    progress = {}
+    for msg in messages:
+        if msg['type'] in PROGRESS_MSG_TYPES:
+            goal = msg['content'].get('goal')
+            if goal not in progress:
+                progress[goal] = QueryProgress(goal)
+            if msg['type'] == 'query_end':
+                progress.pop(goal).close()
+            else:
+                progress[goal].update(msg['content'])
+            continue
+
+        if None in progress:
+            progress.pop(None).close()
+        display_message(msg)
+
+    for query_progress in progress.values():
+        query_progress.close()
+
+
 if 'selected_database' in st.session_state:
     db_id = st.session_state.selected_database
     if db_id and agent.is_new_db(db_id):
@@ -67,8 +134,7 @@ with st.sidebar:
     st.header("User Input")
     if agent.data_analyst.db_id is not None:
         if prompt := st.chat_input("Enter your input here."):
-            for msg in agent.query(prompt):
-                display_message(msg)
+            display_messages(agent.query(prompt))
         
         if agent.history:
             if st.button("Generate Report"):
@@ -76,8 +142,7 @@ with st.sidebar:
                 display_message(msg)
 
         if st.button("Automated Data Exploration"):
-            for msg in agent.automated_data_exploration():
-                display_message(msg)
+            display_messages(agent.automated_data_exploration())
 
         if agent.data_analyst.document:
             if st.button("Export Report to PDF"):